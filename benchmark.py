@@ -0,0 +1,551 @@
+"""
+Benchmark the recognition hot path on recorded or synthetic video.
+
+Replays frames through FaceRecognitionSystem.process_frame and through the
+WelcomeHomeBot capture/recognition/render loop with display disabled, and
+reports per-stage latency percentiles, throughput and peak memory as JSON.
+
+Examples:
+    python benchmark.py --synthetic --face-image known_faces/Jason.jpg
+    python benchmark.py --video door.mp4 --gallery-sizes 0 100 1000 --output results.json
+    python benchmark.py --video door.mp4 --gallery-sizes 100 --max-p95-ms 95
+    python benchmark.py --video door.mp4 --known-faces known_faces --encoding-processes 4
+    python benchmark.py --index-sizes 10000 100000 --gallery-sizes 0
+    python benchmark.py --video door.mp4 --adaptive-target-ms 95 --slow-cpu 4 --gallery-sizes 0
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from encoding_pool import EncodingPool
+from events import EventDeduplicator
+from face_store import IMAGE_EXTENSIONS
+from gallery import GALLERY_BACKENDS, GalleryIndex
+from quality import DEFAULT_LEVEL, QUALITY_LEVELS, QualityController
+from recognition import FaceRecognitionSystem
+from tracking import FaceTracker
+
+STAGES = ("convert", "locate", "encode", "match", "draw", "total")
+
+
+class ReplayCapture:
+    def __init__(self, frames: Sequence[np.ndarray], fps: Optional[float] = None):
+        """
+        Stand-in for cv2.VideoCapture that plays back a list of frames.
+
+        Args:
+            frames: BGR frames to return from read()
+            fps: Pace reads like a live camera; None reads as fast as possible
+        """
+        self.frames = frames
+        self.fps = fps
+        self.index = 0
+        self._next_read = time.monotonic()
+
+    def isOpened(self) -> bool:
+        return True
+
+    def read(self, image: Optional[np.ndarray] = None):
+        if self.index >= len(self.frames):
+            return False, None
+        if self.fps:
+            delay = self._next_read - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_read = max(self._next_read, time.monotonic()) + 1.0 / self.fps
+        frame = self.frames[self.index]
+        self.index += 1
+        if image is not None and image.shape == frame.shape:
+            # Decode into the caller's buffer like cv2.VideoCapture.read(image)
+            image[...] = frame
+            return True, image
+        return True, frame
+
+    def release(self) -> None:
+        pass
+
+
+def load_video(path: str, max_frames: int) -> List[np.ndarray]:
+    """Decode up to max_frames frames from a video file."""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise ValueError(f"Could not read any frames from {path}")
+    return frames
+
+
+def synthetic_frames(count: int, width: int = 640, height: int = 480,
+                     face_image: Optional[str] = None, seed: int = 0) -> List[np.ndarray]:
+    """
+    Generate a noisy static scene with an optional face sliding across it.
+
+    Args:
+        count: Number of frames
+        width, height: Frame size
+        face_image: Image pasted into each frame so the locator and encoder have work
+        seed: Seed for the background noise
+    """
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 64, size=(height, width, 3), dtype=np.uint8)
+    face = None
+    if face_image:
+        face = cv2.imread(face_image)
+        if face is None:
+            raise ValueError(f"Could not read face image {face_image}")
+        side = min(height // 2, width // 2)
+        face = cv2.resize(face, (side, side))
+
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        if face is not None:
+            x = int((width - face.shape[1]) * (i % 100) / 99)
+            y = (height - face.shape[0]) // 2
+            frame[y:y + face.shape[0], x:x + face.shape[1]] = face
+        frames.append(frame)
+    return frames
+
+
+def resize_frames(frames: Sequence[np.ndarray], width: int, height: int) -> List[np.ndarray]:
+    return [cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA) for frame in frames]
+
+
+def synthetic_gallery(size: int, base: Optional[GalleryIndex] = None, seed: int = 0) -> GalleryIndex:
+    """Pad a gallery with random unit-length encodings of distinct people up to size entries."""
+    rng = np.random.default_rng(seed)
+    encodings = list(base.matrix) if base is not None else []
+    names = list(base.names) if base is not None else []
+    extra = max(0, size - len(names))
+    if extra:
+        vectors = rng.normal(size=(extra, 128))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        encodings.extend(vectors)
+        names.extend(f"Synthetic{i}" for i in range(extra))
+    return GalleryIndex(encodings, names)
+
+
+def clustered_gallery(people: int, per_person: int = 3, seed: int = 0):
+    """
+    Encodings shaped like real ones: distinct people ~1.0 apart, a person's samples ~0.3 apart.
+
+    Returns:
+        (encodings, names) of the gallery and one new query encoding per person
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=1 / 16, size=(people, 128)).astype(np.float32)
+    samples = np.repeat(centers, per_person, axis=0)
+    samples += rng.normal(scale=0.02, size=samples.shape).astype(np.float32)
+    names = [f"Person{i}_20240101_000000_{j}" for i in range(people) for j in range(per_person)]
+    queries = centers + rng.normal(scale=0.02, size=centers.shape).astype(np.float32)
+    return samples, names, queries
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    if not len(samples):
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    values = np.asarray(samples, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(values.mean())}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_face_system(known_faces_dir: str, tracking: bool, **options) -> FaceRecognitionSystem:
+    face_system = FaceRecognitionSystem(known_faces_dir=known_faces_dir,
+                                        deduplicator=EventDeduplicator(), **options)
+    if not tracking:
+        # Encode and match every face on every frame, as without tracking
+        face_system.tracker = FaceTracker(votes_required=1, reencode_every=1)
+    return face_system
+
+
+def bench_process_frame(face_system: FaceRecognitionSystem, frames: Sequence[np.ndarray],
+                        warmup: int = 5, memory_frames: int = 20) -> dict:
+    """
+    Time process_frame plus drawing on every frame, one at a time.
+
+    Peak memory is traced in a separate pass over the first memory_frames
+    frames, since tracemalloc slows every allocation of the timed loop.
+    """
+    for frame in frames[:warmup]:
+        face_system.process_frame(frame)
+
+    samples = {stage: [] for stage in STAGES}
+    faces = []
+    encodings_before = face_system.encodings_computed
+    start = time.perf_counter()
+    for frame in frames:
+        face_names, face_locations = face_system.process_frame(frame)
+        draw_start = time.perf_counter()
+        face_system.draw_results(frame.copy(), face_locations, face_names)
+        draw_ms = 1000 * (time.perf_counter() - draw_start)
+
+        for stage, ms in face_system.last_timings.items():
+            samples[stage].append(ms)
+        samples["draw"].append(draw_ms)
+        samples["total"][-1] += draw_ms
+        faces.append(len(face_locations))
+    elapsed = time.perf_counter() - start
+    encodings = face_system.encodings_computed - encodings_before
+
+    tracemalloc.start()
+    for frame in frames[:memory_frames]:
+        face_names, face_locations = face_system.process_frame(frame)
+        face_system.draw_results(frame.copy(), face_locations, face_names)
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "frames": len(frames),
+        "fps": len(frames) / elapsed if elapsed > 0 else 0.0,
+        "faces_per_frame": float(np.mean(faces)) if faces else 0.0,
+        "encodings": encodings,
+        "latency_ms": {stage: percentiles(values) for stage, values in samples.items()},
+        "peak_traced_mb": peak_traced / (1024 * 1024),
+    }
+
+
+def bench_bot_loop(known_faces_dir: str, frames: Sequence[np.ndarray], gallery: GalleryIndex,
+                   fps: Optional[float], **options) -> dict:
+    """Run frames through the threaded capture/recognition/render loop without a display."""
+    from camera import WelcomeHomeBot
+    from firebase_notifications import create_notification_system
+    from motion import MotionGate
+    from notification_dispatcher import FakeTransport
+    from pipeline import RecognitionPipeline
+
+    notification_system = create_notification_system(transport=FakeTransport(latency=0.1))
+    bot = WelcomeHomeBot(known_faces_dir=known_faces_dir, notification_system=notification_system,
+                         target_latency_ms=0)
+    for name, value in options.items():
+        setattr(bot.face_system, name, value)
+    bot.face_system.gallery = gallery
+
+    pipeline = RecognitionPipeline(ReplayCapture(frames, fps), bot.face_system,
+                                   motion_gate=MotionGate(), frame_ring=True)
+    render_ms = []
+    start = time.perf_counter()
+    pipeline.start()
+    while True:
+        frame = pipeline.next_frame(timeout=1.0)
+        if frame is None:
+            if not pipeline.running:
+                break
+            continue
+        render_start = time.perf_counter()
+        face_names, face_locations = pipeline.latest_results()
+        bot.annotate_frame(frame, face_names, face_locations)
+        render_ms.append(1000 * (time.perf_counter() - render_start))
+    elapsed = time.perf_counter() - start
+    report = pipeline.report()
+    pipeline.stop()
+    notification_system.dispatcher.close(timeout=1)
+
+    return {
+        "frames": len(frames),
+        "wall_fps": len(frames) / elapsed if elapsed > 0 else 0.0,
+        "stages": report,
+        "render_ms": percentiles(render_ms),
+        "recognition_latency": bot.face_system.latency_report(),
+    }
+
+
+def bench_encoding_pool(face_system: FaceRecognitionSystem, frames: Sequence[np.ndarray],
+                        known_faces_dir: str, processes: int) -> dict:
+    """Compare single-process and pooled encoding, per frame and for a full gallery load."""
+    import face_recognition
+
+    rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+    located = [(rgb, face_system.locate_faces(rgb)) for rgb in rgb_frames]
+    located = [(rgb, locations) for rgb, locations in located if locations]
+    paths = sorted(os.path.join(known_faces_dir, filename) for filename in os.listdir(known_faces_dir)
+                   if filename.lower().endswith(IMAGE_EXTENSIONS))
+
+    def timed(encode, items) -> List[float]:
+        samples = []
+        for item in items:
+            start = time.perf_counter()
+            encode(*item)
+            samples.append(1000 * (time.perf_counter() - start))
+        return samples
+
+    pool = EncodingPool(processes)
+    try:
+        # Let every worker load its models before timing
+        for rgb, locations in located[:processes]:
+            pool.encode(rgb, locations)
+
+        serial = timed(face_recognition.face_encodings, located)
+        pooled = timed(pool.encode, located)
+
+        start = time.perf_counter()
+        [FaceRecognitionSystem._encode_image_file(path) for path in paths]
+        serial_load = time.perf_counter() - start
+        start = time.perf_counter()
+        pool.encode_files(paths)
+        pooled_load = time.perf_counter() - start
+    finally:
+        pool.close()
+
+    serial_ms, pooled_ms = percentiles(serial), percentiles(pooled)
+    return {
+        "processes": pool.processes,
+        "frames_with_faces": len(located),
+        "faces_per_frame": float(np.mean([len(locations) for _, locations in located])) if located else 0.0,
+        "frame_encode_ms": {"single": serial_ms, "pool": pooled_ms},
+        "frame_speedup": serial_ms["mean"] / pooled_ms["mean"] if pooled_ms["mean"] else 0.0,
+        "gallery_images": len(paths),
+        "gallery_load_s": {"single": serial_load, "pool": pooled_load},
+        "gallery_speedup": serial_load / pooled_load if paths and pooled_load else 0.0,
+    }
+
+
+def slow_cpu(face_system: FaceRecognitionSystem, factor: float) -> FaceRecognitionSystem:
+    """
+    Simulate a CPU factor times slower, e.g. a throttled Pi, on this face system.
+
+    Locating and encoding are followed by a sleep of (factor - 1) times what
+    they took, so the simulated cost still follows the detection settings
+    and the number of faces the way a slower CPU's would.
+    """
+    for name in ("locate_faces", "encode_faces"):
+        def slowed(*args, method=getattr(face_system, name), **kwargs):
+            start = time.perf_counter()
+            result = method(*args, **kwargs)
+            time.sleep((factor - 1) * (time.perf_counter() - start))
+            return result
+        setattr(face_system, name, slowed)
+    return face_system
+
+
+def bench_adaptive_quality(known_faces_dir: str, frames: Sequence[np.ndarray], tracking: bool,
+                           target_ms: float, slowdown: float,
+                           temperature: Optional[float] = None) -> dict:
+    """
+    Replay frames on a simulated slow CPU with fixed and with adaptive detection settings.
+
+    The fixed run uses the level the controller starts at, the bot's former
+    settings. Frames are replayed without motion onsets, and the host's load
+    is ignored, so only latency and the given temperature drive the
+    adaptive run.
+    """
+    controller = QualityController(target_ms, read_temperature=lambda: temperature, read_load=lambda: None)
+    fixed = slow_cpu(make_face_system(known_faces_dir, tracking, **QUALITY_LEVELS[DEFAULT_LEVEL]._asdict()),
+                     slowdown)
+    adaptive = slow_cpu(make_face_system(known_faces_dir, tracking, quality_controller=controller),
+                        slowdown)
+
+    runs = {}
+    levels = []
+    for name, face_system in (("fixed", fixed), ("adaptive", adaptive)):
+        latencies = []
+        for frame in frames:
+            face_system.process_frame(frame)
+            latencies.append(face_system.last_timings["total"])
+            if face_system is adaptive:
+                levels.append(controller.level)
+        latencies = np.asarray(latencies)
+        runs[name] = {
+            "latency_ms": percentiles(latencies),
+            "within_target": float((latencies <= target_ms).mean()) if len(latencies) else 0.0,
+            "encodings": face_system.encodings_computed,
+        }
+
+    return {
+        "target_ms": target_ms,
+        "slowdown": slowdown,
+        "temperature": temperature,
+        **runs,
+        "frames_per_level": {level: levels.count(level) for level in sorted(set(levels))},
+        "final_settings": controller.settings._asdict(),
+        "decisions": [decision._asdict() for decision in controller.decisions],
+    }
+
+
+def bench_gallery_index(sizes: Sequence[int], nprobes: Sequence[int], queries: int = 200,
+                        aggregation: str = "min") -> List[dict]:
+    """
+    Recall and single-face match latency of each gallery backend against gallery size.
+
+    Recall is the fraction of faces matched to the same person as the exact
+    search; the approximate index is swept over nprobe values.
+    """
+    def timed(gallery, faces) -> tuple:
+        matches, samples = [], []
+        for face in faces:
+            start = time.perf_counter()
+            matches.append(gallery.match(face[None, :])[0].name)
+            samples.append(1000 * (time.perf_counter() - start))
+        return matches, percentiles(samples)
+
+    results = []
+    for size in sizes:
+        encodings, names, faces = clustered_gallery(max(1, size // 3))
+        faces = faces[np.random.default_rng(1).permutation(len(faces))[:queries]]
+        exact = GALLERY_BACKENDS["exact"](encodings, names, aggregation=aggregation)
+        expected, exact_ms = timed(exact, faces)
+
+        start = time.perf_counter()
+        ivf = GALLERY_BACKENDS["ivf"](encodings, names, aggregation=aggregation, min_train_size=0)
+        build_s = time.perf_counter() - start
+        sweep = []
+        for nprobe in nprobes:
+            ivf.nprobe = nprobe
+            found, ivf_ms = timed(ivf, faces)
+            sweep.append({
+                "nprobe": nprobe,
+                "recall": float(np.mean([a == b for a, b in zip(found, expected)])),
+                "match_ms": ivf_ms,
+                "speedup": exact_ms["mean"] / ivf_ms["mean"] if ivf_ms["mean"] else 0.0,
+            })
+        results.append({
+            "gallery_size": len(exact),
+            "exact": {"match_ms": exact_ms},
+            "ivf": {"cells": len(ivf.centroids), "build_s": build_s, "nprobe": sweep},
+        })
+    return results
+
+
+def parse_resolution(value: str) -> tuple:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(description="Benchmark the face recognition hot path.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--video", help="Recorded video file to replay")
+    source.add_argument("--synthetic", action="store_true", help="Generate frames (default)")
+    parser.add_argument("--face-image", help="Face pasted into synthetic frames")
+    parser.add_argument("--frames", type=int, default=200, help="Frames per run")
+    parser.add_argument("--known-faces", help="Gallery directory; defaults to an empty temporary one")
+    parser.add_argument("--gallery-sizes", type=int, nargs="+", default=[0, 100, 1000])
+    parser.add_argument("--resolutions", type=parse_resolution, nargs="+", default=[(640, 480)])
+    parser.add_argument("--detection-scale", type=float, default=1.0)
+    parser.add_argument("--detection-model", choices=("hog", "cnn"), default="hog")
+    parser.add_argument("--detect-every", type=int, default=1)
+    parser.add_argument("--no-tracking", action="store_true", help="Encode every face on every frame")
+    parser.add_argument("--bot-loop", action="store_true", help="Also run the full headless bot loop")
+    parser.add_argument("--bot-fps", type=float, default=30.0, help="Camera rate simulated in the bot loop")
+    parser.add_argument("--encoding-processes", type=int, default=0,
+                        help="Also compare encoding on this many worker processes against one")
+    parser.add_argument("--index-sizes", type=int, nargs="+", default=[],
+                        help="Also compare gallery backends' recall and latency at these gallery sizes")
+    parser.add_argument("--nprobes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32],
+                        help="Cells searched per face in the approximate backend comparison")
+    parser.add_argument("--adaptive-target-ms", type=float, default=0,
+                        help="Also compare fixed and adaptive detection quality at this latency target")
+    parser.add_argument("--slow-cpu", type=float, default=1.0,
+                        help="Stretch locating and encoding this many times in the adaptive comparison")
+    parser.add_argument("--simulated-temperature", type=float,
+                        help="CPU temperature reported to the adaptive controller, in degrees Celsius")
+    parser.add_argument("--max-p95-ms", type=float,
+                        help="Exit with status 1 if any run's process_frame p95 total latency exceeds this")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Keep notification prints out of the JSON written to stdout
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.redirect_stdout(sys.stderr):
+        known_faces_dir = args.known_faces or tmp_dir
+        options = {
+            "detection_scale": args.detection_scale,
+            "detection_model": args.detection_model,
+            "detect_every_n_frames": args.detect_every,
+        }
+
+        if args.video:
+            source_frames = load_video(args.video, args.frames)
+        else:
+            source_frames = synthetic_frames(args.frames, face_image=args.face_image)
+
+        base_system = make_face_system(known_faces_dir, not args.no_tracking, **options)
+        base_gallery = base_system.gallery
+
+        runs = []
+        for width, height in args.resolutions:
+            frames = resize_frames(source_frames, width, height)
+            for gallery_size in args.gallery_sizes:
+                face_system = make_face_system(known_faces_dir, not args.no_tracking, **options)
+                face_system.gallery = synthetic_gallery(gallery_size, base_gallery)
+                run = {
+                    "resolution": f"{width}x{height}",
+                    "gallery_size": len(face_system.gallery),
+                    "process_frame": bench_process_frame(face_system, frames),
+                }
+                if args.bot_loop:
+                    run["bot_loop"] = bench_bot_loop(
+                        known_faces_dir, frames, face_system.gallery, args.bot_fps, **options)
+                runs.append(run)
+
+        encoding_pool = None
+        if args.encoding_processes:
+            encoding_pool = bench_encoding_pool(
+                base_system, resize_frames(source_frames, *args.resolutions[0]),
+                known_faces_dir, args.encoding_processes)
+
+        gallery_index = bench_gallery_index(args.index_sizes, args.nprobes) if args.index_sizes else None
+
+        adaptive_quality = None
+        if args.adaptive_target_ms:
+            adaptive_quality = bench_adaptive_quality(
+                known_faces_dir, resize_frames(source_frames, *args.resolutions[0]), not args.no_tracking,
+                args.adaptive_target_ms, args.slow_cpu, args.simulated_temperature)
+
+    results = {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "source": args.video or "synthetic",
+        "tracking": not args.no_tracking,
+        "options": options,
+        "peak_rss_mb": peak_rss_mb(),
+        "runs": runs,
+    }
+    if encoding_pool is not None:
+        results["encoding_pool"] = encoding_pool
+    if gallery_index is not None:
+        results["gallery_index"] = gallery_index
+    if adaptive_quality is not None:
+        results["adaptive_quality"] = adaptive_quality
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.max_p95_ms is not None:
+        slow = []
+        for run in runs:
+            p95 = run["process_frame"]["latency_ms"]["total"]["p95"]
+            if p95 > args.max_p95_ms:
+                slow.append(f"{run['resolution']} gallery {run['gallery_size']}: {p95:.1f}ms")
+        if slow:
+            print(f"p95 latency above {args.max_p95_ms}ms: {', '.join(slow)}", file=sys.stderr)
+            sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,192 @@
 import cv2
-from recognition import FaceRecognitionSystem
+import argparse
+import json
+import logging
+import os
 import queue
+import signal
+import threading
 import time
-from firebase_notifications import create_notification_system
+from typing import Dict, Optional
+from control import ControlServer, DEFAULT_SOCKET_PATH
+from stream_server import StreamServer
+from clip_recorder import ClipRecorder
+from multi_camera import MultiCameraPipeline
+from events import EVENT_ARRIVAL, EVENT_UNKNOWN, DetectionEvent, EventDeduplicator
+from event_log import DEFAULT_EVENT_LOG_PATH, EventLog
+from gallery import GALLERY_BACKENDS
+from metrics import REGISTRY, MetricsServer
+from profiler import SamplingProfiler
+from pipeline import RecognitionPipeline
+from motion import MotionGate
+from quality import QualityController
+from startup import StartupTimer, completed, in_background, process_start
+
+# recognition (face_recognition, dlib and its models) and firebase_notifications
+# (the Firebase SDK) are imported on background threads while the camera opens
 
 class WelcomeHomeBot:
-    def __init__(self):
-        # Initialize notification system for SMS
-        self.notification_system = create_notification_system()
-        # Add household members (you'll need to add your actual household members)
-        self.notification_system.add_household_member("Jason", "CLIENT_KEY")
-        # Add more household members as needed
-        
-        self.face_system = FaceRecognitionSystem(
-            known_faces_dir="known_faces",
-            notification_callback=self.send_notification
-        )
+    def __init__(self, known_faces_dir: str = "known_faces", notification_system=None,
+                 stream_server: Optional[StreamServer] = None, encoding_processes: int = 0,
+                 event_log: Optional[EventLog] = None, clip_directory: Optional[str] = None,
+                 clip_quota: int = 1 << 30, gallery_backend: str = "exact",
+                 metrics_server: Optional[MetricsServer] = None,
+                 startup: Optional[StartupTimer] = None, target_latency_ms: float = 95.0):
+        # One cooldown shared by recognition and notifications
+        self.deduplicator = EventDeduplicator({EVENT_ARRIVAL: 60, EVENT_UNKNOWN: 60})
+        self.startup = startup or StartupTimer()
+        
+        # Firebase and the face models load in parallel, and in parallel with
+        # opening the camera; face_system and notification_system wait for them
+        self._notification_system = (completed(notification_system) if notification_system else
+                                     in_background("startup-firebase", self._load_notification_system))
+        self._notification_system.add_done_callback(self._add_household_members)
+        self._face_system = in_background("startup-recognition", self._load_face_system, {
+            "known_faces_dir": known_faces_dir,
+            "detection_scale": 0.5,
+            "detect_every_n_frames": 3,
+            "encoding_processes": encoding_processes,
+            "event_log": event_log,
+            "gallery_backend": gallery_backend,
+            # Detection settings adapt to hold the latency target; the fixed ones above apply without it
+            "quality_controller": QualityController(target_latency_ms) if target_latency_ms > 0 else None,
+        })
+        self.event_log = event_log
         self.message_queue = queue.Queue()
         self.current_message = ""
         self.message_start_time = 0
         self.message_duration = 3  # seconds
         self.registration_mode = False
         self.registration_name = ""
+        self.stream_server = stream_server
+        # Clips are recorded around each detection when a directory is given
+        self.clip_directory = clip_directory
+        self.clip_quota = clip_quota
+        self.recorders: Dict[str, ClipRecorder] = {}  # camera name -> recorder
+        self.pipeline = None
+        # Hot-path profiles on demand, through the control socket or the metrics server
+        self.profiler = SamplingProfiler(threads=("capture", "recognition", "notification", "clip"))
+        self.metrics_server = metrics_server
+        if metrics_server:
+            metrics_server.profiler = metrics_server.profiler or self.profiler
+        self._register_metrics()
         
+    def _load_notification_system(self):
+        with self.startup.phase("firebase"):
+            from firebase_notifications import create_notification_system
+            return create_notification_system(deduplicator=self.deduplicator)
+
+    @staticmethod
+    def _add_household_members(future):
+        if future.exception() is None:
+            # Add household members (you'll need to add your actual household members)
+            future.result().add_household_member("Jason", "CLIENT_KEY")
+            # Add more household members as needed
+
+    def _load_face_system(self, options: dict):
+        with self.startup.phase("face_models"):
+            from recognition import FaceRecognitionSystem
+        with self.startup.phase("known_faces"):
+            return FaceRecognitionSystem(notification_callback=self.handle_detection,
+                                         deduplicator=self.deduplicator, **options)
+
+    @property
+    def notification_system(self):
+        """The notification system, waiting for Firebase to initialize if it has not yet."""
+        return self._notification_system.result()
+
+    @property
+    def face_system(self):
+        """The face recognition system, waiting for the models and gallery to load if they have not yet."""
+        return self._face_system.result()
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> None:
+        """Wait for Firebase and face recognition to load, raising the error if either failed."""
+        self._notification_system.result(timeout)
+        self._face_system.result(timeout)
+
+    @staticmethod
+    def _loaded(future):
+        """What a background load produced, or None if it is still running or failed."""
+        if future.done() and future.exception() is None:
+            return future.result()
+        return None
+
     def send_notification(self, message: str):
-        """
-        Handle system notifications.
-        Prints all messages to console but only sends SMS for specific events.
-        """
+        """Handle system status messages by printing them to the console."""
         # Always print the message and add to display queue
         print(f"NOTIFICATION: {message}")
         # self.message_queue.put(message)
         
-        # Only send SMS for arrival events
-        if "Welcome home" in message:
-            # Extract name and send SMS notification
-            name = message.replace("Welcome home ", "").replace("!", "").split("_")[0]
-            self.notification_system.handle_person_detected(name, is_known=True)
-        elif "Unknown person detected!" in message:
-            # Send SMS for unknown person
-            self.notification_system.handle_person_detected("Unknown", is_known=False)
+    def handle_detection(self, event: DetectionEvent) -> Optional[str]:
+        """
+        Handle an arrival or unknown person reported by face recognition.
+        Events arrive already deduplicated, so each one is sent on.
+        
+        Returns:
+            Path of the clip recorded for the event, stored with it in the event log
+        """
+        where = f" [{event.camera}]" if event.camera else ""
+        recorder = self.recorders.get(event.camera)
+        clip = recorder.trigger(event) if recorder else None
+        if clip:
+            where += f" clip: {clip}"
+        if event.is_known:
+            self.send_notification(f"Welcome home {event.identity}! (confidence {event.confidence:.2f}){where}")
+        else:
+            self.send_notification(f"Unknown person detected! Please check security feed.{where}")
+        self.notification_system.notify_event(event)
+        return clip
+        
+    def _register_metrics(self):
+        """Expose the counters the bot already keeps; they are only read when scraped."""
+        REGISTRY.counter("welcome_home_frames_total", "Frames per camera by what happened to them",
+                         ("camera", "outcome"), fn=self._frame_counts)
+        deduplicator = self.deduplicator
+        REGISTRY.counter("welcome_home_events_total", "Settled detections, notified or throttled by the cooldown",
+                         ("event_type", "outcome"),
+                         fn=lambda: {**{(kind, "notified"): n for kind, n in deduplicator.emitted.items()},
+                                     **{(kind, "throttled"): n for kind, n in deduplicator.suppressed.items()}})
+        REGISTRY.counter("welcome_home_notifications_total", "Notification messages by delivery result",
+                         ("result",), fn=lambda: dict(getattr(self._dispatcher(), "stats", {})))
+        REGISTRY.gauge("welcome_home_notifications_pending", "Notification messages queued or being sent",
+                       fn=lambda: self._dispatcher().pending() if self._dispatcher() else 0)
+
+    def _dispatcher(self):
+        return getattr(self._loaded(self._notification_system), "dispatcher", None)
+
+    def _frame_counts(self) -> Dict[tuple, int]:
+        """(camera, outcome) -> frames captured, recognized, dropped before recognition or gated as idle."""
+        if self.pipeline is None:
+            return {}
+        if isinstance(self.pipeline, MultiCameraPipeline):
+            feeds = [(feed.name, feed.stats, feed.dropped, feed.motion_gate) for feed in self.pipeline.feeds]
+        else:
+            feeds = [("", self.pipeline.stats, self.pipeline.recognition_queue.dropped, self.pipeline.motion_gate)]
+        counts = {}
+        for camera, stats, dropped, gate in feeds:
+            counts[(camera, "captured")] = stats["capture"].count
+            counts[(camera, "recognized")] = stats["recognition"].count
+            counts[(camera, "dropped")] = dropped
+            if gate is not None:
+                counts[(camera, "gated")] = gate.frames_gated
+        return counts
+
+    def _start_recorders(self, cameras: Dict[str, object]):
+        """Start one clip recorder per camera, sharing the disk quota between them."""
+        if not self.clip_directory:
+            return
+        for name, source in cameras.items():
+            directory = os.path.join(self.clip_directory, name) if name else self.clip_directory
+            recorder = ClipRecorder(source, directory, camera=name,
+                                    max_bytes=self.clip_quota // len(cameras))
+            recorder.start()
+            self.recorders[name] = recorder
+        
+    def _stop_recorders(self):
+        for recorder in self.recorders.values():
+            recorder.stop()
+        self.recorders = {}
         
     def update_display_message(self):
         """Update the current display message if needed."""
@@ -84,40 +231,191 @@ class WelcomeHomeBot:
             # cv2.putText(frame, instructions, (10, height-10),
             #            cv2.FONT_HERSHEY_DUPLEX, 0.5, (255, 255, 255), 1)
 
-    def capture_video(self):
-        cap = cv2.VideoCapture(0)
+    def annotate_frame(self, frame, face_names, face_locations):
+        """Draw face boxes, labels and the status overlay onto a frame in place."""
+        # Draw boxes and labels on the frame; there are none until recognition has loaded
+        if face_locations:
+            self.face_system.draw_results(frame, face_locations, face_names)
+        
+        # Update and draw the overlay
+        self.update_display_message()
+        self.draw_overlay(frame)
+
+    def _start_pipeline(self, camera_source):
+        """
+        Open the camera and start the capture/recognition threads.
+
+        Capture, motion detection, clips and the stream start right away;
+        recognition joins once the face models and gallery have loaded.
+        """
+        with self.startup.phase("camera_open"):
+            cap = cv2.VideoCapture(camera_source)
         
         if not cap.isOpened():
             print("Error: Could not open camera.")
-            return
+            return None
 
         self.last_face_names = []
+        
+        # Capture and recognition run on their own threads
+        # Empty-hallway frames are filtered out before they reach recognition
+        # Frames are captured into a fixed ring of shared buffers rather than allocated
+        self.pipeline = RecognitionPipeline(cap, self._loaded(self._face_system),
+                                            motion_gate=MotionGate(), frame_ring=True)
+        self.pipeline.start()
+        self._start_recorders({"": self.pipeline.latest_frame})
+        if self.stream_server:
+            self.stream_server.start()
+        if self.metrics_server:
+            self.metrics_server.start()
+        self._face_system.add_done_callback(self._attach_face_system)
+        self._notification_system.add_done_callback(self._check_notification_system)
+        in_background("startup-report", self._report_startup)
+        return cap
+
+    def _attach_face_system(self, future):
+        """Start recognition on the running pipeline once the face system has loaded."""
+        if future.exception() is not None:
+            self.pipeline.abort(f"Could not load face recognition: {future.exception()}")
+            return
+        if not self.pipeline.running:
+            return
+        self.startup.mark("recognition_live")
+        self.pipeline.set_face_system(future.result())
+        # Pick up faces added to known_faces while running, e.g. by enroll.py
+        future.result().watch_known_faces()
+
+    def _check_notification_system(self, future):
+        if future.exception() is not None:
+            self.pipeline.abort(f"Could not initialize notifications: {future.exception()}")
+
+    def _report_startup(self):
+        """Print when each startup phase finished, once the camera and both loads are done."""
+        pipeline = self.pipeline
+        pipeline.first_frame.wait()
+        self.startup.mark("first_frame", pipeline.first_frame_time)
+        try:
+            self.wait_until_ready()
+        except Exception:
+            return  # reported through the pipeline error
+        pipeline.recognition_ready.wait()
+        print(f"Startup:\n{self.startup.format()}")
+
+    def _stop_pipeline(self, cap):
+        if self.stream_server:
+            self.stream_server.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        self._stop_recorders()
+        self.pipeline.stop()
+        face_system = self._loaded(self._face_system)
+        if face_system:
+            print(f"Recognition latency: {face_system.latency_report()}")
+        print(f"Motion gate: {self.pipeline.motion_gate.report()}")
+        cap.release()
+        
+        # Give queued notifications a chance to go out before exiting
+        notification_system = self._loaded(self._notification_system)
+        if notification_system:
+            notification_system.flush(timeout=5)
+        if face_system:
+            face_system.close()
+        if self.event_log:
+            self.event_log.close(timeout=5)
+
+    def register_face(self, name: str, camera: Optional[str] = None) -> bool:
+        """
+        Register the face in the latest camera frame under the given name.
+        
+        Args:
+            name: Name to register the face under
+            camera: Camera to take the frame from in multi-camera mode
+        
+        Returns:
+            bool: True if a face was found and saved
+        """
+        frame = self.pipeline.latest_frame(camera) if camera else self.pipeline.latest_frame()
+        if frame is None or not name:
+            return False
+        # add_new_face works on RGB frames
+        success = self.face_system.add_new_face(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), name)
+        if success:
+            self.send_notification(f"Successfully registered {name}!")
+        else:
+            self.send_notification("No face detected in frame. Please try again.")
+        return success
+
+    def handle_command(self, command: str) -> str:
+        """
+        Handle a control command: quit, status, quality, last-seen, profile [SECONDS] or register NAME [CAMERA].
+        
+        Runs on the connection's own thread. profile replies only once it has
+        sampled for SECONDS (at most 60); other connections are answered
+        meanwhile, but a second profile waits for the first to finish.
+        """
+        action, _, argument = command.partition(" ")
+        if action == "quit":
+            self.stop_event.set()
+            return "ok"
+        if action == "status":
+            return json.dumps(self.pipeline.report())
+        if action == "quality":
+            face_system = self._loaded(self._face_system)
+            if not face_system or not face_system.quality_controller:
+                return "adaptive quality disabled"
+            return json.dumps(face_system.quality_controller.report())
+        if action == "last-seen":
+            if not self.event_log:
+                return "event log disabled"
+            self.event_log.flush(timeout=2)
+            return json.dumps({name: {"timestamp": logged.event.timestamp, "camera": logged.event.camera}
+                               for name, logged in self.event_log.last_seen().items()})
+        if action == "profile":
+            seconds = min(60.0, float(argument or 5))
+            return json.dumps(self.profiler.profile(seconds).top(15))
+        if action == "register":
+            name, _, camera = argument.strip().partition(" ")
+            if camera:
+                if not isinstance(self.pipeline, MultiCameraPipeline):
+                    return "a camera can only be given in multi-camera mode"
+                if camera not in [feed.name for feed in self.pipeline.feeds]:
+                    return f"unknown camera: {camera}"
+            return "ok" if self.register_face(name, camera or None) else "no face detected"
+        return f"unknown command: {action}"
+
+    def capture_video(self, camera_source=0):
+        cap = self._start_pipeline(camera_source)
+        if cap is None:
+            return
+
         window_name = 'Welcome Home Bot'
         cv2.namedWindow(window_name)
 
+        # This loop only renders and handles keys
+        # Frames are drawn into one reused buffer unless the stream server may still be encoding it
+        display = None
         while True:
-            ret, frame = cap.read()
+            frame = self.pipeline.next_frame(timeout=1.0, out=None if self.stream_server else display)
+            display = frame if frame is not None else display
 
-            if not ret:
-                print("Error: Could not read frame.")
-                break
+            if frame is None:
+                if not self.pipeline.running:
+                    print(f"Error: {self.pipeline.error}")
+                    break
+                continue
 
-            # Process the frame for face recognition
-            face_names, face_locations = self.face_system.process_frame(frame)
+            # Draw the most recent recognition results onto the live frame
+            face_names, face_locations = self.pipeline.latest_results()
             self.last_face_names = face_names
-            
-            # Draw boxes and labels on the frame
-            self.face_system.draw_results(frame, face_locations, face_names)
-            
-            # Update and draw the overlay
-            self.update_display_message()
-            self.draw_overlay(frame)
+            self.annotate_frame(frame, face_names, face_locations)
+            if self.stream_server:
+                self.stream_server.publish(frame)
 
             # Display the frame
             cv2.imshow(window_name, frame)
 
-            # Handle key presses with longer wait time
-            key = cv2.waitKey(50) & 0xFF
+            # Handle key presses; frames are paced by the capture thread
+            key = cv2.waitKey(1) & 0xFF
             
             if self.registration_mode:
                 if key == 27:  # ESC
@@ -126,11 +424,7 @@ class WelcomeHomeBot:
                     self.send_notification("Registration cancelled")
                 elif key == 13:  # Enter
                     if self.registration_name:
-                        success = self.face_system.add_new_face(frame.copy(), self.registration_name)
-                        if success:
-                            self.send_notification(f"Successfully registered {self.registration_name}!")
-                        else:
-                            self.send_notification("No face detected in frame. Please try again.")
+                        self.register_face(self.registration_name)
                         self.registration_mode = False
                         self.registration_name = ""
                 elif key == 8:  # Backspace
@@ -144,12 +438,169 @@ class WelcomeHomeBot:
                     self.registration_mode = True
                     self.send_notification("Enter name for unknown face")
 
-        cap.release()
+        self._stop_pipeline(cap)
         cv2.destroyAllWindows()
 
-def main():
-    bot = WelcomeHomeBot()
-    bot.capture_video()
+    def run_headless(self, camera_source=0, control_socket: Optional[str] = None):
+        """
+        Run capture and recognition without any GUI calls.
+        
+        Stops on SIGINT/SIGTERM or a "quit" control command; SIGUSR1 prints
+        pipeline status. Registration is available through register_face or
+        the "register NAME" control command. Annotated frames are only drawn
+        when the stream server has viewers.
+        
+        Args:
+            camera_source: Camera index, video file or stream URL
+            control_socket: Path of a Unix socket to accept control commands on
+        """
+        cap = self._start_pipeline(camera_source)
+        if cap is None:
+            return
+
+        self.stop_event = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, lambda *_: self.stop_event.set())
+            signal.signal(signal.SIGTERM, lambda *_: self.stop_event.set())
+            signal.signal(signal.SIGUSR1, lambda *_: print(f"Status: {self.pipeline.report()}"))
+
+        server = None
+        if control_socket:
+            server = ControlServer(control_socket, self.handle_command)
+            server.start()
+
+        while not self.stop_event.is_set():
+            if not self.pipeline.running:
+                print(f"Error: {self.pipeline.error}")
+                break
+            
+            # Only draw frames while someone is watching the stream
+            if self.stream_server and self.stream_server.viewer_count():
+                frame = self.pipeline.next_frame(timeout=1.0)
+                if frame is not None:
+                    face_names, face_locations = self.pipeline.latest_results()
+                    self.annotate_frame(frame, face_names, face_locations)
+                    self.stream_server.publish(frame)
+            else:
+                self.stop_event.wait(0.5)
+
+        if server:
+            server.stop()
+        self._stop_pipeline(cap)
+
+    def run_multi_camera(self, sources, workers: Optional[int] = None,
+                         control_socket: Optional[str] = None):
+        """
+        Run several cameras headlessly against one gallery and worker pool.
+        
+        The stream server is not used here; it serves a single camera.
+        
+        Args:
+            sources: Camera name -> device index, video file or RTSP URL
+            workers: Recognition threads shared by all cameras; dlib keeps the
+                GIL, so they only spread over cores with encoding_processes
+            control_socket: Path of a Unix socket to accept control commands on
+        """
+        # Every camera's tracking state comes from the face system, so wait for it here
+        self.wait_until_ready()
+        with self.startup.phase("camera_open"):
+            self.pipeline = MultiCameraPipeline(
+                self.face_system, sources, workers=workers, motion_gate_factory=MotionGate)
+        self.pipeline.start()
+        self.startup.mark("recognition_live")
+        self._start_recorders({name: (lambda name=name: self.pipeline.latest_frame(name)) for name in sources})
+        self.face_system.watch_known_faces()
+        if self.metrics_server:
+            self.metrics_server.start()
+        print(f"Startup:\n{self.startup.format()}")
+
+        self.stop_event = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, lambda *_: self.stop_event.set())
+            signal.signal(signal.SIGTERM, lambda *_: self.stop_event.set())
+            signal.signal(signal.SIGUSR1, lambda *_: print(f"Status: {self.pipeline.report()}"))
+
+        server = None
+        if control_socket:
+            server = ControlServer(control_socket, self.handle_command)
+            server.start()
+
+        while not self.stop_event.wait(1.0):
+            if not self.pipeline.alive():
+                print(f"Error: all cameras stopped: {self.pipeline.report()}")
+                break
+
+        if server:
+            server.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        self._stop_recorders()
+        self.pipeline.stop()
+        print(f"Recognition latency: {self.face_system.latency_report()}")
+        self.notification_system.flush(timeout=5)
+        self.face_system.close()
+        if self.event_log:
+            self.event_log.close(timeout=5)
+
+def parse_camera(value: str):
+    """Parse a camera argument: an index, a path/URL, or NAME=SOURCE."""
+    name, sep, source = value.partition("=")
+    if not sep or "://" in name:
+        name, source = "", value
+    return name, int(source) if source.isdigit() else source
+
+def main(startup: Optional[StartupTimer] = None):
+    startup = startup or StartupTimer(origin=process_start())
+    parser = argparse.ArgumentParser(description="Welcome Home Bot door camera.")
+    parser.add_argument("--headless", action="store_true", help="Run without a display window")
+    parser.add_argument("--camera", action="append", type=parse_camera,
+                        help="Camera index, video file or stream URL, optionally NAME=SOURCE; "
+                             "repeat for multi-camera mode (headless)")
+    parser.add_argument("--workers", type=int,
+                        help="Recognition threads in multi-camera mode; they share one core for dlib "
+                             "unless --encoding-processes is set")
+    parser.add_argument("--control-socket", default=DEFAULT_SOCKET_PATH,
+                        help="Unix socket for control commands in headless mode")
+    parser.add_argument("--stream-port", type=int, default=0,
+                        help="Serve the live stream over WebSocket/MJPEG on this port (0 disables)")
+    parser.add_argument("--stream-host", default="127.0.0.1",
+                        help="Address the live stream listens on; 0.0.0.0 shows it to the whole network, "
+                             "which has no authentication")
+    parser.add_argument("--encoding-processes", type=int, default=0,
+                        help="Compute face encodings on this many worker processes (0 encodes in-thread)")
+    parser.add_argument("--event-log", default=DEFAULT_EVENT_LOG_PATH,
+                        help="SQLite file every detection is recorded in (empty disables)")
+    parser.add_argument("--clips", default="clips",
+                        help="Directory for clips recorded around detections (empty disables)")
+    parser.add_argument("--clip-quota-mb", type=int, default=1024, help="Disk space kept for clips")
+    parser.add_argument("--gallery-backend", choices=sorted(GALLERY_BACKENDS), default="exact",
+                        help="Known-face search: exact, or ivf (approximate) for very large galleries")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="Serve Prometheus metrics and profiles on localhost at this port (0 disables)")
+    parser.add_argument("--target-latency-ms", type=float, default=95.0,
+                        help="Per-frame recognition budget detection quality adapts to (0 keeps it fixed)")
+    parser.add_argument("--log-level", default="INFO", choices=("DEBUG", "INFO", "WARNING", "ERROR"))
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level)
+    cameras = args.camera or [("", 0)]
+    if len(cameras) > 1 and args.stream_port:
+        parser.error("--stream-port serves a single camera and is not available with several --camera")
+
+    stream_server = StreamServer(args.stream_host, args.stream_port) if args.stream_port else None
+    metrics_server = MetricsServer(port=args.metrics_port) if args.metrics_port else None
+    event_log = EventLog(args.event_log) if args.event_log else None
+    bot = WelcomeHomeBot(stream_server=stream_server, encoding_processes=args.encoding_processes,
+                         event_log=event_log, clip_directory=args.clips or None,
+                         clip_quota=args.clip_quota_mb << 20, gallery_backend=args.gallery_backend,
+                         metrics_server=metrics_server, startup=startup,
+                         target_latency_ms=args.target_latency_ms)
+    if len(cameras) > 1:
+        sources = {name or f"camera{i}": source for i, (name, source) in enumerate(cameras)}
+        bot.run_multi_camera(sources, args.workers, args.control_socket)
+    elif args.headless:
+        bot.run_headless(cameras[0][1], args.control_socket)
+    else:
+        bot.capture_video(cameras[0][1])
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
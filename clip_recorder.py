@@ -0,0 +1,198 @@
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from events import DetectionEvent
+from stream_server import encode_jpeg
+
+logger = logging.getLogger(__name__)
+
+CLIP_EXTENSION = ".mjpeg"
+
+
+class _Clip:
+    def __init__(self, path: str, frames: List[bytes], started: float, until: float):
+        self.path = path
+        self.frames = frames  # JPEG bytes, oldest first
+        self.started = started
+        self.until = until  # monotonic time the post-roll ends
+
+
+class ClipRecorder:
+    def __init__(self, source: Callable, directory: str = "clips", camera: str = "",
+                 pre_roll: float = 5.0, post_roll: float = 10.0, max_clip: float = 120.0,
+                 fps: float = 10.0, quality: int = 70, max_bytes: int = 1 << 30,
+                 encode: Callable = encode_jpeg):
+        """
+        Record short clips around detection events.
+
+        A sampler thread pulls frames from source at fps, compresses them
+        to JPEG and keeps the last pre_roll seconds in memory. trigger()
+        starts a clip from that pre-roll and keeps appending frames until
+        post_roll seconds after the last trigger. Finished clips are written
+        by a separate thread as Motion-JPEG files (plain concatenated JPEGs,
+        playable with ffplay or VLC), and the oldest clips are deleted
+        whenever the directory grows past max_bytes. Neither thread touches
+        the capture or recognition loops.
+
+        Args:
+            source: Returns a copy of the newest frame, or None before the first one
+            directory: Where clips are written
+            camera: Camera name used in clip filenames
+            pre_roll: Seconds of footage kept from before a trigger
+            post_roll: Seconds recorded after the last trigger
+            max_clip: Longest a clip is extended by repeated triggers, in seconds
+            fps: Frames sampled per second
+            quality: JPEG quality of clip frames
+            max_bytes: Disk quota for the clip directory
+            encode: Function turning (frame, quality) into JPEG bytes
+        """
+        self.source = source
+        self.directory = directory
+        self.camera = camera
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.max_clip = max_clip
+        self.fps = fps
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.encode = encode
+        self.stats: Dict[str, int] = {"clips": 0, "frames": 0, "evicted": 0, "failed": 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._pre_roll = deque(maxlen=max(1, int(pre_roll * fps)))  # (monotonic time, JPEG bytes)
+        self._active: Optional[_Clip] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._finished = queue.Queue()
+        self._sizes = self._scan()  # clip path -> bytes, oldest first; writer thread only
+        self.bytes_used = sum(self._sizes.values())
+        self._threads: List[threading.Thread] = []
+
+    def _scan(self) -> "OrderedDict[str, int]":
+        paths = [os.path.join(self.directory, f) for f in os.listdir(self.directory)
+                 if f.endswith(CLIP_EXTENSION)]
+        paths.sort(key=os.path.getmtime)
+        return OrderedDict((path, os.path.getsize(path)) for path in paths)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._sample_loop, name=f"clip-sampler-{self.camera}", daemon=True),
+            threading.Thread(target=self._write_loop, name=f"clip-writer-{self.camera}", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop sampling, finish the clip being recorded and wait for pending writes."""
+        if not self._threads:
+            return
+        self._stop.set()
+        self._threads[0].join(timeout)
+        with self._lock:
+            clip, self._active = self._active, None
+        if clip is not None:
+            self._finished.put(clip)
+        self._finished.put(None)
+        self._threads[1].join(timeout)
+        self._threads = []
+
+    def trigger(self, event: DetectionEvent) -> str:
+        """
+        Start recording a clip for an event, or extend the one being recorded.
+
+        Returns:
+            Path the clip will be written to once its post-roll has passed
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._active is not None:
+                self._active.until = min(max(self._active.until, now + self.post_roll),
+                                         self._active.started + self.max_clip)
+                return self._active.path
+
+            stamp = datetime.fromtimestamp(event.timestamp).strftime("%Y%m%d_%H%M%S")
+            label = re.sub(r"[^\w-]", "_", "_".join(filter(None, (self.camera, event.identity))))
+            path = os.path.join(self.directory, f"{stamp}_{label}{CLIP_EXTENSION}")
+            frames = [jpeg for sampled, jpeg in self._pre_roll if sampled >= now - self.pre_roll]
+            self._active = _Clip(path, frames, now, now + self.post_roll)
+            return path
+
+    def _sample_loop(self) -> None:
+        interval = 1.0 / self.fps
+        next_sample = time.monotonic()
+        while not self._stop.wait(max(0.0, next_sample - time.monotonic())):
+            next_sample = max(next_sample + interval, time.monotonic())
+            frame = self.source()
+            if frame is None:
+                continue
+            try:
+                jpeg = self.encode(frame, self.quality)
+            except Exception as e:
+                logger.error(f"Failed to encode clip frame: {str(e)}")
+                continue
+
+            now = time.monotonic()
+            finished = None
+            with self._lock:
+                self._pre_roll.append((now, jpeg))
+                if self._active is not None:
+                    self._active.frames.append(jpeg)
+                    if now >= self._active.until:
+                        finished, self._active = self._active, None
+            if finished is not None:
+                self._finished.put(finished)
+
+    def _write_loop(self) -> None:
+        while True:
+            clip = self._finished.get()
+            if clip is None:
+                return
+            # Write under a temporary name so a notified path never shows a partial clip
+            partial = clip.path + ".part"
+            try:
+                with open(partial, 'wb') as f:
+                    for jpeg in clip.frames:
+                        f.write(jpeg)
+                os.replace(partial, clip.path)
+            except OSError as e:
+                self.stats["failed"] += 1
+                logger.error(f"Failed to write clip {clip.path}: {str(e)}")
+                continue
+            self.stats["clips"] += 1
+            self.stats["frames"] += len(clip.frames)
+            size = os.path.getsize(clip.path)
+            self.bytes_used += size - self._sizes.get(clip.path, 0)
+            self._sizes[clip.path] = size
+            self._enforce_quota(keep=clip.path)
+
+    def _enforce_quota(self, keep: str) -> None:
+        """Delete the oldest clips until the directory fits the quota, never the newest one."""
+        while self.bytes_used > self.max_bytes and len(self._sizes) > 1:
+            path, size = next(iter(self._sizes.items()))
+            if path == keep:
+                break
+            del self._sizes[path]
+            self.bytes_used -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.stats["evicted"] += 1
+
+    def recording(self) -> bool:
+        with self._lock:
+            return self._active is not None
+
+    def report(self) -> Dict[str, int]:
+        report = dict(self.stats)
+        report["bytes_used"] = self.bytes_used
+        report["pre_roll_frames"] = len(self._pre_roll)
+        return report
@@ -0,0 +1,37 @@
+import sys
+import os
+
+import numpy as np
+
+# Add the path to the benchmark module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import benchmark
+import recognition
+
+def stub_locations(image, number_of_times_to_upsample=1, model="hog"):
+    return [(100, 300, 300, 100)]
+
+def stub_encodings(image, known_face_locations=None, num_jitters=1):
+    return [np.zeros(128) for _ in known_face_locations or []]
+
+def test_synthetic_run_reports_every_stage():
+    face_recognition = recognition.face_recognition
+    originals = face_recognition.face_locations, face_recognition.face_encodings
+    face_recognition.face_locations, face_recognition.face_encodings = stub_locations, stub_encodings
+    try:
+        results = benchmark.main(["--synthetic", "--frames", "5", "--gallery-sizes", "0"])
+    finally:
+        face_recognition.face_locations, face_recognition.face_encodings = originals
+
+    run = results["runs"][0]["process_frame"]
+    assert run["frames"] == 5
+    assert run["faces_per_frame"] == 1.0
+    assert set(run["latency_ms"]) == set(benchmark.STAGES)
+    assert run["latency_ms"]["total"]["p95"] > 0
+    assert run["peak_traced_mb"] > 0
+
+# Run the tests
+if __name__ == "__main__":
+    test_synthetic_run_reports_every_stage()
+    print("Benchmark tests passed.")
@@ -0,0 +1,65 @@
+import sys
+import os
+import time
+
+# Add the path to the clip_recorder module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from clip_recorder import ClipRecorder
+from events import detection_event
+
+class CountingSource:
+    """Frame source returning an increasing frame number."""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+        return self.count
+
+def fake_encode(frame, quality):
+    return b"<%d>" % frame
+
+def test_clip_contains_pre_roll_and_post_roll(tmp_path):
+    recorder = ClipRecorder(CountingSource(), str(tmp_path), camera="front", pre_roll=0.2,
+                            post_roll=0.2, fps=50, encode=fake_encode)
+    recorder.start()
+    time.sleep(0.3)
+    path = recorder.trigger(detection_event("Unknown", 0.2))
+    assert os.path.dirname(path) == str(tmp_path)
+    assert "front_Unknown" in os.path.basename(path)
+    # A second trigger while recording extends the same clip
+    time.sleep(0.1)
+    assert recorder.trigger(detection_event("Unknown", 0.2)) == path
+    time.sleep(0.5)
+    recorder.stop()
+
+    with open(path, 'rb') as f:
+        frames = [int(chunk) for chunk in f.read().decode().strip("<>").split("><")]
+    assert frames == list(range(frames[0], frames[-1] + 1))
+    # Roughly 0.2s before the first trigger and 0.2s after the second, at 50 FPS
+    assert 20 <= len(frames) <= 30
+    assert recorder.stats["clips"] == 1
+
+def test_oldest_clips_are_evicted_past_quota(tmp_path):
+    recorder = ClipRecorder(CountingSource(), str(tmp_path), pre_roll=0.1, post_roll=0.05,
+                            fps=100, max_bytes=100, encode=lambda frame, quality: b"x" * 10)
+    recorder.start()
+    paths = []
+    for identity in ("Jason", "Mary", "Tom"):
+        time.sleep(0.15)
+        paths.append(recorder.trigger(detection_event(identity, 0.9)))
+        time.sleep(0.15)
+    recorder.stop()
+
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[-1])
+    assert recorder.stats["evicted"] >= 1
+
+# Run the tests
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_clip_contains_pre_roll_and_post_roll, test_oldest_clips_are_evicted_past_quota):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            test(tmp_dir)
+    print("Clip recorder tests passed.")
@@ -0,0 +1,87 @@
+import sys
+import os
+import tempfile
+import threading
+
+# Add the path to the control module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from control import ControlServer, send_command
+
+def test_commands_round_trip():
+    received = []
+
+    def handler(command):
+        received.append(command)
+        if command == "boom":
+            raise RuntimeError("bad command")
+        return f"ok {command}"
+
+    path = os.path.join(tempfile.mkdtemp(), "bot.sock")
+    server = ControlServer(path, handler)
+    server.start()
+    try:
+        # Only reachable through a directory closed to other users
+        assert os.stat(os.path.dirname(path)).st_mode & 0o077 == 0
+        assert send_command("register Jason", path) == "ok register Jason"
+        assert send_command("boom", path) == "error: bad command"
+    finally:
+        server.stop()
+
+    assert received == ["register Jason", "boom"]
+    assert not os.path.exists(path)
+
+def test_socket_directory_is_created_private_and_other_files_are_left_alone():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bot", "control.sock")
+    server = ControlServer(path, lambda command: "ok")
+    server.start()
+    server.stop()
+    assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+
+    # A regular file where the socket should go is not deleted
+    with open(path, 'w') as f:
+        f.write("keep me")
+    try:
+        ControlServer(path, lambda command: "ok").start()
+        assert False, "start() replaced a regular file"
+    except FileExistsError:
+        pass
+    assert open(path).read() == "keep me"
+
+    # Nor is a directory others can enter used
+    shared = os.path.join(directory, "shared")
+    os.mkdir(shared)
+    os.chmod(shared, 0o755)
+    try:
+        ControlServer(os.path.join(shared, "control.sock"), lambda command: "ok").start()
+        assert False, "start() used a directory others can enter"
+    except PermissionError:
+        pass
+
+def test_slow_command_does_not_hold_up_other_connections():
+    release = threading.Event()
+
+    def handler(command):
+        if command == "profile 60":
+            release.wait(5)
+        return f"ok {command}"
+
+    path = os.path.join(tempfile.mkdtemp(), "bot.sock")
+    server = ControlServer(path, handler)
+    server.start()
+    slow = threading.Thread(target=send_command, args=("profile 60", path))
+    slow.start()
+    try:
+        assert send_command("status", path, timeout=2) == "ok status"
+    finally:
+        release.set()
+        slow.join()
+        server.stop()
+
+# Run the tests
+if __name__ == "__main__":
+    test_commands_round_trip()
+    test_socket_directory_is_created_private_and_other_files_are_left_alone()
+    test_slow_command_does_not_hold_up_other_connections()
+    print("Control tests passed.")
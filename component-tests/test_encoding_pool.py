@@ -0,0 +1,52 @@
+import sys
+import os
+
+import numpy as np
+
+# Add the path to the encoding_pool module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from encoding_pool import EncodingPool, crop_box
+
+def test_crop_box_pads_face_and_keeps_it_aligned():
+    crop, face = crop_box((100, 200, 200, 100), (480, 640, 3), margin=0.3)
+    assert crop == (70, 230, 230, 70)
+    assert face == (30, 130, 130, 30)
+
+def test_crop_box_clamps_to_frame_edges():
+    crop, face = crop_box((0, 640, 100, 560), (480, 640, 3), margin=0.5)
+    top, right, bottom, left = crop
+    assert (top, right) == (0, 640)
+    assert bottom == 150 and left == 520
+    # The face sits at the same frame position inside the clamped crop
+    assert (face[0] + top, face[1] + left, face[2] + top, face[3] + left) == (0, 640, 100, 560)
+
+def mean_encoder(image, boxes, num_jitters=1):
+    """Stands in for face_recognition.face_encodings: each face's mean pixel value plus num_jitters."""
+    return [np.full(128, image[top:bottom, left:right].mean() + num_jitters)
+            for top, right, bottom, left in boxes]
+
+def test_encodings_round_trip_through_reused_shared_memory():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame[100:200, 100:200] = 50
+    frame[250:350, 400:500] = 90
+    pool = EncodingPool(2, encoder=mean_encoder)
+    try:
+        for _ in range(3):
+            encodings = pool.encode(frame, [(100, 200, 200, 100), (250, 500, 350, 400)])
+            assert [float(encoding[0]) for encoding in encodings] == [51.0, 91.0]
+        # One segment served every frame
+        assert len(pool._segments) == 1
+        name = pool._segments[0].name
+        assert pool.encode(frame, [(100, 200, 200, 100)], num_jitters=3)[0][0] == 53.0
+        assert pool._segments[0].name == name
+    finally:
+        pool.close()
+    assert pool._segments == []
+
+# Run the tests
+if __name__ == "__main__":
+    test_crop_box_pads_face_and_keeps_it_aligned()
+    test_crop_box_clamps_to_frame_edges()
+    test_encodings_round_trip_through_reused_shared_memory()
+    print("Encoding pool tests passed.")
@@ -0,0 +1,86 @@
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Add the path to the enroll module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import enroll
+from enroll import Candidate, collect_sources, frontalness, quality_score, select_samples
+from face_store import FaceEncodingStore
+from gallery import person_name
+
+def _candidate(score):
+    return Candidate("Jason", "a.jpg", np.zeros((1, 1, 3), dtype=np.uint8), (0, 1, 1, 0), 0.0, 0, 0.0, score)
+
+def _encoding(seed):
+    rng = np.random.default_rng(seed)
+    vector = rng.normal(size=128)
+    return vector / np.linalg.norm(vector)
+
+def test_frontal_face_scores_higher_than_turned_face():
+    frontal = {"left_eye": [(40, 50), (50, 50)], "right_eye": [(70, 50), (80, 50)], "nose_tip": [(60, 70)]}
+    turned = {"left_eye": [(40, 50), (50, 50)], "right_eye": [(70, 50), (80, 50)], "nose_tip": [(75, 70)]}
+    assert frontalness(frontal) == 1.0
+    assert frontalness(turned) < 0.5
+
+def test_quality_score_penalizes_blur_and_small_faces():
+    assert quality_score(200.0, 200, 1.0) == 1.0
+    assert quality_score(50.0, 200, 1.0) == 0.5
+    assert quality_score(200.0, 75, 1.0) == 0.5
+
+def test_collect_sources_groups_files_by_person_folder(tmp_path):
+    for person, files in {"Jason": ["a.jpg", "clip.mp4", "notes.txt"], "Mary": ["b.png"], "Empty": []}.items():
+        (tmp_path / person).mkdir()
+        for name in files:
+            (tmp_path / person / name).write_bytes(b"")
+    sources = collect_sources([str(tmp_path)])
+    assert sorted(sources) == ["Jason", "Mary"]
+    assert [os.path.basename(f) for f in sources["Jason"]] == ["a.jpg", "clip.mp4"]
+    assert collect_sources([str(tmp_path / "Mary")], name="Maria") == {"Maria": [str(tmp_path / "Mary" / "b.png")]}
+
+def test_select_samples_keeps_best_distinct_faces():
+    base, other = _encoding(1), _encoding(2)
+    candidates = [_candidate(0.5), _candidate(0.9), _candidate(0.8), _candidate(0.7)]
+    encodings = [other, base, base + 0.001, None]
+    chosen, duplicates = select_samples(candidates, encodings, max_samples=5)
+    assert chosen == [1, 0]
+    assert duplicates == 1
+
+def test_select_samples_skips_faces_already_in_gallery():
+    base = _encoding(1)
+    chosen, duplicates = select_samples([_candidate(0.9)], [base], existing=np.asarray([base]))
+    assert chosen == [] and duplicates == 1
+
+def test_enrolled_sample_names_map_to_person():
+    assert person_name("Jason_20240101_120000_3") == "Jason"
+
+def test_enroll_stores_good_files_when_one_is_corrupt(tmp_path, monkeypatch):
+    def score_image(path, person, min_face_size):
+        if path.endswith("corrupt.jpg"):
+            raise OSError("cannot identify image file")
+        return [Candidate(person, path, np.zeros((10, 10, 3), dtype=np.uint8), (0, 10, 10, 0), 200.0, 200, 1.0, 1.0)]
+
+    # Score and encode in threads so the stubs replace the face models
+    monkeypatch.setattr(enroll, "process_pool", lambda processes: ThreadPoolExecutor(processes))
+    monkeypatch.setattr(enroll, "_score_image", score_image)
+    monkeypatch.setattr(enroll, "_encode_candidate", lambda crop, box: _encoding(1))
+    known_faces = tmp_path / "known_faces"
+    sources = {"Jason": [str(tmp_path / "corrupt.jpg"), str(tmp_path / "door.jpg")]}
+
+    report = enroll.enroll(sources, str(known_faces), processes=2)
+    assert report["Jason"]["failed"] == 1
+    assert report["Jason"]["kept"] == 1
+    names = FaceEncodingStore(str(known_faces)).names()
+    assert [person_name(name) for name in names] == ["Jason"]
+
+# Run the tests
+if __name__ == "__main__":
+    test_frontal_face_scores_higher_than_turned_face()
+    test_quality_score_penalizes_blur_and_small_faces()
+    test_select_samples_keeps_best_distinct_faces()
+    test_select_samples_skips_faces_already_in_gallery()
+    test_enrolled_sample_names_map_to_person()
+    print("Enrollment tests passed.")
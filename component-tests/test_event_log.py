@@ -0,0 +1,78 @@
+import sys
+import os
+import sqlite3
+import time
+
+# Add the path to the event_log module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from event_log import EventLog
+from events import EVENT_UNKNOWN, detection_event
+
+def test_events_are_batched_off_the_calling_thread(tmp_path):
+    log = EventLog(str(tmp_path / "events.db"), commit_interval=60)
+    start = time.perf_counter()
+    for i in range(1000):
+        log.record(detection_event("Jason", 0.9, timestamp=1000.0 + i, camera="front", location=(1, 2, 3, 4)))
+    assert time.perf_counter() - start < 0.5
+    assert log.flush(timeout=5)
+    assert log.count() == 1000
+    assert log.written == 1000
+    log.close()
+
+def test_time_range_and_arrivals(tmp_path):
+    log = EventLog(str(tmp_path / "events.db"))
+    log.record(detection_event("Jason", 0.9, timestamp=100.0, camera="front", location=(10, 60, 60, 10)))
+    log.record(detection_event("Mary", 0.8, timestamp=200.0, camera="back"))
+    log.record(detection_event("Unknown", 0.1, timestamp=250.0, camera="front"), snapshot="clips/1.jpg")
+    log.record(detection_event("Jason", 0.95, timestamp=300.0, camera="back"))
+    log.flush(timeout=5)
+
+    events = log.between(150.0, 400.0)
+    assert [e.event.identity for e in events] == ["Mary", "Jason"]
+    unknown = log.between(0.0, 400.0, event_type=EVENT_UNKNOWN)
+    assert unknown[0].snapshot == "clips/1.jpg"
+    first = log.between(0.0, 150.0, identity="Jason")[0].event
+    assert first.location == (10, 60, 60, 10) and first.camera == "front"
+    assert log.arrivals(0.0, 1000.0) == {"Jason": 100.0, "Mary": 200.0}
+    log.close()
+
+def test_last_seen_tracks_latest_arrival(tmp_path):
+    path = str(tmp_path / "events.db")
+    log = EventLog(path)
+    log.record(detection_event("Jason", 0.9, timestamp=300.0, camera="back"))
+    log.record(detection_event("Jason", 0.9, timestamp=100.0, camera="front"))
+    log.record(detection_event("Unknown", 0.1, timestamp=400.0))
+    log.close()
+
+    # Reopening keeps what was written
+    log = EventLog(path)
+    last_seen = log.last_seen()
+    assert list(last_seen) == ["Jason"]
+    assert last_seen["Jason"].event.timestamp == 300.0
+    assert last_seen["Jason"].event.camera == "back"
+    assert log.last_seen("Mary") == {}
+    log.close()
+
+def test_time_range_queries_use_an_index(tmp_path):
+    log = EventLog(str(tmp_path / "events.db"))
+    log.close()
+    queries = [
+        "SELECT * FROM events WHERE timestamp >= 0 AND timestamp < 1 ORDER BY timestamp",
+        "SELECT * FROM events WHERE timestamp >= 0 AND timestamp < 1 AND event_type = 'arrival' ORDER BY timestamp",
+        "SELECT * FROM events WHERE timestamp >= 0 AND timestamp < 1 AND identity = 'Jason' ORDER BY timestamp",
+    ]
+    with sqlite3.connect(log.path) as db:
+        for query in queries:
+            plan = " ".join(row[-1] for row in db.execute("EXPLAIN QUERY PLAN " + query))
+            assert "SEARCH events USING INDEX" in plan, plan
+
+# Run the tests
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    for test in (test_events_are_batched_off_the_calling_thread, test_time_range_and_arrivals,
+                 test_last_seen_tracks_latest_arrival, test_time_range_queries_use_an_index):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            test(Path(tmp_dir))
+    print("Event log tests passed.")
@@ -0,0 +1,57 @@
+import sys
+import os
+
+# Add the path to the events module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from events import EVENT_ARRIVAL, EVENT_UNKNOWN, EventDeduplicator, detection_event
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_repeat_events_are_suppressed_within_window():
+    clock = FakeClock()
+    dedup = EventDeduplicator({EVENT_ARRIVAL: 60, EVENT_UNKNOWN: 10}, clock=clock)
+    assert dedup.should_emit(detection_event("Jason"))
+    assert not dedup.should_emit(detection_event("jason"))
+    assert dedup.should_emit(detection_event("Unknown"))
+
+    clock.now = 30
+    assert dedup.should_emit(detection_event("Unknown"))
+    assert not dedup.should_emit(detection_event("Jason"))
+
+    clock.now = 61
+    assert dedup.should_emit(detection_event("Jason"))
+    assert dedup.suppressed == {EVENT_ARRIVAL: 2}
+
+def test_memory_is_bounded():
+    clock = FakeClock()
+    dedup = EventDeduplicator(default_window=60, max_identities=10, clock=clock)
+    for i in range(100):
+        dedup.should_emit(detection_event(f"Visitor{i}"))
+    assert len(dedup) == 10
+
+    # Identities whose window has passed are forgotten
+    clock.now = 120
+    dedup.should_emit(detection_event("Jason"))
+    assert len(dedup) == 1
+
+def test_unknown_people_are_throttled_per_camera():
+    dedup = EventDeduplicator({EVENT_ARRIVAL: 60, EVENT_UNKNOWN: 60}, clock=FakeClock())
+    assert dedup.should_emit(detection_event("Unknown", camera="front"))
+    assert dedup.should_emit(detection_event("Unknown", camera="back"))
+    assert not dedup.should_emit(detection_event("Unknown", camera="front"))
+    # A known person is welcomed once, whichever door they use
+    assert dedup.should_emit(detection_event("Jason", camera="front"))
+    assert not dedup.should_emit(detection_event("Jason", camera="back"))
+
+# Run the tests
+if __name__ == "__main__":
+    test_repeat_events_are_suppressed_within_window()
+    test_memory_is_bounded()
+    test_unknown_people_are_throttled_per_camera()
+    print("Event tests passed.")
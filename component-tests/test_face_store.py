@@ -0,0 +1,130 @@
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add the path to the face_store module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from face_store import INDEX_FILENAME, FaceEncodingStore
+
+class FakeEncoder:
+    """Encodes an image as its first byte repeated; an image starting with 0 has no face."""
+    def __init__(self):
+        self.encoded = []
+
+    def __call__(self, paths):
+        self.encoded.extend(os.path.basename(path) for path in paths)
+        encodings = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                value = f.read(1)[0]
+            encodings.append(np.full(128, value / 255) if value else None)
+        return encodings
+
+def write_image(directory, filename, value, mtime_ns=None):
+    path = os.path.join(directory, filename)
+    with open(path, 'wb') as f:
+        f.write(bytes([value]) * 16)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def matrix_files(directory):
+    return sorted(f for f in os.listdir(directory) if f.startswith(".encodings-"))
+
+def test_unchanged_images_are_served_from_the_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        write_image(directory, "Alice.jpg", 10)
+        write_image(directory, "Bob.jpg", 20)
+        write_image(directory, "nobody.jpg", 0)
+        encoder = FakeEncoder()
+        store = FaceEncodingStore(directory)
+        assert store.sync(encoder)
+        assert sorted(encoder.encoded) == ["Alice.jpg", "Bob.jpg", "nobody.jpg"]
+        assert store.names() == ["Alice", "Bob"]
+
+        # A fresh store (a restart) reads the cache and encodes nothing
+        encoder = FakeEncoder()
+        restarted = FaceEncodingStore(directory)
+        assert not restarted.sync(encoder)
+        assert encoder.encoded == []
+        assert restarted.names() == ["Alice", "Bob"]
+        assert np.allclose(restarted.encodings()[1], 20 / 255)
+        assert len(matrix_files(directory)) == 1
+
+def test_changed_and_deleted_images_are_picked_up():
+    with tempfile.TemporaryDirectory() as directory:
+        write_image(directory, "Alice.jpg", 10, mtime_ns=1_000_000_000)
+        write_image(directory, "Bob.jpg", 20)
+        store = FaceEncodingStore(directory)
+        store.sync(FakeEncoder())
+
+        write_image(directory, "Alice.jpg", 30, mtime_ns=2_000_000_000)
+        os.unlink(os.path.join(directory, "Bob.jpg"))
+        encoder = FakeEncoder()
+        assert store.sync(encoder)
+        assert encoder.encoded == ["Alice.jpg"]
+        assert store.names() == ["Alice"]
+        assert np.allclose(store.encodings()[0], 30 / 255)
+        # The replaced matrix file is gone
+        assert len(matrix_files(directory)) == 1
+
+def test_corrupt_index_is_rebuilt_and_stray_files_are_swept():
+    with tempfile.TemporaryDirectory() as directory:
+        write_image(directory, "Alice.jpg", 10)
+        FaceEncodingStore(directory).sync(FakeEncoder())
+        # A crashed writer's matrix and temp index
+        np.save(os.path.join(directory, ".encodings-deadbeef0000.npy"), np.zeros((1, 128)))
+        write_image(directory, ".encodings-abc.tmp", 1)
+        with open(os.path.join(directory, INDEX_FILENAME), 'w') as f:
+            f.write("{not json")
+
+        encoder = FakeEncoder()
+        store = FaceEncodingStore(directory)
+        assert matrix_files(directory) == []
+        assert store.sync(encoder)
+        assert encoder.encoded == ["Alice.jpg"]
+        assert store.names() == ["Alice"]
+        assert len(matrix_files(directory)) == 1
+
+def test_lock_is_reentrant_within_a_store():
+    with tempfile.TemporaryDirectory() as directory:
+        write_image(directory, "Alice.jpg", 10)
+        store = FaceEncodingStore(directory)
+        with store.locked():
+            store.put("Alice.jpg", "Alice", np.full(128, 0.5))
+        assert store.names() == ["Alice"]
+
+def test_sync_picks_up_entries_another_writer_added():
+    with tempfile.TemporaryDirectory() as directory:
+        write_image(directory, "Alice.jpg", 10)
+        bot = FaceEncodingStore(directory)
+        bot.sync(FakeEncoder())
+
+        # enroll.py writes an image and caches its encoding through its own store
+        write_image(directory, "Bob_20240101_120000_0.jpg", 20)
+        FaceEncodingStore(directory).put_many([("Bob_20240101_120000_0.jpg", "Bob_20240101_120000_0",
+                                                np.full(128, 0.5))])
+
+        encoder = FakeEncoder()
+        assert not bot.sync(encoder)
+        assert encoder.encoded == []
+        assert bot.names() == ["Alice", "Bob_20240101_120000_0"]
+        assert np.allclose(bot.encodings()[1], 0.5)
+
+        # The bot's next write keeps the other writer's entry and leaves no orphaned matrix
+        write_image(directory, "Carol.jpg", 30)
+        assert bot.sync(encoder)
+        assert encoder.encoded == ["Carol.jpg"]
+        assert bot.names() == ["Alice", "Bob_20240101_120000_0", "Carol"]
+        assert len(matrix_files(directory)) == 1
+
+# Run the tests
+if __name__ == "__main__":
+    test_unchanged_images_are_served_from_the_cache()
+    test_changed_and_deleted_images_are_picked_up()
+    test_corrupt_index_is_rebuilt_and_stray_files_are_swept()
+    test_lock_is_reentrant_within_a_store()
+    test_sync_picks_up_entries_another_writer_added()
+    print("Face store tests passed.")
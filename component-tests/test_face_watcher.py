@@ -0,0 +1,53 @@
+import sys
+import os
+import threading
+import time
+
+# Add the path to the face_watcher module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from face_watcher import DirectoryWatcher
+
+def _watch(path, **options):
+    changed = threading.Event()
+    watcher = DirectoryWatcher(str(path), changed.set, debounce=0.1, poll_interval=0.1, **options)
+    watcher.start()
+    return watcher, changed
+
+def _check_reports_image_changes(tmp_path, **options):
+    watcher, changed = _watch(tmp_path, **options)
+    try:
+        # The encoding cache is written next to the images and must not count
+        (tmp_path / ".encodings.json").write_text("{}")
+        assert not changed.wait(0.5)
+
+        for i in range(5):
+            (tmp_path / f"Jason_{i}.jpg").write_bytes(b"jpeg")
+        assert changed.wait(3)
+        time.sleep(0.5)
+        # The burst of copies was reported once
+        assert watcher.changes == 1
+
+        changed.clear()
+        os.remove(tmp_path / "Jason_0.jpg")
+        assert changed.wait(3)
+    finally:
+        watcher.stop()
+    return watcher
+
+def test_inotify_reports_image_changes(tmp_path):
+    watcher = _check_reports_image_changes(tmp_path)
+    assert sys.platform != "linux" or watcher.changes == 2
+
+def test_polling_reports_image_changes(tmp_path):
+    watcher = _check_reports_image_changes(tmp_path, use_inotify=False)
+    assert watcher.mode == "polling"
+
+# Run the tests
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    for test in (test_inotify_reports_image_changes, test_polling_reports_image_changes):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            test(Path(tmp_dir))
+    print("Face watcher tests passed.")
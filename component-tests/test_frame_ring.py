@@ -0,0 +1,107 @@
+import sys
+import os
+import time
+import numpy as np
+
+# Add the path to the frame_ring module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from frame_ring import FrameRing, ScratchBuffers
+from pipeline import RecognitionPipeline
+
+class ArrayCapture:
+    """Camera stand-in that decodes numbered frames into the caller's buffer."""
+    def __init__(self, frames=100):
+        self.frames = frames
+        self.index = 0
+
+    def read(self, image=None):
+        if self.index >= self.frames:
+            return False, None
+        time.sleep(0.005)
+        self.index += 1
+        if image is None:
+            image = np.empty((4, 4, 3), dtype=np.uint8)
+        image[...] = self.index % 256
+        return True, image
+
+class RecordingFaceSystem:
+    def __init__(self):
+        self.frames = []
+
+    def process_frame(self, frame, motion_detected=False, roi=None):
+        time.sleep(0.02)
+        self.frames.append(int(frame[0, 0, 0]))
+        return [], []
+
+def test_slot_is_reused_only_after_last_release():
+    ring = FrameRing(2, (4, 4, 3))
+    try:
+        first = ring.acquire()
+        ring.retain(first)
+        second = ring.acquire()
+        assert ring.acquire(timeout=0) is None
+        assert ring.exhausted == 1
+
+        ring.release(first)
+        assert ring.acquire(timeout=0) is None
+        ring.release(first)
+        assert ring.acquire(timeout=0) == first
+        assert ring.in_use() == 2
+        ring.release(second)
+    finally:
+        ring.close()
+
+def test_other_process_view_sees_written_frames():
+    ring = FrameRing(2, (4, 4, 3))
+    reader = FrameRing(2, (4, 4, 3), name=ring.name)
+    try:
+        slot = ring.acquire()
+        ring.frame(slot)[...] = 7
+        assert (reader.frame(slot) == 7).all()
+    finally:
+        reader.close()
+        ring.close()
+
+def test_pipeline_captures_into_ring_without_leaking_slots():
+    face_system = RecordingFaceSystem()
+    pipeline = RecognitionPipeline(ArrayCapture(), face_system, frame_ring=True)
+    pipeline.start()
+
+    rendered = []
+    display = None
+    while True:
+        frame = pipeline.next_frame(timeout=1.0, out=display)
+        if frame is None:
+            break
+        display = frame
+        rendered.append(int(frame[0, 0, 0]))
+    report = pipeline.report()
+    pipeline.stop()
+
+    assert report["capture"]["frames"] == 100
+    assert report["frame_ring"]["slots"] == pipeline.frame_ring_slots
+    # Only the latest frame and any frame still being recognized are held
+    assert report["frame_ring"]["in_use"] <= 1 + pipeline.recognition_workers
+    assert rendered == sorted(rendered)
+    assert face_system.frames == sorted(face_system.frames)
+    assert pipeline.frame_ring is None
+
+def test_scratch_buffers_grow_only_for_larger_shapes():
+    buffers = ScratchBuffers()
+    first = buffers.get("crop", (40, 40, 3))
+    larger = buffers.get("crop", (80, 60, 3))
+    smaller = buffers.get("crop", (20, 20, 3))
+    assert smaller.shape == (20, 20, 3) and smaller.flags["C_CONTIGUOUS"]
+    # The smaller view shares the buffer the larger shape allocated
+    assert np.shares_memory(smaller, larger) and not np.shares_memory(first, larger)
+    buffers.get("gray", (10, 10))
+    assert buffers.nbytes == 80 * 60 * 3 + 10 * 10
+
+# Run the tests
+if __name__ == "__main__":
+    test_slot_is_reused_only_after_last_release()
+    test_other_process_view_sees_written_frames()
+    test_pipeline_captures_into_ring_without_leaking_slots()
+    test_scratch_buffers_grow_only_for_larger_shapes()
+    print("Frame ring tests passed.")
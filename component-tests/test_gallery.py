@@ -0,0 +1,113 @@
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Add the path to the gallery module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gallery import GalleryIndex, IVFGalleryIndex, person_name
+
+def _encoding(seed):
+    rng = np.random.default_rng(seed)
+    vector = rng.normal(size=128)
+    return vector / np.linalg.norm(vector)
+
+def _clustered(people, per_person=3):
+    """Synthetic gallery with distinct people ~1.0 apart, plus one new sighting of each."""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(scale=1 / 16, size=(people, 128))
+    encodings = np.repeat(centers, per_person, axis=0) + rng.normal(scale=0.02, size=(people * per_person, 128))
+    names = [f"Person{i}_20240101_120000_{j}" for i in range(people) for j in range(per_person)]
+    return encodings, names, centers + rng.normal(scale=0.02, size=centers.shape)
+
+def test_person_name_strips_timestamp():
+    assert person_name("Jason_20240101_120000") == "Jason"
+    assert person_name("Mary_Ann") == "Mary_Ann"
+
+def test_match_returns_nearest_person_not_first():
+    jason, mary = _encoding(1), _encoding(2)
+    # Mary's entry comes first but the probe is closer to Jason
+    gallery = GalleryIndex([mary, jason], ["Mary_20240101_120000", "Jason_20240101_120000"])
+    probe = jason + 0.01
+    match = gallery.match([probe])[0]
+    assert match.name == "Jason"
+    assert match.distance < 0.2
+    assert match.confidence > 0.9
+
+def test_batched_match_aggregates_multiple_entries():
+    jason = _encoding(1)
+    gallery = GalleryIndex(
+        [_encoding(3), jason, _encoding(4)],
+        ["Jason_20240101_120000", "Jason_20240102_120000", "Mary_20240101_120000"],
+    )
+    assert gallery.entry_counts() == {"Jason": 2, "Mary": 1}
+    matches = gallery.match([jason, _encoding(5)])
+    assert [m.name for m in matches] == ["Jason", "Unknown"]
+
+def test_empty_gallery_reports_unknown():
+    assert GalleryIndex().match([_encoding(1)])[0].name == "Unknown"
+
+def test_ivf_index_agrees_with_exact_search():
+    encodings, names, probes = _clustered(400)
+    exact = GalleryIndex(encodings, names)
+    ivf = IVFGalleryIndex(encodings, names, min_train_size=0, nprobe=8)
+    assert ivf.trained
+    for aggregation in ("min", "mean"):
+        exact.aggregation = ivf.aggregation = aggregation
+        expected = [m.name for m in exact.match(probes)]
+        found = [m.name for m in ivf.match(probes)]
+        assert np.mean([a == b for a, b in zip(found, expected)]) > 0.95
+        assert ivf.match([probes[7]])[0].name == "Person7"
+
+def test_ivf_index_uses_exact_search_below_training_size():
+    encodings, names, probes = _clustered(10)
+    ivf = IVFGalleryIndex(encodings, names)
+    assert not ivf.trained
+    assert ivf.match([probes[3]])[0].name == "Person3"
+
+def test_ivf_centroids_persist_and_survive_inserts():
+    encodings, names, probes = _clustered(200)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "ivf.npz")
+        ivf = IVFGalleryIndex(encodings, names, min_train_size=0, index_path=path)
+        assert os.path.exists(path)
+        reloaded = IVFGalleryIndex(encodings, names, min_train_size=0, index_path=path)
+        assert np.allclose(reloaded.centroids, ivf.centroids)
+
+    newcomer = _encoding(9) / 16
+    grown = ivf.with_entry(newcomer, "Newcomer_20240101_120000")
+    assert len(grown) == len(ivf) + 1
+    assert grown.centroids is ivf.centroids
+    assert grown.match([newcomer])[0].name == "Newcomer"
+    assert ivf.match([newcomer])[0].name != "Newcomer"
+
+def test_truncated_ivf_file_is_retrained():
+    encodings, names, probes = _clustered(200)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "ivf.npz")
+        IVFGalleryIndex(encodings, names, min_train_size=0, index_path=path)
+        # A crash mid-write leaves half a file
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(data[:len(data) // 2])
+
+        ivf = IVFGalleryIndex(encodings, names, min_train_size=0, index_path=path)
+        assert ivf.trained
+        assert ivf.match([probes[3]])[0].name == "Person3"
+        # The retrained centroids replaced the broken file, with no temp file left behind
+        assert os.listdir(tmp_dir) == ["ivf.npz"]
+        assert np.allclose(IVFGalleryIndex(index_path=path).centroids, ivf.centroids)
+
+# Run the tests
+if __name__ == "__main__":
+    test_person_name_strips_timestamp()
+    test_match_returns_nearest_person_not_first()
+    test_batched_match_aggregates_multiple_entries()
+    test_empty_gallery_reports_unknown()
+    test_ivf_index_agrees_with_exact_search()
+    test_ivf_index_uses_exact_search_below_training_size()
+    test_ivf_centroids_persist_and_survive_inserts()
+    test_truncated_ivf_file_is_retrained()
+    print("Gallery tests passed.")
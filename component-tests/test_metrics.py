@@ -0,0 +1,91 @@
+import sys
+import os
+import threading
+import time
+import urllib.request
+
+# Add the path to the metrics module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metrics import MetricsRegistry, MetricsServer
+from profiler import SamplingProfiler
+
+def test_nothing_is_recorded_until_enabled():
+    registry = MetricsRegistry()
+    frames = registry.counter("frames_total", "Frames", ("camera",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    frames.inc(labels="front")
+    latency.observe(0.05)
+    assert frames.values() == {}
+
+    registry.enabled = True
+    frames.inc(labels="front")
+    frames.inc(2, labels="front")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5.0)
+    text = registry.render()
+    assert 'frames_total{camera="front"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    assert "# TYPE latency_seconds histogram" in text
+
+def test_callback_metrics_are_read_at_scrape_time():
+    registry = MetricsRegistry()
+    stats = {"sent": 0, "failed": 0}
+    registry.counter("notifications_total", "Notifications", ("result",), fn=lambda: dict(stats))
+    registry.gauge("queue_depth", "Queue", fn=lambda: 4)
+    stats["sent"] = 7
+    text = registry.render()
+    assert 'notifications_total{result="sent"} 7' in text
+    assert "queue_depth 4" in text
+    # Registering the name again returns the same metric with the new callback
+    registry.gauge("queue_depth", "Queue", fn=lambda: 5)
+    assert "queue_depth 5" in registry.render()
+
+def test_server_serves_metrics_and_profiles():
+    registry = MetricsRegistry()
+    frames = registry.counter("frames_total", "Frames")
+    server = MetricsServer(registry, port=0, profiler=SamplingProfiler(interval=0.001))
+    server.start()
+    try:
+        assert registry.enabled
+        frames.inc()
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            assert "frames_total 1" in response.read().decode()
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/profile?seconds=0.05") as response:
+            assert "samples over" in response.read().decode()
+    finally:
+        server.stop()
+    assert not registry.enabled
+
+def _busy_recognizer(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+def test_profiler_finds_the_busy_function():
+    stop = threading.Event()
+    thread = threading.Thread(target=_busy_recognizer, args=(stop,), name="recognition-0")
+    thread.start()
+    try:
+        time.sleep(0.05)
+        profile = SamplingProfiler(interval=0.001, threads=("recognition",)).profile(0.3)
+    finally:
+        stop.set()
+        thread.join()
+    assert profile.samples > 10
+    assert all(stack[0] == "recognition-0" for stack in profile.stacks)
+    # Which frame is innermost varies from run to run, but the loop is on every stack
+    assert all(any(function.startswith("_busy_recognizer") for function in stack[1:])
+               for stack in profile.stacks)
+    assert "_busy_recognizer" in profile.collapsed()
+
+# Run the tests
+if __name__ == "__main__":
+    test_nothing_is_recorded_until_enabled()
+    test_callback_metrics_are_read_at_scrape_time()
+    test_server_serves_metrics_and_profiles()
+    test_profiler_finds_the_busy_function()
+    print("Metrics tests passed.")
@@ -0,0 +1,63 @@
+import sys
+import os
+
+import numpy as np
+
+# Add the path to the motion module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from motion import MotionGate
+
+def blank_frame():
+    return np.zeros((360, 640, 3), dtype=np.uint8)
+
+def frame_with_visitor():
+    frame = blank_frame()
+    frame[80:200, 240:400] = 255
+    return frame
+
+def test_idle_frames_are_gated_after_the_hold():
+    gate = MotionGate(hold_frames=2)
+    results = [gate.check(blank_frame()) for _ in range(6)]
+    # The first frame starts the background and counts as motion
+    assert results[0].active and results[0].onset
+    assert [r.active for r in results[1:]] == [True, True, False, False, False]
+    assert gate.report() == {"frames_gated": 3, "frames_processed": 3, "gated_ratio": 0.5}
+
+def test_motion_onset_after_idle_and_hold_expiry():
+    gate = MotionGate(hold_frames=3, learning_rate=0.01, crop_to_roi=True)
+    for _ in range(5):
+        gate.check(blank_frame())
+    assert not gate.check(blank_frame()).active
+
+    first = gate.check(frame_with_visitor())
+    assert first.active and first.onset
+    top, right, bottom, left = first.roi
+    assert top <= 80 and left <= 240 and bottom >= 200 and right >= 400
+    second = gate.check(frame_with_visitor())
+    assert second.active and not second.onset
+
+    # The visitor leaves: recognition stays on for hold_frames, then stops
+    after = [gate.check(blank_frame()).active for _ in range(5)]
+    assert after == [True, True, True, False, False]
+
+def test_roi_is_padded_scaled_and_clamped():
+    gate = MotionGate(roi_padding=0.25)
+    mask = np.zeros((90, 160), dtype=np.uint8)
+    mask[20:40, 10:30] = 255
+    # 20x20 thumbnail pixels padded by 5 on each side, at 4 frame pixels per thumbnail pixel
+    assert gate._roi(mask, (360, 640, 3)) == (60, 140, 180, 20)
+
+    mask[:] = 0
+    mask[0:20, 0:20] = 255
+    assert gate._roi(mask, (360, 640, 3))[0::3] == (0, 0)
+    mask[:] = 0
+    mask[80:90, 150:160] = 255
+    assert gate._roi(mask, (360, 640, 3))[1:3] == (640, 360)
+
+# Run the tests
+if __name__ == "__main__":
+    test_idle_frames_are_gated_after_the_hold()
+    test_motion_onset_after_idle_and_hold_expiry()
+    test_roi_is_padded_scaled_and_clamped()
+    print("Motion tests passed.")
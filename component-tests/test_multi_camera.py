@@ -0,0 +1,89 @@
+import sys
+import os
+import threading
+import time
+
+# Add the path to the multi camera module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from multi_camera import MultiCameraPipeline
+
+class FakeCapture:
+    """Camera stand-in producing numbered frames at roughly 100 FPS."""
+    def __init__(self, source):
+        self.source = source
+        self.index = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        time.sleep(0.01)
+        self.index += 1
+        return True, [self.index]
+
+    def release(self):
+        pass
+
+class SharedFaceSystem:
+    """Recognizer shared by all cameras that records which stream each frame belonged to."""
+    def __init__(self):
+        self.processed = []
+        self.in_flight = set()
+        self.overlapped = False
+        self.lock = threading.Lock()
+
+    def new_stream(self, camera):
+        return camera
+
+    def process_frame(self, frame, motion_detected=False, roi=None, stream=None):
+        with self.lock:
+            if stream in self.in_flight:
+                self.overlapped = True
+            self.in_flight.add(stream)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight.discard(stream)
+            self.processed.append(stream)
+        return [stream], [(0, 10, 10, 0)]
+
+def test_cameras_share_workers_fairly():
+    face_system = SharedFaceSystem()
+    pipeline = MultiCameraPipeline(
+        face_system, {"front": 0, "back": 1, "garage": 2}, workers=2, open_capture=FakeCapture)
+    pipeline.start()
+    time.sleep(1.0)
+    pipeline.stop()
+
+    counts = {name: face_system.processed.count(name) for name in ("front", "back", "garage")}
+    assert min(counts.values()) > 0.6 * max(counts.values())
+    # A camera's frames are never processed concurrently
+    assert not face_system.overlapped
+    assert pipeline.latest_results("back")[0] == ["back"]
+
+class FailingFaceSystem(SharedFaceSystem):
+    """Recognizer whose every frame from the front camera raises."""
+    def process_frame(self, frame, motion_detected=False, roi=None, stream=None):
+        if stream == "front":
+            raise RuntimeError("dlib fell over")
+        return super().process_frame(frame, motion_detected, roi, stream)
+
+def test_failing_frames_do_not_use_up_the_workers():
+    face_system = FailingFaceSystem()
+    pipeline = MultiCameraPipeline(
+        face_system, {"front": 0, "back": 1}, workers=2, open_capture=FakeCapture)
+    pipeline.start()
+    time.sleep(0.5)
+    report = pipeline.report()
+    pipeline.stop()
+
+    # Far more failures than workers, and the other camera is still recognized
+    assert report["front"]["recognition"]["errors"] > 2
+    assert report["back"]["recognition"]["errors"] == 0
+    assert face_system.processed.count("back") > 5
+
+# Run the tests
+if __name__ == "__main__":
+    test_cameras_share_workers_fairly()
+    test_failing_frames_do_not_use_up_the_workers()
+    print("Multi camera tests passed.")
@@ -0,0 +1,85 @@
+import sys
+import os
+import time
+
+# Add the path to the notification dispatcher module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from notification_dispatcher import FakeTransport, NotificationDispatcher, OutgoingMessage
+
+def _messages(tokens):
+    return [OutgoingMessage(token, "Household Update", "Jason has arrived home.") for token in tokens]
+
+def test_submit_does_not_wait_for_network():
+    transport = FakeTransport(latency=0.2)
+    dispatcher = NotificationDispatcher(transport)
+
+    start = time.monotonic()
+    dispatcher.submit(_messages(["a", "b", "c"]))
+    assert time.monotonic() - start < 0.05
+
+    assert dispatcher.flush(timeout=2)
+    # All recipients went out in a single batch
+    assert transport.calls == 1
+    assert len(transport.delivered) == 3
+    dispatcher.close()
+
+def test_transient_failures_are_retried():
+    transport = FakeTransport(failure_rate=0.5, seed=1)
+    dispatcher = NotificationDispatcher(transport, max_retries=10, base_delay=0.001, max_delay=0.01)
+    dispatcher.submit(_messages([f"token-{i}" for i in range(20)]))
+
+    assert dispatcher.flush(timeout=5)
+    assert len(transport.delivered) == 20
+    assert dispatcher.stats["retried"] > 0
+    dispatcher.close()
+
+def test_unregistered_tokens_are_pruned_not_retried():
+    pruned = []
+    transport = FakeTransport(unregistered_tokens=["stale"])
+    dispatcher = NotificationDispatcher(transport, on_unregistered=pruned.append)
+    dispatcher.submit(_messages(["stale", "fresh"]))
+
+    assert dispatcher.flush(timeout=2)
+    assert pruned == ["stale"]
+    assert transport.calls == 1
+    assert [m.token for m in transport.delivered] == ["fresh"]
+    dispatcher.close()
+
+class ShortTransport(FakeTransport):
+    """Transport that drops the last result of its first batch."""
+    def send_each(self, messages):
+        results = super().send_each(messages)
+        return results[:-1] if self.calls == 1 else results
+
+def test_missing_results_are_retried():
+    transport = ShortTransport()
+    dispatcher = NotificationDispatcher(transport, base_delay=0.001, max_delay=0.01)
+    dispatcher.submit(_messages(["a", "b", "c"]))
+
+    assert dispatcher.flush(timeout=2)
+    assert dispatcher.stats["retried"] == 1
+    assert transport.calls == 2
+    dispatcher.close()
+
+def test_failing_unregistered_callback_does_not_stop_delivery():
+    def on_unregistered(token):
+        raise KeyError(token)
+
+    transport = FakeTransport(unregistered_tokens=["stale"])
+    dispatcher = NotificationDispatcher(transport, on_unregistered=on_unregistered)
+    dispatcher.submit(_messages(["stale"]))
+    assert dispatcher.flush(timeout=2)
+    dispatcher.submit(_messages(["fresh"]))
+    assert dispatcher.flush(timeout=2)
+    assert [m.token for m in transport.delivered] == ["fresh"]
+    dispatcher.close()
+
+# Run the tests
+if __name__ == "__main__":
+    test_submit_does_not_wait_for_network()
+    test_transient_failures_are_retried()
+    test_unregistered_tokens_are_pruned_not_retried()
+    test_missing_results_are_retried()
+    test_failing_unregistered_callback_does_not_stop_delivery()
+    print("Notification dispatcher tests passed.")
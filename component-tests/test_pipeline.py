@@ -0,0 +1,120 @@
+import sys
+import os
+import time
+
+# Add the path to the pipeline module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pipeline import DropOldestQueue, RecognitionPipeline
+
+class FakeCapture:
+    """Camera stand-in producing numbered frames at roughly 100 FPS."""
+    def __init__(self, frames=200):
+        self.frames = frames
+        self.index = 0
+
+    def read(self):
+        if self.index >= self.frames:
+            return False, None
+        time.sleep(0.01)
+        self.index += 1
+        return True, [self.index]
+
+class SlowFaceSystem:
+    """Recognizer that takes 50ms per frame, five times slower than capture."""
+    def __init__(self):
+        self.processed = []
+
+    def process_frame(self, frame, motion_detected=False, roi=None):
+        time.sleep(0.05)
+        self.processed.append(frame[0])
+        return ["Jason"], [(0, 10, 10, 0)]
+
+def test_drop_oldest_queue():
+    q = DropOldestQueue(maxsize=2)
+    for i in range(5):
+        q.put(i)
+    assert len(q) == 2
+    assert q.dropped == 3
+    assert q.get(timeout=0) == 3
+
+def test_slow_recognition_does_not_slow_capture():
+    face_system = SlowFaceSystem()
+    pipeline = RecognitionPipeline(FakeCapture(), face_system)
+    pipeline.start()
+
+    rendered = 0
+    while pipeline.next_frame(timeout=1.0) is not None:
+        rendered += 1
+    report = pipeline.report()
+    pipeline.stop()
+
+    # Capture ran at camera speed; recognition skipped stale frames instead of queueing them
+    assert report["capture"]["frames"] == 200
+    assert rendered > 100
+    assert len(face_system.processed) < 100
+    assert report["recognition"]["dropped"] > 0
+    assert pipeline.latest_results()[0] == ["Jason"]
+
+def test_capture_starts_before_face_system_loads():
+    pipeline = RecognitionPipeline(FakeCapture(), None)
+    pipeline.start()
+    assert pipeline.first_frame.wait(timeout=1.0)
+    time.sleep(0.2)
+    # Frames are captured and displayed while recognition waits for its models
+    assert pipeline.next_frame(timeout=1.0) is not None
+    assert pipeline.latest_results() == ([], [])
+
+    face_system = SlowFaceSystem()
+    pipeline.set_face_system(face_system)
+    while pipeline.next_frame(timeout=1.0) is not None:
+        pass
+    pipeline.stop()
+    assert face_system.processed
+    # Recognition began with the newest frame, not a backlog from before it loaded
+    assert face_system.processed[0] > 10
+    assert pipeline.latest_results()[0] == ["Jason"]
+
+class FlakyFaceSystem(SlowFaceSystem):
+    """Recognizer that raises on the first frame it sees, or on every frame."""
+    def __init__(self, always=False):
+        super().__init__()
+        self.always = always
+        self.calls = 0
+
+    def process_frame(self, frame, motion_detected=False, roi=None):
+        self.calls += 1
+        if self.always or self.calls == 1:
+            raise RuntimeError("dlib fell over")
+        return super().process_frame(frame, motion_detected, roi)
+
+def test_recognition_survives_a_failing_frame():
+    face_system = FlakyFaceSystem()
+    pipeline = RecognitionPipeline(FakeCapture(), face_system)
+    pipeline.start()
+    while pipeline.next_frame(timeout=1.0) is not None:
+        pass
+    report = pipeline.report()
+    pipeline.stop()
+    assert report["recognition"]["errors"] == 1
+    assert face_system.processed
+    assert pipeline.latest_results()[0] == ["Jason"]
+    assert pipeline.error == "Could not read frame."
+
+def test_repeated_recognition_failures_stop_the_pipeline():
+    pipeline = RecognitionPipeline(FakeCapture(), FlakyFaceSystem(always=True))
+    pipeline.start()
+    while pipeline.next_frame(timeout=1.0) is not None:
+        pass
+    pipeline.stop()
+    assert not pipeline.running
+    assert pipeline.error.startswith("Recognition failed on 10 frames in a row")
+
+# Run the tests
+if __name__ == "__main__":
+    test_drop_oldest_queue()
+    test_slow_recognition_does_not_slow_capture()
+    test_capture_starts_before_face_system_loads()
+    test_recognition_survives_a_failing_frame()
+    test_repeated_recognition_failures_stop_the_pipeline()
+    print("Pipeline tests passed.")
@@ -0,0 +1,109 @@
+import sys
+import os
+
+# Add the path to the quality module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from quality import DEFAULT_LEVEL, QUALITY_LEVELS, QualityController, cpu_temperature
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class Settings:
+    pass
+
+def make_controller(clock, temperature=None, **options):
+    sensors = {"temperature": temperature}
+    controller = QualityController(target_ms=100, read_temperature=lambda: sensors["temperature"],
+                                   read_load=lambda: None, sensor_interval=0, clock=clock, **options)
+    return controller, sensors
+
+def feed(controller, clock, frame_ms, frames, motion=False, dt=0.1):
+    decisions = []
+    for _ in range(frames):
+        clock.now += dt
+        decision = controller.update(frame_ms, motion=motion)
+        if decision:
+            decisions.append(decision)
+    return decisions
+
+def test_slow_frames_step_quality_down_and_headroom_steps_it_back_up():
+    clock = FakeClock()
+    controller, _ = make_controller(clock)
+    assert controller.level == DEFAULT_LEVEL
+
+    # Over budget: one step down per step_interval, not one per frame
+    decisions = feed(controller, clock, 250, 20)
+    assert [d.reason for d in decisions] == ["latency", "latency"]
+    assert controller.level == DEFAULT_LEVEL + 2
+
+    # Comfortably under budget: wait out the hold, then step up one level at a time
+    decisions = feed(controller, clock, 20, 120)
+    assert decisions and all(d.reason == "headroom" and d.level == d.previous - 1 for d in decisions)
+    assert len(decisions) == 2
+
+    # Between headroom and the target the level holds
+    assert feed(controller, clock, 80, 100) == []
+
+def test_motion_jumps_to_full_quality_unless_the_cpu_is_hot():
+    clock = FakeClock()
+    controller, sensors = make_controller(clock)
+    feed(controller, clock, 30, 3)
+    decision = controller.update(30, motion=True)
+    assert decision.reason == "motion" and controller.level == 0
+
+    sensors["temperature"] = 80.0
+    clock.now += 1
+    assert controller.update(30).reason == "temperature"
+    clock.now += 10
+    # Too hot: motion does not escalate, and quality keeps dropping
+    assert controller.update(30, motion=True).reason == "temperature"
+    assert controller.level == 2
+
+    # Just under the limit, motion still waits for the CPU to cool further
+    sensors["temperature"] = 72.0
+    clock.now += 10
+    assert controller.update(30, motion=True) is None
+
+def test_motion_does_not_escalate_without_latency_headroom():
+    clock = FakeClock()
+    controller, _ = make_controller(clock)
+    # Within the 100 ms target, but over the 60 ms headroom threshold
+    feed(controller, clock, 80, 3)
+    assert controller.update(80, motion=True) is None
+    assert controller.level == DEFAULT_LEVEL
+
+def test_apply_sets_the_current_settings_and_decisions_are_reported():
+    clock = FakeClock()
+    controller, _ = make_controller(clock, level=len(QUALITY_LEVELS) - 1)
+    target = Settings()
+    controller.apply(target)
+    assert target.detection_scale == QUALITY_LEVELS[-1].detection_scale
+    assert target.num_jitters == QUALITY_LEVELS[-1].num_jitters
+
+    # Already at the cheapest level: nothing left to give up
+    assert feed(controller, clock, 500, 20) == []
+    # Motion only escalates once recent frames are back under budget
+    assert controller.update(10, motion=True) is None
+    feed(controller, clock, 10, 15)
+    controller.update(10, motion=True)
+    report = controller.report()
+    assert report["level"] == 0 and report["changes"] == 1
+    assert report["decisions"][0]["reason"] == "motion"
+    assert report["settings"] == QUALITY_LEVELS[0]._asdict()
+
+def test_missing_thermal_sensor_reads_as_none():
+    assert cpu_temperature("/nonexistent/thermal_zone/temp") is None
+
+# Run the tests
+if __name__ == "__main__":
+    test_slow_frames_step_quality_down_and_headroom_steps_it_back_up()
+    test_motion_jumps_to_full_quality_unless_the_cpu_is_hot()
+    test_motion_does_not_escalate_without_latency_headroom()
+    test_apply_sets_the_current_settings_and_decisions_are_reported()
+    test_missing_thermal_sensor_reads_as_none()
+    print("Quality tests passed.")
@@ -0,0 +1,156 @@
+import sys
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+# Add the path to the recognition module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import recognition
+from face_store import FaceEncodingStore
+from recognition import FaceRecognitionSystem
+
+class StubLocator:
+    """Stands in for face_recognition.face_locations, returning fixed boxes."""
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.shapes = []
+
+    def __call__(self, image, number_of_times_to_upsample=1, model="hog"):
+        self.shapes.append(image.shape)
+        return list(self.boxes)
+
+def make_face_system(directory, locator, **options):
+    face_system = FaceRecognitionSystem(known_faces_dir=directory, **options)
+    face_system.encoded = []
+
+    def encode_faces(rgb_frame, face_locations):
+        face_system.encoded.append(list(face_locations))
+        return [np.zeros(128) for _ in face_locations]
+
+    face_system.encode_faces = encode_faces
+    recognition.face_recognition.face_locations = locator
+    return face_system
+
+def test_boxes_found_on_a_downscaled_roi_map_back_to_the_frame():
+    original = recognition.face_recognition.face_locations
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            locator = StubLocator([(10, 60, 50, 20), (-5, 400, 160, -3)])
+            face_system = make_face_system(directory, locator, detection_scale=0.5)
+            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            locations = face_system.locate_faces(frame, roi=(100, 500, 400, 200))
+            face_system.close()
+    finally:
+        recognition.face_recognition.face_locations = original
+
+    # The 300x300 region was searched at half size
+    assert locator.shapes == [(150, 150, 3)]
+    assert locations[0] == (120, 320, 200, 240)
+    # Boxes running off the small image are clamped to the frame
+    assert locations[1] == (90, 640, 420, 194)
+
+def test_reused_boxes_are_not_re_encoded():
+    original = recognition.face_recognition.face_locations
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            locator = StubLocator([(100, 200, 200, 100)])
+            face_system = make_face_system(directory, locator, detect_every_n_frames=3)
+            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            for i in range(6):
+                face_system.process_frame(frame)
+            face_system.process_frame(frame, motion_detected=True)
+            face_system.close()
+    finally:
+        recognition.face_recognition.face_locations = original
+
+    # Located on frames 0 and 3, and again on the motion onset
+    assert len(locator.shapes) == 3
+    # Only freshly located boxes were encoded
+    assert face_system.encoded == [[(100, 200, 200, 100)]] * 3
+
+class ListEventLog:
+    """Stands in for EventLog, keeping recorded rows in memory."""
+    def __init__(self):
+        self.rows = []
+
+    def record(self, event, snapshot=None):
+        self.rows.append((event.identity, snapshot))
+
+def test_event_log_gets_the_snapshot_saved_by_the_callback():
+    original = recognition.face_recognition.face_locations
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            event_log = ListEventLog()
+            face_system = make_face_system(directory, StubLocator([(100, 200, 200, 100)]),
+                                           notification_callback=lambda event: "clips/door.mjpeg",
+                                           event_log=event_log)
+            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            for i in range(10):
+                face_system.process_frame(frame)
+            face_system.close()
+    finally:
+        recognition.face_recognition.face_locations = original
+
+    assert event_log.rows == [("Unknown", "clips/door.mjpeg")]
+
+def test_frames_match_the_old_gallery_while_a_reload_encodes():
+    original = recognition.face_recognition.face_locations
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for filename in ("Alice.jpg", "Bob.jpg"):
+                with open(os.path.join(directory, filename), 'wb') as f:
+                    f.write(b"image")
+            # Alice is cached, so only Bob needs encoding
+            FaceEncodingStore(directory).put("Alice.jpg", "Alice", np.zeros(128))
+            os.unlink(os.path.join(directory, "Bob.jpg"))
+            face_system = make_face_system(directory, StubLocator([(100, 200, 200, 100)]))
+            with open(os.path.join(directory, "Bob.jpg"), 'wb') as f:
+                f.write(b"image")
+
+            encoding, release = threading.Event(), threading.Event()
+
+            def slow_encoder(paths):
+                encoding.set()
+                release.wait(5)
+                return [np.ones(128) for _ in paths]
+
+            face_system._encode_image_files_in_processes = slow_encoder
+            reload = threading.Thread(target=face_system._reload)
+            reload.start()
+            try:
+                assert encoding.wait(5)
+                frame = np.zeros((480, 640, 3), dtype=np.uint8)
+                for i in range(5):
+                    face_names, _ = face_system.process_frame(frame)
+                assert reload.is_alive()
+                assert face_names == ["Alice"]
+            finally:
+                release.set()
+                reload.join()
+            face_system.close()
+    finally:
+        recognition.face_recognition.face_locations = original
+
+    assert face_system.reloads == 1
+    assert len(face_system.gallery) == 2
+
+def test_scratch_buffers_do_not_grow_with_roi_sizes():
+    with tempfile.TemporaryDirectory() as directory:
+        face_system = FaceRecognitionSystem(known_faces_dir=directory)
+        for side in (40, 80, 20, 60):
+            assert face_system._buffer("detect", (side, side, 3)).shape == (side, side, 3)
+        face_system.close()
+    # One buffer, sized for the largest crop seen
+    assert face_system._scratch.buffers.nbytes == 80 * 80 * 3
+
+# Run the tests
+if __name__ == "__main__":
+    test_boxes_found_on_a_downscaled_roi_map_back_to_the_frame()
+    test_reused_boxes_are_not_re_encoded()
+    test_event_log_gets_the_snapshot_saved_by_the_callback()
+    test_frames_match_the_old_gallery_while_a_reload_encodes()
+    test_scratch_buffers_do_not_grow_with_roi_sizes()
+    print("Recognition tests passed.")
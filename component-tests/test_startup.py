@@ -0,0 +1,44 @@
+import sys
+import os
+import time
+
+# Add the path to the startup module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from startup import StartupTimer, in_background, process_start
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+def test_overlapping_phases_are_reported_in_finishing_order():
+    clock = FakeClock()
+    timer = StartupTimer(origin=99.5, clock=clock)
+    with timer.phase("face_models"):
+        with timer.phase("camera_open"):
+            clock.now += 0.25
+        timer.mark("first_frame")
+        clock.now += 1.0
+    report = timer.report()
+    assert list(report) == ["camera_open", "first_frame", "face_models"]
+    assert report["camera_open"] == {"start_s": 0.5, "end_s": 0.75, "duration_s": 0.25}
+    assert report["face_models"]["duration_s"] == 1.25
+    assert "first_frame" in timer.format()
+
+def test_background_load_reports_result_or_error():
+    assert in_background("test-load", lambda x: x * 2, 21).result(timeout=1) == 42
+    failed = in_background("test-load", lambda: 1 / 0)
+    assert isinstance(failed.exception(timeout=1), ZeroDivisionError)
+
+def test_process_start_is_in_the_past():
+    assert process_start() <= time.monotonic()
+
+# Run the tests
+if __name__ == "__main__":
+    test_overlapping_phases_are_reported_in_finishing_order()
+    test_background_load_reports_result_or_error()
+    test_process_start_is_in_the_past()
+    print("Startup tests passed.")
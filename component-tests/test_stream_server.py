@@ -0,0 +1,111 @@
+import sys
+import os
+import base64
+import socket
+import struct
+import time
+
+# Add the path to the stream server module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from stream_server import StreamServer, unmask
+
+class CountingEncoder:
+    """Stands in for JPEG encoding and counts how often it runs."""
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, frame, quality):
+        self.calls += 1
+        return b"jpeg-%d" % frame
+
+def _connect_websocket(port):
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall((
+        "GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+        f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+    ).encode())
+    response = b""
+    while not response.endswith(b"\r\n\r\n"):
+        response += sock.recv(1)
+    assert response.startswith(b"HTTP/1.1 101")
+    return sock
+
+def _read_message(sock):
+    header = sock.recv(2, socket.MSG_WAITALL)
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", sock.recv(2, socket.MSG_WAITALL))[0]
+    return sock.recv(length, socket.MSG_WAITALL)
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_frames_are_encoded_once_for_all_viewers():
+    encoder = CountingEncoder()
+    server = StreamServer(host="127.0.0.1", port=0, max_fps=100, encode=encoder)
+    server.start()
+    try:
+        viewers = [_connect_websocket(server.port) for _ in range(3)]
+        _wait_for(lambda: server.viewer_count() == 3)
+
+        server.publish(7)
+        assert [_read_message(sock) for sock in viewers] == [b"jpeg-7"] * 3
+        assert encoder.calls == 1
+
+        for sock in viewers:
+            sock.close()
+        _wait_for(lambda: server.viewer_count() == 0)
+    finally:
+        server.stop()
+
+def test_publish_without_viewers_does_nothing():
+    encoder = CountingEncoder()
+    server = StreamServer(host="127.0.0.1", port=0, encode=encoder)
+    server.start()
+    try:
+        start = time.monotonic()
+        for i in range(1000):
+            server.publish(i)
+        assert time.monotonic() - start < 0.5
+        assert encoder.calls == 0
+    finally:
+        server.stop()
+
+def _masked_frame(opcode, payload, mask=b"\x12\x34\x56\x78", length=None):
+    length = len(payload) if length is None else length
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, 0x80 | length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, length)
+    return header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+def test_pings_are_unmasked_and_oversized_frames_refused():
+    assert unmask(b"", b"abcd") == b""
+    assert unmask(unmask(b"hello door", b"\x01\x02\x03\x04"), b"\x01\x02\x03\x04") == b"hello door"
+
+    server = StreamServer(host="127.0.0.1", port=0, encode=CountingEncoder())
+    server.start()
+    try:
+        sock = _connect_websocket(server.port)
+        sock.sendall(_masked_frame(0x9, b"are you there"))
+        assert _read_message(sock) == b"are you there"
+
+        # A claimed 4 GiB payload is refused before anything is read or allocated
+        sock.sendall(_masked_frame(0x1, b"", length=4 << 30))
+        assert _read_message(sock) == struct.pack("!H", 1009)
+        _wait_for(lambda: server.viewer_count() == 0)
+        sock.close()
+    finally:
+        server.stop()
+
+# Run the tests
+if __name__ == "__main__":
+    test_frames_are_encoded_once_for_all_viewers()
+    test_publish_without_viewers_does_nothing()
+    test_pings_are_unmasked_and_oversized_frames_refused()
+    print("Stream server tests passed.")
@@ -0,0 +1,52 @@
+import sys
+import os
+from collections import namedtuple
+
+# Add the path to the tracking module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tracking import FaceTracker, iou
+
+Match = namedtuple("Match", "name distance confidence")
+
+def test_iou():
+    assert iou((0, 10, 10, 0), (0, 10, 10, 0)) == 1.0
+    assert iou((0, 10, 10, 0), (20, 30, 30, 20)) == 0.0
+
+def test_track_keeps_id_while_face_moves():
+    tracker = FaceTracker()
+    first = tracker.update([(100, 200, 200, 100)])[0]
+    second = tracker.update([(105, 205, 205, 105)])[0]
+    assert first is second
+
+def test_identity_settles_after_votes_and_ignores_single_bad_frame():
+    tracker = FaceTracker(votes_required=3, vote_window=5)
+    location = (100, 200, 200, 100)
+    names = ["Jason", "Unknown", "Jason", "Jason"]
+    settled_at = None
+    for frame, name in enumerate(names):
+        track = tracker.update([location])[0]
+        assert tracker.needs_encoding(track)
+        if tracker.record(track, Match(name, 0.3, 0.9)):
+            settled_at = frame
+    assert settled_at == 3
+    assert track.identity == "Jason"
+
+    # Settled tracks are not re-encoded on the next frame
+    track = tracker.update([location])[0]
+    assert not tracker.needs_encoding(track)
+
+def test_track_expires_after_missed_frames():
+    tracker = FaceTracker(max_missed=2)
+    tracker.update([(100, 200, 200, 100)])
+    for _ in range(3):
+        tracker.update([])
+    assert tracker.tracks == []
+
+# Run the tests
+if __name__ == "__main__":
+    test_iou()
+    test_track_keeps_id_while_face_moves()
+    test_identity_settles_after_votes_and_ignores_single_bad_frame()
+    test_track_expires_after_missed_frames()
+    print("Tracking tests passed.")
@@ -0,0 +1,114 @@
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from typing import Callable
+
+# The socket lives in a directory only its owner can enter, under the per-user
+# runtime directory where there is one
+DEFAULT_SOCKET_PATH = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or "/tmp", f"welcome-home-bot-{os.getuid()}", "control.sock")
+
+
+def _private_directory(path: str) -> None:
+    """Create a 0700 directory, or check that an existing one is ours and closed to others."""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory only its owner can access")
+
+
+class ControlServer:
+    def __init__(self, path: str, handler: Callable[[str], str]):
+        """
+        Local Unix-socket control channel for a running bot.
+
+        Each connection sends one command per line and gets one reply line
+        back. Connections are served on their own threads, so a slow command
+        (a profile samples for up to a minute) only holds up the connection
+        it came in on. The socket is created in a 0700 directory, so only
+        the user running the bot can reach it.
+
+        Args:
+            path: Filesystem path of the Unix socket; its directory is
+                created if missing and must not be accessible to others
+            handler: Called with each command line, returns the reply
+        """
+        self.path = path
+        self.handler = handler
+        self._server = None
+        self._thread = None
+
+    def start(self) -> None:
+        _private_directory(os.path.dirname(os.path.abspath(self.path)))
+        # Only replace a socket left by an earlier run, never some other file
+        try:
+            if not stat.S_ISSOCK(os.lstat(self.path).st_mode):
+                raise FileExistsError(f"{self.path} exists and is not a socket")
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+        handler = self.handler
+
+        class CommandHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    command = line.decode().strip()
+                    if not command:
+                        continue
+                    try:
+                        reply = handler(command)
+                    except Exception as e:
+                        reply = f"error: {e}"
+                    self.wfile.write((reply + "\n").encode())
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, CommandHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="control", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def send_command(command: str, path: str = DEFAULT_SOCKET_PATH, timeout: float = 10.0) -> str:
+    """Send one command to a running bot and return its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((command + "\n").encode())
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            reply += chunk
+    return reply.decode().strip()
+
+
+if __name__ == "__main__":
+    # e.g. python control.py register Jason
+    if len(sys.argv) < 2:
+        print("Usage: python control.py <quit|status|quality|last-seen|profile [SECONDS]|register NAME> [--socket PATH]")
+        sys.exit(1)
+    args = sys.argv[1:]
+    path = DEFAULT_SOCKET_PATH
+    if "--socket" in args:
+        index = args.index("--socket")
+        path = args[index + 1]
+        del args[index:index + 2]
+    # A profile keeps the connection open while it samples
+    timeout = 10.0 + (float(args[1]) if args[0] == "profile" and len(args) > 1 else 5.0)
+    print(send_command(" ".join(args), path, timeout))
@@ -0,0 +1,179 @@
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+# Context added around each face so the landmark model sees the whole face
+CROP_MARGIN = 0.3
+# Smallest shared-memory segment; segments grow in powers of two from here
+MIN_SEGMENT_SIZE = 1 << 20
+# Segments a worker keeps mapped; the parent reuses a few, and replaced ones age out
+ATTACHED_SEGMENTS = 8
+
+_attached: "OrderedDict[str, shared_memory.SharedMemory]" = OrderedDict()  # worker: name -> mapping
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Worker: map a segment once and keep it mapped for the next frames."""
+    shm = _attached.get(name)
+    if shm is None:
+        shm = _attached[name] = shared_memory.SharedMemory(name=name)
+        while len(_attached) > ATTACHED_SEGMENTS:
+            _attached.popitem(last=False)[1].close()
+    else:
+        _attached.move_to_end(name)
+    return shm
+
+
+def _encode_crop(shm_name: str, offset: int, shape: tuple, box: tuple, num_jitters: int,
+                 encoder: Optional[Callable] = None) -> np.ndarray:
+    """Worker: encode one face from a crop stored in shared memory."""
+    if encoder is None:
+        import face_recognition
+        encoder = face_recognition.face_encodings
+    crop = np.ndarray(shape, dtype=np.uint8, buffer=_attach(shm_name).buf, offset=offset)
+    return encoder(crop, [box], num_jitters=num_jitters)[0]
+
+
+def _encode_file(path: str, num_jitters: int) -> Optional[np.ndarray]:
+    """Worker: encode the first face in an image file."""
+    import face_recognition
+    image = face_recognition.load_image_file(path)
+    encodings = face_recognition.face_encodings(image, num_jitters=num_jitters)
+    return encodings[0] if encodings else None
+
+
+def _warm_up() -> None:
+    """Worker initializer: load the dlib models once per process."""
+    import face_recognition  # noqa: F401
+
+
+def crop_box(location: tuple, frame_shape: tuple, margin: float = CROP_MARGIN) -> tuple:
+    """
+    Padded crop around a face and the face box relative to that crop.
+
+    Returns:
+        ((top, right, bottom, left) of the crop, (top, right, bottom, left) of the face inside it)
+    """
+    top, right, bottom, left = location
+    height, width = frame_shape[:2]
+    pad_y, pad_x = int((bottom - top) * margin), int((right - left) * margin)
+    crop = (max(0, top - pad_y), min(width, right + pad_x), min(height, bottom + pad_y), max(0, left - pad_x))
+    face = (top - crop[0], right - crop[3], bottom - crop[0], left - crop[3])
+    return crop, face
+
+
+def process_pool(processes: int, warm_up: bool = True) -> ProcessPoolExecutor:
+    """Worker processes with the face models loaded, started without forking our threads."""
+    # forkserver avoids forking the capture and recognition threads
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context(method),
+        initializer=_warm_up if warm_up else None,
+    )
+
+
+class EncodingPool:
+    def __init__(self, processes: Optional[int] = None, num_jitters: int = 1,
+                 encoder: Optional[Callable] = None):
+        """
+        Process pool that computes face encodings on all CPU cores.
+
+        Face crops are copied into a shared-memory segment and workers read
+        them in place, so only box coordinates and the resulting 128-float
+        encodings cross the process boundary. Segments are kept and reused
+        by later calls, growing only when a frame's crops do not fit, and
+        workers keep them mapped, so a steady stream of frames creates and
+        maps no memory at all.
+
+        Args:
+            processes: Worker processes, defaults to the CPU count
+            num_jitters: Times each face is re-sampled when encoding
+            encoder: Picklable stand-in for face_recognition.face_encodings,
+                called in the workers; the face models are not loaded with one
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.num_jitters = num_jitters
+        self.encoder = encoder
+        self._executor = process_pool(self.processes, warm_up=encoder is None)
+        self._segments: List[shared_memory.SharedMemory] = []  # free for the next call
+        self._segments_lock = threading.Lock()
+
+    def _segment(self, size: int) -> shared_memory.SharedMemory:
+        """A free segment of at least size bytes, replacing a smaller one if none fits."""
+        with self._segments_lock:
+            fitting = [shm for shm in self._segments if shm.size >= size]
+            if fitting:
+                shm = min(fitting, key=lambda shm: shm.size)
+                self._segments.remove(shm)
+                return shm
+            if self._segments:
+                smallest = min(self._segments, key=lambda shm: shm.size)
+                self._segments.remove(smallest)
+                smallest.close()
+                smallest.unlink()
+        capacity = MIN_SEGMENT_SIZE
+        while capacity < size:
+            capacity *= 2
+        return shared_memory.SharedMemory(create=True, size=capacity)
+
+    def _release(self, shm: shared_memory.SharedMemory) -> None:
+        with self._segments_lock:
+            self._segments.append(shm)
+
+    def encode(self, rgb_frame: np.ndarray, face_locations: Sequence[tuple],
+               num_jitters: Optional[int] = None) -> List[np.ndarray]:
+        """
+        Encode every face in a frame in parallel.
+
+        Args:
+            rgb_frame: Full-resolution RGB frame
+            face_locations: Face boxes (top, right, bottom, left)
+            num_jitters: Overrides the pool's num_jitters for this frame
+
+        Returns:
+            One encoding per location, in order
+        """
+        if not face_locations:
+            return []
+        if num_jitters is None:
+            num_jitters = self.num_jitters
+
+        crops = [crop_box(location, rgb_frame.shape) for location in face_locations]
+        sizes = [(bottom - top) * (right - left) * 3 for (top, right, bottom, left), _ in crops]
+        shm = self._segment(sum(sizes))
+        futures = []
+        try:
+            offset = 0
+            for ((top, right, bottom, left), face), size in zip(crops, sizes):
+                shape = (bottom - top, right - left, 3)
+                view = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+                view[:] = rgb_frame[top:bottom, left:right]
+                del view
+                futures.append(self._executor.submit(
+                    _encode_crop, shm.name, offset, shape, face, num_jitters, self.encoder))
+                offset += size
+            return [future.result() for future in futures]
+        finally:
+            # Workers may still be reading other crops if one failed
+            wait(futures)
+            self._release(shm)
+
+    def encode_files(self, paths: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Encode the first face of each image file in parallel (None where there is no face)."""
+        return list(self._executor.map(_encode_file, paths, [self.num_jitters] * len(paths),
+                                       chunksize=max(1, len(paths) // (self.processes * 4))))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._segments_lock:
+            for shm in self._segments:
+                shm.close()
+                shm.unlink()
+            self._segments = []
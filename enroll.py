@@ -0,0 +1,326 @@
+"""
+Enroll people into the known-faces gallery in bulk.
+
+Each person's images and video clips are scanned in parallel for faces,
+every face is scored for sharpness, size and how frontal it is, and the
+best samples are encoded on all cores. Samples that are nearly identical
+to one already kept (or already in the gallery) are dropped, and the rest
+are written to known_faces with their encodings cached in one pass.
+
+Examples:
+    python enroll.py people/                      # people/<Name>/*.jpg|*.mp4
+    python enroll.py --name Jason jason/ door.mp4
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import as_completed
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from encoding_pool import crop_box, process_pool
+from face_store import IMAGE_EXTENSIONS, FaceEncodingStore
+from gallery import person_name
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".h264")
+
+# Faces at least this sharp (variance of the Laplacian) and this large (pixels) score fully
+SHARPNESS_TARGET = 100.0
+SIZE_TARGET = 150
+# Longest side faces are located on; larger frames are searched on a downscaled copy
+DETECTION_WIDTH = 640
+
+
+class Candidate(NamedTuple):
+    person: str
+    source: str  # file the face came from, with "@frame" for video frames
+    crop: np.ndarray  # padded RGB crop around the face
+    box: tuple  # face (top, right, bottom, left) inside the crop
+    sharpness: float
+    size: int  # shorter side of the face box in pixels
+    frontalness: float  # 1.0 looking straight at the camera, 0.0 turned away
+    score: float
+
+
+def frontalness(landmarks: Dict[str, List[tuple]]) -> float:
+    """
+    How directly a face looks at the camera, from its 5-point landmarks.
+
+    Turning the head moves the nose tip away from the midpoint between the
+    eyes and tilting it puts the eyes at different heights; both are
+    measured relative to the distance between the eyes.
+    """
+    left = np.mean(landmarks["left_eye"], axis=0)
+    right = np.mean(landmarks["right_eye"], axis=0)
+    nose = np.asarray(landmarks["nose_tip"][0], dtype=np.float64)
+    eye_distance = abs(right[0] - left[0])
+    if eye_distance == 0:
+        return 0.0
+    yaw = abs(nose[0] - (left[0] + right[0]) / 2) / eye_distance
+    roll = abs(right[1] - left[1]) / eye_distance
+    return float(max(0.0, 1.0 - 2.0 * yaw - roll))
+
+
+def quality_score(sharpness: float, size: int, frontal: float) -> float:
+    """Combine the quality measures into a 0-1 score."""
+    return frontal * min(1.0, sharpness / SHARPNESS_TARGET) * min(1.0, size / SIZE_TARGET)
+
+
+def _score_frame(rgb_frame: np.ndarray, person: str, source: str, min_face_size: int) -> Optional[Candidate]:
+    """Score the largest face in a frame, or None if there is no usable face."""
+    import cv2
+    import face_recognition
+
+    height, width = rgb_frame.shape[:2]
+    scale = min(1.0, DETECTION_WIDTH / max(height, width))
+    small = rgb_frame if scale == 1.0 else cv2.resize(
+        rgb_frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    locations = face_recognition.face_locations(small)
+    if not locations:
+        return None
+
+    top, right, bottom, left = max(locations, key=lambda box: (box[2] - box[0]) * (box[1] - box[3]))
+    location = (int(top / scale), min(width, int(right / scale)),
+                min(height, int(bottom / scale)), int(left / scale))
+    size = min(location[2] - location[0], location[1] - location[3])
+    if size < min_face_size:
+        return None
+
+    landmarks = face_recognition.face_landmarks(rgb_frame, [location], model="small")
+    frontal = frontalness(landmarks[0]) if landmarks else 0.0
+    (crop_top, crop_right, crop_bottom, crop_left), box = crop_box(location, rgb_frame.shape)
+    crop = np.ascontiguousarray(rgb_frame[crop_top:crop_bottom, crop_left:crop_right])
+    face = cv2.cvtColor(crop[box[0]:box[2], box[3]:box[1]], cv2.COLOR_RGB2GRAY)
+    sharpness = float(cv2.Laplacian(face, cv2.CV_64F).var())
+    return Candidate(person, source, crop, box, sharpness, size, frontal,
+                     quality_score(sharpness, size, frontal))
+
+
+def _score_image(path: str, person: str, min_face_size: int) -> List[Candidate]:
+    """Worker: score the face in one image file."""
+    import face_recognition
+    candidate = _score_frame(face_recognition.load_image_file(path), person, path, min_face_size)
+    return [candidate] if candidate else []
+
+
+def _score_video(path: str, person: str, min_face_size: int, step: int, max_frames: int) -> List[Candidate]:
+    """Worker: score the faces in every step-th frame of a video clip."""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    candidates = []
+    index = scored = 0
+    try:
+        while scored < max_frames:
+            # grab() skips decoding the frames that are not sampled
+            if not cap.grab():
+                break
+            if index % step == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                scored += 1
+                candidate = _score_frame(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), person,
+                                         f"{path}@{index}", min_face_size)
+                if candidate:
+                    candidates.append(candidate)
+            index += 1
+    finally:
+        cap.release()
+    return candidates
+
+
+def _encode_candidate(crop: np.ndarray, box: tuple) -> Optional[np.ndarray]:
+    """Worker: encode the face in a candidate crop."""
+    import face_recognition
+    encodings = face_recognition.face_encodings(crop, [box])
+    return encodings[0] if encodings else None
+
+
+def collect_sources(paths: Sequence[str], name: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Map each person to their image and video files.
+
+    With a name, every path (file or folder) belongs to that person.
+    Otherwise each path is a folder holding one subfolder per person.
+    """
+    media = IMAGE_EXTENSIONS + VIDEO_EXTENSIONS
+
+    def files_in(path: str) -> List[str]:
+        if os.path.isfile(path):
+            return [path] if path.lower().endswith(media) else []
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(media))
+
+    sources: Dict[str, List[str]] = {}
+    for path in paths:
+        if name:
+            sources.setdefault(name, []).extend(files_in(path))
+            continue
+        for person in sorted(os.listdir(path)):
+            folder = os.path.join(path, person)
+            if os.path.isdir(folder) and not person.startswith("."):
+                sources.setdefault(person, []).extend(files_in(folder))
+    return {person: files for person, files in sources.items() if files}
+
+
+def select_samples(candidates: Sequence[Candidate], encodings: Sequence[Optional[np.ndarray]],
+                   existing: Optional[np.ndarray] = None, max_samples: int = 5,
+                   dedupe_distance: float = 0.15) -> Tuple[List[int], int]:
+    """
+    Pick the best distinct samples of one person.
+
+    Candidates are taken best score first; one is skipped when its encoding
+    is within dedupe_distance of a sample already kept or of an existing
+    gallery entry for the same person.
+
+    Returns:
+        Indices of the chosen candidates, best first, and the number of duplicates skipped
+    """
+    kept = [] if existing is None else list(existing)
+    chosen = []
+    duplicates = 0
+    for i in sorted(range(len(candidates)), key=lambda i: candidates[i].score, reverse=True):
+        if len(chosen) >= max_samples:
+            break
+        if encodings[i] is None:
+            continue
+        if kept and np.linalg.norm(np.asarray(kept) - encodings[i], axis=1).min() < dedupe_distance:
+            duplicates += 1
+            continue
+        kept.append(encodings[i])
+        chosen.append(i)
+    return chosen, duplicates
+
+
+def enroll(sources: Dict[str, List[str]], known_faces_dir: str = "known_faces",
+           processes: Optional[int] = None, max_samples: int = 5,
+           min_face_size: int = 60, dedupe_distance: float = 0.15,
+           video_step: int = 5, max_video_frames: int = 120,
+           dry_run: bool = False) -> Dict[str, dict]:
+    """
+    Score, encode, dedupe and store face samples for each person.
+
+    A file that cannot be read or scored, or a face that fails to encode,
+    is logged and counted as failed; the rest of the batch is still stored.
+
+    Returns:
+        Per-person counts of candidates found, samples kept, duplicates
+        skipped and files or faces that failed
+    """
+    import cv2
+
+    os.makedirs(known_faces_dir, exist_ok=True)
+    store = FaceEncodingStore(known_faces_dir)
+    store_names = store.names()
+    report = {}
+    items = []
+    images = []  # (path, RGB crop) written once scoring is done
+    failed = {person: 0 for person in sources}
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    executor = process_pool(processes or os.cpu_count() or 1)
+    try:
+        # Score every image and video in parallel
+        futures = {}
+        for person, files in sources.items():
+            for path in files:
+                if path.lower().endswith(VIDEO_EXTENSIONS):
+                    future = executor.submit(
+                        _score_video, path, person, min_face_size, video_step, max_video_frames)
+                else:
+                    future = executor.submit(_score_image, path, person, min_face_size)
+                futures[future] = (person, path)
+        by_person: Dict[str, List[Candidate]] = {person: [] for person in sources}
+        for future in as_completed(futures):
+            person, path = futures[future]
+            try:
+                candidates = future.result()
+            except Exception as e:
+                logger.warning(f"Skipping {path}: {e}")
+                failed[person] += 1
+                continue
+            for candidate in candidates:
+                by_person[candidate.person].append(candidate)
+
+        # Encode a few more of the best candidates than needed, to allow for duplicates
+        shortlist = {person: sorted(candidates, key=lambda c: c.score, reverse=True)[:max_samples * 3]
+                     for person, candidates in by_person.items()}
+        encoded = {person: [executor.submit(_encode_candidate, c.crop, c.box) for c in candidates]
+                   for person, candidates in shortlist.items()}
+
+        for person, candidates in shortlist.items():
+            encodings = []
+            for candidate, future in zip(candidates, encoded[person]):
+                try:
+                    encodings.append(future.result())
+                except Exception as e:
+                    logger.warning(f"Could not encode the face from {candidate.source}: {e}")
+                    failed[person] += 1
+                    encodings.append(None)
+            rows = [i for i, name in enumerate(store_names) if person_name(name) == person]
+            existing = store.encodings()[rows] if rows else None
+            chosen, duplicates = select_samples(candidates, encodings, existing, max_samples, dedupe_distance)
+            report[person] = {
+                "files": len(sources[person]),
+                "candidates": len(by_person[person]),
+                "kept": len(chosen),
+                "duplicates": duplicates,
+                "failed": failed[person],
+                "best_score": round(candidates[chosen[0]].score, 3) if chosen else 0.0,
+            }
+            for n, i in enumerate(chosen):
+                filename = f"{person}_{timestamp}_{n}.jpg"
+                images.append((os.path.join(known_faces_dir, filename), candidates[i].crop))
+                items.append((filename, os.path.splitext(filename)[0], encodings[i]))
+    finally:
+        executor.shutdown(wait=True)
+
+    # Hold the store lock from the first image to the cache rewrite, so a running
+    # bot picks the batch up from the cache instead of encoding the images again
+    if items and not dry_run:
+        with store.locked():
+            for path, crop in images:
+                cv2.imwrite(path, cv2.cvtColor(crop, cv2.COLOR_RGB2BGR))
+            store.put_many(items)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, dict]:
+    parser = argparse.ArgumentParser(description="Enroll people into the known faces gallery in bulk.")
+    parser.add_argument("paths", nargs="+",
+                        help="Folders with one subfolder per person, or files/folders of --name")
+    parser.add_argument("--name", help="Enroll every path as this person")
+    parser.add_argument("--known-faces", default="known_faces", help="Gallery directory to write to")
+    parser.add_argument("--processes", type=int, help="Worker processes, defaults to the CPU count")
+    parser.add_argument("--max-samples", type=int, default=5, help="Samples kept per person")
+    parser.add_argument("--min-face-size", type=int, default=60, help="Smallest face side in pixels")
+    parser.add_argument("--dedupe-distance", type=float, default=0.15,
+                        help="Skip samples closer than this to one already kept")
+    parser.add_argument("--video-step", type=int, default=5, help="Score every Nth video frame")
+    parser.add_argument("--max-video-frames", type=int, default=120, help="Frames scored per video")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be enrolled")
+    args = parser.parse_args(argv)
+
+    sources = collect_sources(args.paths, args.name)
+    if not sources:
+        print("No images or videos found.", file=sys.stderr)
+        return {}
+
+    start = time.perf_counter()
+    report = enroll(sources, args.known_faces, args.processes, args.max_samples,
+                    args.min_face_size, args.dedupe_distance, args.video_step,
+                    args.max_video_frames, args.dry_run)
+    for person, counts in report.items():
+        print(f"{person}: kept {counts['kept']} of {counts['candidates']} faces from {counts['files']} files "
+              f"({counts['duplicates']} duplicates, {counts['failed']} failed, best score {counts['best_score']})")
+    print(f"Enrolled {len(report)} people in {time.perf_counter() - start:.1f}s")
+    return report
+
+
+if __name__ == "__main__":
+    main()
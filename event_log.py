@@ -0,0 +1,271 @@
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from events import EVENT_ARRIVAL, DetectionEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENT_LOG_PATH = "events.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    event_type TEXT NOT NULL,
+    identity TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    camera TEXT NOT NULL,
+    top INTEGER, right INTEGER, bottom INTEGER, left INTEGER,
+    snapshot TEXT
+);
+CREATE INDEX IF NOT EXISTS events_by_time ON events (timestamp);
+CREATE INDEX IF NOT EXISTS events_by_type_time ON events (event_type, timestamp);
+CREATE INDEX IF NOT EXISTS events_by_identity_time ON events (identity, timestamp);
+CREATE TABLE IF NOT EXISTS last_seen (
+    identity TEXT PRIMARY KEY,
+    event_id INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    camera TEXT NOT NULL
+);
+"""
+
+COLUMNS = ("id", "timestamp", "event_type", "identity", "confidence", "camera",
+           "top", "right", "bottom", "left", "snapshot")
+
+
+class LoggedEvent(NamedTuple):
+    id: int
+    event: DetectionEvent
+    snapshot: Optional[str]
+
+
+def _row_to_event(row: tuple) -> LoggedEvent:
+    event_id, timestamp, event_type, identity, confidence, camera, top, right, bottom, left, snapshot = row
+    location = None if top is None else (top, right, bottom, left)
+    return LoggedEvent(event_id, DetectionEvent(event_type, identity, confidence, timestamp, camera, location),
+                       snapshot)
+
+
+class EventLog:
+    def __init__(self, path: str = DEFAULT_EVENT_LOG_PATH, batch_size: int = 500,
+                 commit_interval: float = 1.0):
+        """
+        Append-only store of every detection, in SQLite with write-ahead logging.
+
+        record() only queues the event; a background thread writes queued
+        events in one transaction per batch, so recognition never waits on
+        the disk. Events are never updated or deleted. A small last_seen
+        table is maintained in the same transaction, keeping per-person
+        lookups independent of how many events have been logged, and time
+        range queries run on (timestamp), (event_type, timestamp) and
+        (identity, timestamp) indexes.
+
+        Args:
+            path: SQLite database file
+            batch_size: Most events written per transaction
+            commit_interval: Seconds to gather events before committing a partial batch
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.written = 0
+        self.failed = 0
+
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+        self._pending: List[tuple] = []
+        self._in_flight = 0
+        self._flushing = 0  # callers waiting in flush()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=10)
+        # WAL only needs a full sync at checkpoints to stay consistent
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def record(self, event: DetectionEvent, snapshot: Optional[str] = None) -> None:
+        """
+        Queue an event for writing and return immediately.
+
+        Args:
+            event: The detection
+            snapshot: Path of the image or clip saved for it, if any
+        """
+        location = event.location or (None, None, None, None)
+        row = (event.timestamp, event.event_type, event.identity, float(event.confidence),
+               event.camera, *location, snapshot)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Event log is closed")
+            self._pending.append(row)
+            # Wake the writer for the first event of a batch and when a batch is full
+            if len(self._pending) in (1, self.batch_size):
+                self._cond.notify_all()
+
+    def _next_batch(self) -> Optional[List[tuple]]:
+        """Wait for a full batch or the commit interval, then take the queued rows; None once closed."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._closed)
+            if not self._pending:
+                return None
+            # Let a partial batch fill up unless a flush or close wants it written now
+            deadline = time.monotonic() + self.commit_interval
+            while len(self._pending) < self.batch_size and not self._closed and not self._flushing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            self._in_flight = len(batch)
+            return batch
+
+    def _run(self) -> None:
+        db = self._connect()
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                try:
+                    self._write(db, batch)
+                    self.written += len(batch)
+                except sqlite3.Error as e:
+                    self.failed += len(batch)
+                    logger.error(f"Failed to write {len(batch)} events: {str(e)}")
+                with self._cond:
+                    self._in_flight = 0
+                    self._cond.notify_all()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _write(db: sqlite3.Connection, batch: List[tuple]) -> None:
+        with db:
+            for row in batch:
+                cursor = db.execute(
+                    "INSERT INTO events (timestamp, event_type, identity, confidence, camera, "
+                    "top, right, bottom, left, snapshot) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                if row[1] == EVENT_ARRIVAL:
+                    db.execute(
+                        "INSERT INTO last_seen (identity, event_id, timestamp, camera) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (identity) DO UPDATE SET event_id = excluded.event_id, "
+                        "timestamp = excluded.timestamp, camera = excluded.camera "
+                        "WHERE excluded.timestamp >= last_seen.timestamp",
+                        (row[2], cursor.lastrowid, row[0], row[4]))
+
+    def pending(self) -> int:
+        """Events queued or being written."""
+        with self._cond:
+            return len(self._pending) + self._in_flight
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write everything queued now instead of waiting for the commit interval.
+
+        Returns:
+            bool: True if the queue drained before the timeout
+        """
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write what is queued, then stop the background thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def between(self, start: float, end: float, event_type: Optional[str] = EVENT_ARRIVAL,
+                identity: Optional[str] = None, camera: Optional[str] = None,
+                limit: Optional[int] = None) -> List[LoggedEvent]:
+        """
+        Events with start <= timestamp < end, oldest first.
+
+        Args:
+            start, end: Wall-clock time.time() bounds
+            event_type: Only this event type, or None for all (arrivals by default)
+            identity: Only this person
+            camera: Only this camera
+            limit: Maximum events returned
+        """
+        where, params = ["timestamp >= ?", "timestamp < ?"], [start, end]
+        for column, value in (("event_type", event_type), ("identity", identity), ("camera", camera)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        query = f"SELECT {', '.join(COLUMNS)} FROM events WHERE {' AND '.join(where)} ORDER BY timestamp"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with closing(self._connect()) as db:
+            return [_row_to_event(row) for row in db.execute(query, params)]
+
+    def arrivals(self, start: float, end: float) -> Dict[str, float]:
+        """Who arrived between start and end, with the time of each person's first arrival."""
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT identity, MIN(timestamp) FROM events "
+                "WHERE event_type = ? AND timestamp >= ? AND timestamp < ? GROUP BY identity",
+                (EVENT_ARRIVAL, start, end))
+            return dict(rows.fetchall())
+
+    def last_seen(self, identity: Optional[str] = None) -> Dict[str, LoggedEvent]:
+        """The latest arrival of every known person, or only of the given one."""
+        query = (f"SELECT {', '.join('e.' + column for column in COLUMNS)} "
+                 "FROM last_seen s JOIN events e ON e.id = s.event_id")
+        params = ()
+        if identity is not None:
+            query += " WHERE s.identity = ?"
+            params = (identity,)
+        with closing(self._connect()) as db:
+            return {row[3]: _row_to_event(row) for row in db.execute(query, params)}
+
+    def count(self) -> int:
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+if __name__ == "__main__":
+    # e.g. python event_log.py last-seen
+    #      python event_log.py arrivals 2024-01-01T08:00 2024-01-01T18:00
+    args = sys.argv[1:]
+    path = DEFAULT_EVENT_LOG_PATH
+    if "--db" in args:
+        index = args.index("--db")
+        path = args[index + 1]
+        del args[index:index + 2]
+    if not args or args[0] not in ("last-seen", "arrivals"):
+        print("Usage: python event_log.py <last-seen [NAME]|arrivals START END> [--db PATH]")
+        sys.exit(1)
+
+    log = EventLog(path)
+    if args[0] == "last-seen":
+        for name, logged in sorted(log.last_seen(args[1] if len(args) > 1 else None).items()):
+            camera = f" [{logged.event.camera}]" if logged.event.camera else ""
+            print(f"{name}: {_format_time(logged.event.timestamp)}{camera}")
+    else:
+        start, end = (datetime.fromisoformat(value).timestamp() for value in args[1:3])
+        for name, timestamp in sorted(log.arrivals(start, end).items(), key=lambda item: item[1]):
+            print(f"{_format_time(timestamp)} {name}")
+    log.close()
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional
+
+EVENT_ARRIVAL = "arrival"
+EVENT_UNKNOWN = "unknown"
+
+
+class DetectionEvent(NamedTuple):
+    event_type: str  # EVENT_ARRIVAL or EVENT_UNKNOWN
+    identity: str  # person name, or "Unknown"
+    confidence: float
+    timestamp: float  # wall-clock time.time() of the detection
+    camera: str = ""  # source the detection came from
+    location: Optional[tuple] = None  # face box (top, right, bottom, left) in the frame
+
+    @property
+    def is_known(self) -> bool:
+        return self.event_type == EVENT_ARRIVAL
+
+
+def detection_event(identity: str, confidence: float = 1.0,
+                    timestamp: Optional[float] = None, camera: str = "",
+                    location: Optional[tuple] = None) -> DetectionEvent:
+    """Build the event for a recognized identity ("Unknown" for strangers)."""
+    event_type = EVENT_UNKNOWN if identity == "Unknown" else EVENT_ARRIVAL
+    return DetectionEvent(event_type, identity, confidence,
+                          time.time() if timestamp is None else timestamp, camera, location)
+
+
+class EventDeduplicator:
+    def __init__(self, windows: Optional[Dict[str, float]] = None,
+                 default_window: float = 60.0,
+                 max_identities: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Suppress repeat events for the same identity within a cooldown window.
+
+        Unknown people are throttled per camera: strangers at the front and
+        back doors are different people as far as the household knows,
+        while a known person is only welcomed once wherever they arrive.
+
+        Windows are per event type and measured on a monotonic clock, so
+        wall-clock adjustments never release or swallow alerts. Memory is
+        bounded: identities whose window has passed are expired, and at
+        most max_identities are remembered, least recently emitted first out.
+
+        Args:
+            windows: Cooldown in seconds per event type
+            default_window: Cooldown for event types not in windows
+            max_identities: Maximum (event type, identity, camera) keys remembered
+            clock: Monotonic time source, replaceable for tests
+        """
+        self.windows = dict(windows or {})
+        self.default_window = default_window
+        self.max_identities = max_identities
+        self.clock = clock
+        self.emitted: Dict[str, int] = {}
+        self.suppressed: Dict[str, int] = {}
+        self._last_emitted = OrderedDict()  # (event type, identity, camera) -> clock time, oldest first
+        self._lock = threading.Lock()
+
+    def window(self, event_type: str) -> float:
+        return self.windows.get(event_type, self.default_window)
+
+    def _expire(self, now: float) -> None:
+        longest = max([self.default_window, *self.windows.values()])
+        while self._last_emitted:
+            key, emitted_at = next(iter(self._last_emitted.items()))
+            if now - emitted_at < longest and len(self._last_emitted) <= self.max_identities:
+                break
+            self._last_emitted.popitem(last=False)
+
+    def should_emit(self, event: DetectionEvent) -> bool:
+        """
+        Record an event and decide whether it should be passed on.
+
+        Returns:
+            bool: False if the same identity emitted this event type within its window
+                (at the same camera, for unknown people)
+        """
+        camera = "" if event.is_known else event.camera
+        key = (event.event_type, event.identity.lower(), camera)
+        with self._lock:
+            now = self.clock()
+            last = self._last_emitted.get(key)
+            if last is not None and now - last < self.window(event.event_type):
+                self.suppressed[event.event_type] = self.suppressed.get(event.event_type, 0) + 1
+                return False
+
+            self._last_emitted[key] = now
+            self._last_emitted.move_to_end(key)
+            self._expire(now)
+            self.emitted[event.event_type] = self.emitted.get(event.event_type, 0) + 1
+            return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._last_emitted)
@@ -0,0 +1,265 @@
+import fcntl
+import glob
+import json
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+INDEX_FILENAME = ".encodings.json"
+LOCK_FILENAME = ".encodings.lock"
+ENCODING_SIZE = 128
+
+
+class FaceEncodingStore:
+    def __init__(self, known_faces_dir: str = "known_faces"):
+        """
+        On-disk cache of face encodings for the images in known_faces_dir.
+
+        Encodings live in a single .npy matrix (memory-mapped on load) and a
+        small JSON index maps each row to the image it came from, keyed by
+        filename, mtime and size. The JSON index is the commit point: it is
+        replaced atomically and names the matrix file it belongs to, so a
+        crash mid-write leaves the previous cache intact. Writers in every
+        process (the bot and enroll.py) hold an flock on a lock file next to
+        the index and re-read the index first if another writer replaced it,
+        and matrix files no index refers to are swept on load.
+
+        Args:
+            known_faces_dir: Directory containing known face images
+        """
+        self.known_faces_dir = known_faces_dir
+        self.index_path = os.path.join(known_faces_dir, INDEX_FILENAME)
+        self.lock_path = os.path.join(known_faces_dir, LOCK_FILENAME)
+        self.entries: Dict[str, dict] = {}  # filename -> {name, mtime_ns, size, row}
+        self.matrix = np.empty((0, ENCODING_SIZE), dtype=np.float64)
+        self._matrix_file: Optional[str] = None
+        self._index_stat: Optional[tuple] = None  # (inode, mtime_ns) of the index last read or written
+        self._thread_lock = threading.RLock()
+        self._lock_fd: Optional[int] = None
+        self._lock_depth = 0
+        with self.locked():
+            self._load()
+            self._sweep()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """
+        Hold the store's inter-process lock; re-entrant within this object.
+
+        The lock is an flock on a separate file, since the index itself is
+        replaced rather than rewritten in place.
+        """
+        with self._thread_lock:
+            if self._lock_depth == 0:
+                fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._lock_fd = fd
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    os.close(self._lock_fd)  # releases the flock
+                    self._lock_fd = None
+
+    def _sweep(self) -> None:
+        """Delete matrix and index temp files left by crashed or interrupted writers; needs the lock."""
+        for pattern in (".encodings-*.npy", ".encodings-*.tmp"):
+            for path in glob.glob(os.path.join(glob.escape(self.known_faces_dir), pattern)):
+                if os.path.basename(path) != self._matrix_file:
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+
+    def _stat_index(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _refresh(self) -> None:
+        """Re-read the index if another store instance or process replaced it; needs the lock."""
+        if self._stat_index() != self._index_stat:
+            self._load()
+
+    def _load(self) -> None:
+        """Load the cached index and encodings, ignoring a missing or corrupt cache."""
+        self._index_stat = self._stat_index()
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            matrix_file = index["matrix"]
+            entries = index["entries"]
+            matrix = np.load(os.path.join(self.known_faces_dir, matrix_file), mmap_mode='r')
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return
+
+        rows = [e["row"] for e in entries.values() if e.get("row") is not None]
+        if matrix.ndim != 2 or matrix.shape[1] != ENCODING_SIZE or any(r >= len(matrix) for r in rows):
+            return
+
+        self.entries = entries
+        self.matrix = matrix
+        self._matrix_file = matrix_file
+
+    @staticmethod
+    def _fingerprint(path: str) -> dict:
+        stat = os.stat(path)
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    def _is_current(self, filename: str, fingerprint: dict) -> bool:
+        entry = self.entries.get(filename)
+        return (entry is not None and
+                entry["mtime_ns"] == fingerprint["mtime_ns"] and
+                entry["size"] == fingerprint["size"])
+
+    def sync(self, encode_images: Callable[[List[str]], List[Optional[np.ndarray]]]) -> bool:
+        """
+        Bring the cache in line with the images currently on disk.
+
+        Only images that are new or whose mtime/size changed are encoded,
+        in one call to encode_images so they can be processed in parallel;
+        entries for deleted images are dropped.
+
+        Args:
+            encode_images: Function returning the encoding for each image
+                path, or None where no face was found
+
+        Returns:
+            bool: True if the cache changed and was rewritten
+        """
+        with self.locked():
+            return self._sync(encode_images)
+
+    def _sync(self, encode_images: Callable[[List[str]], List[Optional[np.ndarray]]]) -> bool:
+        self._refresh()
+        on_disk = {}
+        for filename in os.listdir(self.known_faces_dir):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                on_disk[filename] = self._fingerprint(os.path.join(self.known_faces_dir, filename))
+
+        changed = set(self.entries) - set(on_disk)
+        encodings = {filename: self.encoding(filename) for filename in on_disk
+                     if self._is_current(filename, on_disk[filename])}
+        names = {filename: self.entries[filename]["name"] for filename in encodings}
+
+        stale = sorted(filename for filename in on_disk if filename not in encodings)
+        if stale:
+            paths = [os.path.join(self.known_faces_dir, filename) for filename in stale]
+            for filename, encoding in zip(stale, encode_images(paths)):
+                changed.add(filename)
+                encodings[filename] = encoding
+                names[filename] = os.path.splitext(filename)[0]
+
+        if not changed:
+            return False
+
+        self._rebuild(on_disk, names, encodings)
+        return True
+
+    def put(self, filename: str, name: str, encoding: Optional[np.ndarray]) -> None:
+        """
+        Record the encoding for a newly written image and persist the cache.
+
+        Args:
+            filename: Image filename inside known_faces_dir
+            name: Name the encoding should be reported under
+            encoding: Face encoding, or None if the image has no face
+        """
+        self.put_many([(filename, name, encoding)])
+
+    def put_many(self, items: Sequence[Tuple[str, str, Optional[np.ndarray]]]) -> None:
+        """
+        Record the encodings for several newly written images and persist the cache once.
+
+        Args:
+            items: (filename, name, encoding) for each image inside known_faces_dir
+        """
+        with self.locked():
+            self._put_many(items)
+
+    def _put_many(self, items: Sequence[Tuple[str, str, Optional[np.ndarray]]]) -> None:
+        self._refresh()
+        fingerprints = {f: {"mtime_ns": e["mtime_ns"], "size": e["size"]}
+                        for f, e in self.entries.items()}
+        names = {f: e["name"] for f, e in self.entries.items()}
+        encodings = {f: self.encoding(f) for f in self.entries}
+        for filename, name, encoding in items:
+            fingerprints[filename] = self._fingerprint(os.path.join(self.known_faces_dir, filename))
+            names[filename] = name
+            encodings[filename] = encoding
+        self._rebuild(fingerprints, names, encodings)
+
+    def _rebuild(self, fingerprints: Dict[str, dict], names: Dict[str, str],
+                 encodings: Dict[str, Optional[np.ndarray]]) -> None:
+        """Replace the in-memory cache and write it to disk atomically."""
+        entries = {}
+        rows = []
+        for filename in sorted(fingerprints):
+            encoding = encodings.get(filename)
+            row = None
+            if encoding is not None:
+                row = len(rows)
+                rows.append(np.asarray(encoding, dtype=np.float64))
+            entries[filename] = {"name": names[filename], "row": row, **fingerprints[filename]}
+
+        matrix = np.vstack(rows) if rows else np.empty((0, ENCODING_SIZE), dtype=np.float64)
+        self._write(entries, matrix)
+        self.entries = entries
+        self.matrix = matrix
+
+    def _write(self, entries: Dict[str, dict], matrix: np.ndarray) -> None:
+        matrix_file = f".encodings-{uuid.uuid4().hex[:12]}.npy"
+        matrix_path = os.path.join(self.known_faces_dir, matrix_file)
+        with open(matrix_path, 'wb') as f:
+            np.save(f, matrix)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Writing the index is what commits the new matrix
+        fd, tmp_path = tempfile.mkstemp(dir=self.known_faces_dir, prefix=".encodings-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({"matrix": matrix_file, "entries": entries}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.index_path)
+            self._index_stat = self._stat_index()
+        except BaseException:
+            os.unlink(tmp_path)
+            os.unlink(matrix_path)
+            raise
+
+        old_matrix_file, self._matrix_file = self._matrix_file, matrix_file
+        if old_matrix_file and old_matrix_file != matrix_file:
+            try:
+                os.unlink(os.path.join(self.known_faces_dir, old_matrix_file))
+            except FileNotFoundError:
+                pass
+
+    def encoding(self, filename: str) -> Optional[np.ndarray]:
+        """Return the cached encoding for an image, or None if it has no face."""
+        row = self.entries[filename]["row"]
+        return None if row is None else np.array(self.matrix[row])
+
+    def names(self) -> List[str]:
+        """Names of every cached face, in matrix row order."""
+        by_row = sorted((e["row"], e["name"]) for e in self.entries.values() if e["row"] is not None)
+        return [name for _, name in by_row]
+
+    def encodings(self) -> np.ndarray:
+        """All cached encodings as an (N, 128) matrix, in the same order as names()."""
+        return self.matrix
@@ -0,0 +1,157 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from face_store import IMAGE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) flags
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def _load_inotify():
+    """libc with the inotify calls, or None where inotify is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class DirectoryWatcher:
+    def __init__(self, path: str, on_change: Callable[[], None],
+                 debounce: float = 0.5, poll_interval: float = 2.0,
+                 use_inotify: bool = True):
+        """
+        Call on_change on a background thread when face images in a directory change.
+
+        Uses inotify where available and falls back to comparing file
+        mtimes and sizes every poll_interval. Bursts of changes, such as a
+        batch copy, are coalesced: on_change runs once the directory has
+        been quiet for debounce seconds. Only image files are watched, so
+        the encoding cache written next to them does not trigger a reload.
+
+        Args:
+            path: Directory to watch
+            on_change: Called with no arguments after each burst of changes
+            debounce: Quiet period before on_change runs, in seconds
+            poll_interval: Seconds between scans when polling
+            use_inotify: Set False to force polling
+        """
+        self.path = path
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.changes = 0  # bursts reported to on_change
+        self._libc = _load_inotify() if use_inotify else None
+        self._fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._fd is not None else "polling"
+
+    def start(self) -> None:
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0 and self._libc.inotify_add_watch(fd, os.fsencode(self.path), WATCH_MASK) >= 0:
+                self._fd = fd
+            else:
+                logger.warning(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), polling {self.path}")
+                if fd >= 0:
+                    os.close(fd)
+        target = self._inotify_loop if self._fd is not None else self._poll_loop
+        self._thread = threading.Thread(target=target, name="face-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _notify(self) -> None:
+        self.changes += 1
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Failed to apply changes in {self.path}: {str(e)}")
+
+    def _read_events(self, timeout: float) -> bool:
+        """Wait up to timeout for inotify events; True if any concerned an image file."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        relevant = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + length
+            if os.fsdecode(name).lower().endswith(IMAGE_EXTENSIONS):
+                relevant = True
+        return relevant
+
+    def _inotify_loop(self) -> None:
+        while not self._stop.is_set():
+            if not self._read_events(0.5):
+                continue
+            # Keep draining until the burst is over
+            while not self._stop.is_set() and self._read_events(self.debounce):
+                pass
+            if not self._stop.is_set():
+                self._notify()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        try:
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def _poll_loop(self) -> None:
+        previous = self._snapshot()
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            if current == previous:
+                continue
+            # Wait for the burst to finish before reporting it
+            while not self._stop.wait(self.debounce):
+                settled = self._snapshot()
+                if settled == current:
+                    break
+                current = settled
+            previous = current
+            if not self._stop.is_set():
+                self._notify()
@@ -1,20 +1,94 @@
-from typing import Dict, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 import os
-import firebase_admin
-from firebase_admin import credentials, messaging
-from dotenv import load_dotenv
 import logging
+from events import DetectionEvent, EventDeduplicator, detection_event
+from notification_dispatcher import (
+    NotificationDispatcher, NotificationTransport, OutgoingMessage, SendResult
+)
+
+# firebase_admin and dotenv are imported where they are first needed: the
+# Firebase SDK takes a noticeable part of a second to import on a Pi, and
+# importing this module should not read .env or touch the SDK.
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+
+class FcmTransport(NotificationTransport):
+    """Sends message batches through Firebase Cloud Messaging with send_each."""
+
+    def __init__(self):
+        from firebase_admin import exceptions, messaging
+        self.messaging = messaging
+        # Errors FCM may recover from on its own; anything else is permanent
+        self.retryable_errors = (
+            exceptions.UnavailableError,
+            exceptions.InternalError,
+            exceptions.DeadlineExceededError,
+            exceptions.ResourceExhaustedError,
+            exceptions.UnknownError,
+        )
+        self.unregistered_errors = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+
+    def send_each(self, messages: List[OutgoingMessage]) -> List[SendResult]:
+        messaging = self.messaging
+        batch = [
+            messaging.Message(
+                notification=messaging.Notification(title=m.title, body=m.body),
+                data=m.data,
+                token=m.token
+            )
+            for m in messages
+        ]
+        response = messaging.send_each(batch)
+        logger.debug(f"FCM batch: {response.success_count} sent, {response.failure_count} failed")
+        
+        results = []
+        for send_response in response.responses:
+            error = send_response.exception
+            if send_response.success:
+                results.append(SendResult(True))
+            else:
+                results.append(SendResult(
+                    False,
+                    str(error),
+                    retryable=isinstance(error, self.retryable_errors),
+                    unregistered=isinstance(error, self.unregistered_errors)
+                ))
+        return results
+
 
 class FirebaseNotificationSystem:
-    def __init__(self, cred_path: Optional[str] = None):
-        """Initialize the Firebase notification system."""
+    def __init__(self, cred_path: Optional[str] = None,
+                 transport: Optional[NotificationTransport] = None,
+                 deduplicator: Optional[EventDeduplicator] = None):
+        """
+        Initialize the Firebase notification system.
+        
+        Notifications are handed to a background dispatcher, so detection
+        handlers return without waiting on FCM.
+        
+        Args:
+            cred_path: Firebase service account file, defaults to FIREBASE_CREDENTIAL_PATH
+            transport: Transport to deliver through; defaults to FCM
+            deduplicator: Cooldown applied by handle_person_detected; share
+                the recognition system's to throttle both the same way
+        """
+        if transport is None:
+            self._init_firebase(cred_path)
+            transport = FcmTransport()
+        
+        self.household_members: Dict[str, str] = {}  # name -> FCM token
+        self.deduplicator = deduplicator or EventDeduplicator(default_window=0)  # Prevent spam notifications
+        self.dispatcher = NotificationDispatcher(transport, on_unregistered=self._remove_token)
+    
+    @staticmethod
+    def _init_firebase(cred_path: Optional[str]) -> None:
+        import firebase_admin
+        from firebase_admin import credentials
+        from dotenv import load_dotenv
+
         if not firebase_admin._apps:
+            load_dotenv()
             cred_path = cred_path or os.getenv('FIREBASE_CREDENTIAL_PATH')
             if not cred_path:
                 raise ValueError(
@@ -24,90 +98,90 @@ class FirebaseNotificationSystem:
             
             cred = credentials.Certificate(cred_path)
             firebase_admin.initialize_app(cred)
-        
-        self.household_members: Dict[str, str] = {}  # name -> FCM token
-        self.notification_history: Dict[str, datetime] = {}  # name -> last notification time
-        self.cooldown_period = timedelta(minutes=0)  # Prevent spam notifications
     
     def add_household_member(self, name: str, fcm_token: str) -> None:
         """Add or update a household member's FCM token."""
         logger.debug(f"Adding household member: {name} with token: {fcm_token[:20]}...")
         self.household_members[name.lower()] = fcm_token
     
-    def _should_notify(self, name: str) -> bool:
-        """Check if enough time has passed since the last notification."""
-        if name not in self.notification_history:
-            return True
-            
-        time_since_last = datetime.now() - self.notification_history[name]
-        return time_since_last > self.cooldown_period
+    def _remove_token(self, fcm_token: str) -> None:
+        """Drop household members whose token FCM reports as unregistered; runs on the dispatcher thread."""
+        for name, token in list(self.household_members.items()):
+            if token == fcm_token:
+                logger.warning(f"Removing unregistered token for household member: {name}")
+                self.household_members.pop(name, None)
     
-    def send_notification(self, token: str, title: str, body: str) -> None:
-        """Send a notification to a specific token."""
-        try:
-            message = messaging.Message(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body
-                ),
-                token=token
-            )
-            response = messaging.send(message)
-            logger.debug(f"Notification sent successfully: {response}")
-        except Exception as e:
-            logger.error(f"Failed to send notification: {str(e)}")
-            raise
+    def send_notification(self, token: str, title: str, body: str,
+                          data: Optional[Dict[str, str]] = None) -> None:
+        """Queue a notification for a specific token."""
+        self.dispatcher.submit([OutgoingMessage(token, title, body, data)])
     
-    def notify_household(self, title: str, body: str, exclude_name: Optional[str] = None) -> None:
+    def notify_household(self, title: str, body: str, exclude_name: Optional[str] = None,
+                         data: Optional[Dict[str, str]] = None) -> None:
         """Send a notification to all household members except the one specified."""
         exclude_name = exclude_name.lower() if exclude_name else None
         
-        for name, token in self.household_members.items():
-            if name != exclude_name:
-                try:
-                    self.send_notification(token, title, body)
-                except Exception as e:
-                    logger.error(f"Failed to send notification to {name}: {str(e)}")
+        # All recipients go out in the same batch
+        self.dispatcher.submit([
+            OutgoingMessage(token, title, body, data)
+            for name, token in list(self.household_members.items())
+            if name != exclude_name
+        ])
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued notifications to be delivered."""
+        return self.dispatcher.flush(timeout)
 
     def handle_person_detected(self, name: str, is_known: bool = True) -> None:
         """Handle person detection event and send appropriate notifications."""
-        name_lower = name.lower()
-        current_time = datetime.now()
-        
-        logger.debug(f"Handling {'known' if is_known else 'unknown'} person detection: {name}")
+        event = detection_event(name if is_known else "Unknown")
         
         # Check cooldown period
-        if not self._should_notify(name_lower):
+        if not self.deduplicator.should_emit(event):
             logger.debug(f"Skipping notification due to cooldown for: {name}")
             return
-            
-        self.notification_history[name_lower] = current_time
         
-        if is_known:
+        self.notify_event(event)
+    
+    def notify_event(self, event: DetectionEvent) -> None:
+        """
+        Send the notifications for a detection that has already passed deduplication.
+        
+        Args:
+            event: The detection
+        """
+        name = event.identity
+        name_lower = name.lower()
+        
+        logger.debug(f"Handling {'known' if event.is_known else 'unknown'} person detection: {name}")
+        
+        if event.is_known:
             # First, send a personal welcome notification to the detected person
-            if name_lower in self.household_members:
-                try:
-                    personal_token = self.household_members[name_lower]
-                    self.send_notification(
-                        personal_token,
-                        "Welcome Home!",
-                        f"Welcome back, {name}!"
-                    )
-                    logger.debug(f"Sent welcome notification to {name}")
-                except Exception as e:
-                    logger.error(f"Failed to send welcome notification to {name}: {str(e)}")
+            # The dispatcher thread may drop the member at any moment, so look up only once
+            personal_token = self.household_members.get(name_lower)
+            if personal_token:
+                self.send_notification(
+                    personal_token,
+                    "Welcome Home!",
+                    f"Welcome back, {name}!"
+                )
+                logger.debug(f"Queued welcome notification to {name}")
             
             # Then notify others about their arrival
             title = "Household Update"
             body = f"{name} has arrived home."
+            if event.camera:
+                body = f"{name} has arrived home ({event.camera})."
             self.notify_household(title, body, exclude_name=name)
             
         else:
             # Unknown person detected - notify everyone
             title = "⚠️ Security Alert"
-            body = "Unknown person detected at the entrance"
+            body = f"Unknown person detected at the {event.camera or 'entrance'}"
             self.notify_household(title, body)
 
-def create_notification_system(cred_path: Optional[str] = None) -> FirebaseNotificationSystem:
+def create_notification_system(cred_path: Optional[str] = None,
+                               transport: Optional[NotificationTransport] = None,
+                               deduplicator: Optional[EventDeduplicator] = None) -> FirebaseNotificationSystem:
     """Create a notification system instance."""
-    return FirebaseNotificationSystem(cred_path)
\ No newline at end of file
+    return FirebaseNotificationSystem(cred_path, transport, deduplicator)
\ No newline at end of file
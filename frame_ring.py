@@ -0,0 +1,137 @@
+import threading
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class FrameRing:
+    def __init__(self, slots: int, shape: Tuple[int, ...], dtype=np.uint8, name: Optional[str] = None):
+        """
+        Fixed set of preallocated frame buffers in shared memory.
+
+        Capture writes each frame straight into a free slot and hands the
+        slot index to later stages, which read the NumPy view in place.
+        Every holder of a slot takes a reference with retain() and gives it
+        back with release(); a slot is only reused once nobody holds it, so
+        after start-up no frame memory is allocated at all. Another process
+        can map the same buffers by name and read slots by index while the
+        creating process keeps the reference counts.
+
+        Args:
+            slots: Number of frame buffers
+            shape: Shape of every frame, e.g. (480, 640, 3)
+            dtype: Pixel type
+            name: Attach to the ring another process created under this name
+        """
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.exhausted = 0  # acquire() calls that found every slot held
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, slots * self.frame_bytes))
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._owner = name is None
+        self._frames = self._views()
+        self._refs = [0] * slots
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def _views(self) -> List[np.ndarray]:
+        return [np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf, offset=i * self.frame_bytes)
+                for i in range(self.slots)]
+
+    @property
+    def name(self) -> str:
+        """Shared-memory name other processes attach to."""
+        return self._shm.name
+
+    def frame(self, slot: int) -> np.ndarray:
+        """View of a slot's buffer; only valid while a reference to the slot is held."""
+        return self._frames[slot]
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        Take a free slot for writing, holding one reference to it.
+
+        Returns:
+            The slot index, or None if every slot stayed held until the timeout
+        """
+        with self._cond:
+            slot = self._free_slot()
+            if slot is None:
+                self.exhausted += 1
+                self._cond.wait_for(lambda: self._free_slot() is not None, timeout)
+                slot = self._free_slot()
+                if slot is None:
+                    return None
+            self._refs[slot] = 1
+            self._next = (slot + 1) % self.slots
+            return slot
+
+    def _free_slot(self) -> Optional[int]:
+        # Round-robin from the last slot handed out, so the oldest buffers are reused first
+        for offset in range(self.slots):
+            slot = (self._next + offset) % self.slots
+            if self._refs[slot] == 0:
+                return slot
+        return None
+
+    def retain(self, slot: int) -> None:
+        with self._cond:
+            if self._refs[slot] <= 0:
+                raise ValueError(f"Slot {slot} is not held")
+            self._refs[slot] += 1
+
+    def release(self, slot: int) -> None:
+        with self._cond:
+            if self._refs[slot] <= 0:
+                raise ValueError(f"Slot {slot} is not held")
+            self._refs[slot] -= 1
+            if self._refs[slot] == 0:
+                self._cond.notify()
+
+    def in_use(self) -> int:
+        with self._cond:
+            return sum(1 for refs in self._refs if refs)
+
+    def report(self) -> Dict[str, int]:
+        return {"slots": self.slots, "in_use": self.in_use(), "exhausted": self.exhausted}
+
+    def close(self) -> None:
+        """Unmap the buffers, and free them if this process created the ring."""
+        self._frames = []
+        try:
+            self._shm.close()
+        except BufferError:
+            # A caller still holds a view; the mapping goes away with the process
+            pass
+        if self._owner:
+            self._shm.unlink()
+
+
+class ScratchBuffers:
+    def __init__(self):
+        """
+        Scratch arrays reused across frames, one per purpose.
+
+        Each purpose keeps a single flat buffer that is only reallocated
+        when a larger shape is asked for, so inputs of ever-changing sizes
+        (motion ROI crops) do not pile up buffers. Not thread-safe; keep
+        one per thread.
+        """
+        self._buffers: Dict[str, np.ndarray] = {}
+
+    def get(self, purpose: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """Contiguous uint8 array of the given shape, usable as an OpenCV dst."""
+        size = int(np.prod(shape))
+        backing = self._buffers.get(purpose)
+        if backing is None or backing.size < size:
+            backing = self._buffers[purpose] = np.empty(size, dtype=np.uint8)
+        return backing[:size].reshape(shape)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(backing.nbytes for backing in self._buffers.values())
@@ -0,0 +1,347 @@
+import copy
+import math
+import os
+import re
+import tempfile
+import zipfile
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+ENCODING_SIZE = 128
+
+# Trained IVF centroids, kept next to the encoding cache in known_faces
+IVF_INDEX_FILENAME = ".gallery-ivf.npz"
+
+# Matches the "_YYYYMMDD_HHMMSS" suffix add_new_face appends to image names,
+# and the "_N" sample number bulk enrollment adds after it
+_TIMESTAMP_SUFFIX = re.compile(r"_\d{8}_\d{6}(_\d+)?$")
+
+
+class Match(NamedTuple):
+    name: str
+    distance: float
+    confidence: float
+
+
+def person_name(name: str) -> str:
+    """Strip the registration timestamp from a gallery entry name."""
+    return _TIMESTAMP_SUFFIX.sub("", name)
+
+
+def distance_to_confidence(distances: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Map face distances to a 0-1 confidence score.
+
+    Distances at the tolerance map to 0.5; the curve is steep around the
+    threshold so that clear matches approach 1 and clear misses approach 0.
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    above = (1.0 - distances) / ((1.0 - tolerance) * 2.0)
+    linear = 1.0 - distances / (tolerance * 2.0)
+    below = linear + (1.0 - linear) * np.power(np.clip((linear - 0.5) * 2, 0, None), 0.2)
+    return np.clip(np.where(distances > tolerance, above, below), 0.0, 1.0)
+
+
+class GalleryIndex:
+    def __init__(self, encodings: Optional[Sequence] = None,
+                 names: Optional[Sequence[str]] = None,
+                 tolerance: float = 0.6,
+                 aggregation: str = "min"):
+        """
+        Known-face gallery held as one contiguous float32 matrix.
+
+        Rows are grouped by person (the entry name without its registration
+        timestamp) so that a whole frame can be matched with one matrix
+        product and reduced per person in a single pass.
+
+        Args:
+            encodings: Known face encodings, one per entry
+            names: Entry names, e.g. "Jason_20240101_120000"
+            tolerance: Maximum distance for a match to count
+            aggregation: How to combine a person's entries, "min" or "mean"
+        """
+        if aggregation not in ("min", "mean"):
+            raise ValueError(f"Unknown aggregation: {aggregation}")
+        self.tolerance = tolerance
+        self.aggregation = aggregation
+        self._build(np.asarray(encodings if encodings is not None else [],
+                               dtype=np.float32).reshape(-1, ENCODING_SIZE),
+                    list(names or []))
+
+    def _build(self, encodings: np.ndarray, names: List[str]) -> None:
+        if len(encodings) != len(names):
+            raise ValueError("encodings and names must have the same length")
+
+        order = sorted(range(len(names)), key=lambda i: person_name(names[i]))
+        self.names = [names[i] for i in order]
+        self.matrix = np.ascontiguousarray(encodings[order], dtype=np.float32)
+        self.sq_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+
+        self.people: List[str] = []
+        starts = []
+        for row, name in enumerate(self.names):
+            person = person_name(name)
+            if not self.people or self.people[-1] != person:
+                self.people.append(person)
+                starts.append(row)
+        self.person_starts = np.asarray(starts, dtype=np.intp)
+        self.person_counts = np.diff(np.append(self.person_starts, len(self.names)))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, encoding, name: str) -> None:
+        """Add a single entry, rebuilding the grouped matrix."""
+        encodings = np.vstack([self.matrix, np.asarray(encoding, dtype=np.float32).reshape(1, -1)])
+        self._build(encodings, self.names + [name])
+
+    def with_entry(self, encoding, name: str) -> "GalleryIndex":
+        """Copy of this index with one more entry; the original is left untouched for readers."""
+        gallery = copy.copy(self)
+        gallery.add(encoding, name)
+        return gallery
+
+    def rebuilt(self, encodings: Sequence, names: Sequence[str]) -> "GalleryIndex":
+        """New index of the same kind and settings over different entries."""
+        return GalleryIndex(encodings, names, tolerance=self.tolerance, aggregation=self.aggregation)
+
+    def entry_counts(self) -> Dict[str, int]:
+        """Number of gallery entries per person."""
+        return dict(zip(self.people, self.person_counts.tolist()))
+
+    def distances(self, face_encodings: Sequence) -> np.ndarray:
+        """
+        Euclidean distance from every face to every gallery entry.
+
+        Returns:
+            (N faces, M entries) float32 matrix
+        """
+        faces = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        sq = (np.einsum('ij,ij->i', faces, faces)[:, None]
+              + self.sq_norms[None, :]
+              - 2.0 * faces @ self.matrix.T)
+        return np.sqrt(np.maximum(sq, 0.0, out=sq), out=sq)
+
+    def person_distances(self, face_encodings: Sequence) -> np.ndarray:
+        """
+        Distance from every face to every person, aggregated over their entries.
+
+        Returns:
+            (N faces, P people) float32 matrix, columns ordered as self.people
+        """
+        distances = self.distances(face_encodings)
+        if self.aggregation == "mean":
+            return np.add.reduceat(distances, self.person_starts, axis=1) / self.person_counts
+        return np.minimum.reduceat(distances, self.person_starts, axis=1)
+
+    def match(self, face_encodings: Sequence) -> List[Match]:
+        """
+        Find the nearest person for each face.
+
+        Faces whose nearest person is farther than the tolerance are
+        reported as "Unknown", still with their nearest distance.
+
+        Args:
+            face_encodings: Encodings of the faces found in a frame
+
+        Returns:
+            List of Match, one per face
+        """
+        if len(face_encodings) == 0:
+            return []
+        if not self.people:
+            return [Match("Unknown", float("inf"), 0.0) for _ in face_encodings]
+
+        per_person = self.person_distances(face_encodings)
+        best = per_person.argmin(axis=1)
+        return self._matches(best, per_person[np.arange(len(best)), best])
+
+    def _matches(self, best: np.ndarray, best_distances: np.ndarray) -> List[Match]:
+        """Turn each face's nearest person index and distance into a Match."""
+        confidences = distance_to_confidence(best_distances, self.tolerance)
+        matches = []
+        for person, distance, confidence in zip(best, best_distances, confidences):
+            name = self.people[person] if distance <= self.tolerance else "Unknown"
+            matches.append(Match(name, float(distance), float(confidence)))
+        return matches
+
+
+class IVFGalleryIndex(GalleryIndex):
+    def __init__(self, encodings: Optional[Sequence] = None,
+                 names: Optional[Sequence[str]] = None,
+                 tolerance: float = 0.6,
+                 aggregation: str = "min",
+                 nprobe: int = 8,
+                 min_train_size: int = 4096,
+                 index_path: Optional[str] = None,
+                 centroids: Optional[np.ndarray] = None,
+                 seed: int = 0):
+        """
+        Approximate gallery index: an inverted file over k-means cells.
+
+        Entries are assigned to the nearest of ~sqrt(N) centroids and stored
+        contiguously per cell, so a batch of faces is only compared against
+        the entries in each face's nprobe nearest cells. With "mean"
+        aggregation the people found in those cells are then scored over all
+        of their entries. Below min_train_size entries the exact scan is
+        faster and is used instead.
+
+        Centroids are saved to index_path after training and loaded from it
+        on start-up. Rebuilds and added entries are assigned to the existing
+        centroids; k-means only runs again once the gallery has grown to four
+        times the size it was trained on.
+
+        Args:
+            encodings, names, tolerance, aggregation: As for GalleryIndex
+            nprobe: Cells searched per face; higher is slower but more accurate
+            min_train_size: Smallest gallery the approximate search is used for
+            index_path: .npz file the trained centroids are persisted in
+            centroids: Centroids to reuse instead of loading or training
+            seed: Seed for the k-means initialization
+        """
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.index_path = index_path
+        self.seed = seed
+        self.centroids = centroids
+        # Training uses ~sqrt(N) cells, so given centroids imply the gallery size they suit
+        self.trained_size = 0 if centroids is None else len(centroids) ** 2
+        if centroids is None and index_path and os.path.exists(index_path):
+            self._load(index_path)
+        super().__init__(encodings, names, tolerance, aggregation)
+
+    def _load(self, path: str) -> None:
+        try:
+            with np.load(path) as data:
+                centroids = data["centroids"]
+                trained_size = int(data["trained_size"])
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            # Missing, truncated or foreign file; the centroids are retrained
+            return
+        if centroids.ndim == 2 and centroids.shape[1] == ENCODING_SIZE:
+            self.centroids = centroids.astype(np.float32)
+            self.trained_size = trained_size
+
+    def save(self, path: str) -> None:
+        """Persist the trained centroids, replacing the file atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                        prefix=os.path.basename(path) + "-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, centroids=self.centroids, trained_size=self.trained_size)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @property
+    def trained(self) -> bool:
+        """Whether matching uses the approximate search."""
+        return self.cell_starts is not None
+
+    def _build(self, encodings: np.ndarray, names: List[str]) -> None:
+        super()._build(encodings, names)
+        self.cell_starts = None
+        if len(self.names) < self.min_train_size:
+            return
+
+        if self.centroids is None or len(self.names) > 4 * self.trained_size:
+            self._train()
+            if self.index_path:
+                self.save(self.index_path)
+
+        cells = _squared_distances(self.matrix, self.centroids).argmin(axis=1)
+        order = np.argsort(cells, kind="stable")
+        self.cell_matrix = np.ascontiguousarray(self.matrix[order])
+        self.cell_sq_norms = self.sq_norms[order]
+        self.cell_people = np.repeat(np.arange(len(self.people)), self.person_counts)[order]
+        self.cell_starts = np.searchsorted(cells[order], np.arange(len(self.centroids) + 1))
+
+    def _train(self, iterations: int = 10) -> None:
+        """Run k-means on (a sample of) the gallery."""
+        rng = np.random.default_rng(self.seed)
+        count = len(self.matrix)
+        nlist = max(1, int(math.sqrt(count)))
+        sample = self.matrix
+        if count > 64 * nlist:
+            sample = self.matrix[rng.choice(count, 64 * nlist, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = _squared_distances(sample, centroids).argmin(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            sizes = np.bincount(assignment, minlength=nlist)
+            # A cell that lost all its points keeps its previous centroid
+            filled = sizes > 0
+            centroids[filled] = sums[filled] / sizes[filled, None]
+        self.centroids = centroids
+        self.trained_size = count
+
+    def rebuilt(self, encodings: Sequence, names: Sequence[str]) -> "IVFGalleryIndex":
+        """New index over different entries, keeping the trained centroids."""
+        return IVFGalleryIndex(encodings, names, tolerance=self.tolerance, aggregation=self.aggregation,
+                               nprobe=self.nprobe, min_train_size=self.min_train_size,
+                               index_path=self.index_path, centroids=self.centroids, seed=self.seed)
+
+    def match(self, face_encodings: Sequence) -> List[Match]:
+        if len(face_encodings) == 0 or not self.trained:
+            return super().match(face_encodings)
+
+        faces = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        face_sq_norms = np.einsum('ij,ij->i', faces, faces)
+        probes = _squared_distances(faces, self.centroids)
+        nprobe = min(self.nprobe, probes.shape[1])
+        probes = np.argpartition(probes, nprobe - 1, axis=1)[:, :nprobe]
+
+        # Gather the entries of every probed cell, then score them all in one product
+        cells = np.unique(probes)
+        starts, counts = self.cell_starts[cells], np.diff(self.cell_starts)[cells]
+        rows = _ranges(starts, counts)
+        if not len(rows):
+            return [Match("Unknown", float("inf"), 0.0) for _ in faces]
+        if self.aggregation == "mean":
+            return self._mean_matches(faces, np.unique(self.cell_people[rows]))
+
+        sq = (face_sq_norms[:, None] + self.cell_sq_norms[None, rows]
+              - 2.0 * faces @ self.cell_matrix[rows].T)
+        if len(faces) > 1:
+            # Each face only considers the cells it probed itself
+            probed = np.zeros((len(faces), len(self.centroids)), dtype=bool)
+            probed[np.arange(len(faces))[:, None], probes] = True
+            sq[~probed[:, np.repeat(cells, counts)]] = np.inf
+        nearest = sq.argmin(axis=1)
+        nearest_sq = sq[np.arange(len(faces)), nearest]
+        return self._matches(self.cell_people[rows[nearest]], np.sqrt(np.maximum(nearest_sq, 0.0)))
+
+    def _mean_matches(self, faces: np.ndarray, people: np.ndarray) -> List[Match]:
+        """Mean-aggregated matching against all entries of the candidate people."""
+        counts = self.person_counts[people]
+        rows = _ranges(self.person_starts[people], counts)
+        sq = (np.einsum('ij,ij->i', faces, faces)[:, None] + self.sq_norms[None, rows]
+              - 2.0 * faces @ self.matrix[rows].T)
+        offsets = np.cumsum(counts) - counts
+        per_person = np.add.reduceat(np.sqrt(np.maximum(sq, 0.0)), offsets, axis=1) / counts
+        best = per_person.argmin(axis=1)
+        return self._matches(people[best], per_person[np.arange(len(best)), best])
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, start + count) for each pair, without a Python loop."""
+    offsets = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - np.repeat(offsets - starts, counts)
+
+
+def _squared_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (np.einsum('ij,ij->i', a, a)[:, None]
+            + np.einsum('ij,ij->i', b, b)[None, :]
+            - 2.0 * a @ b.T)
+
+
+# Gallery index implementations selectable by name
+GALLERY_BACKENDS = {
+    "exact": GalleryIndex,
+    "ivf": IVFGalleryIndex,
+}
@@ -1,26 +1,26 @@
-from camera import capture_image
-from recognition import recognize_person
-from notifications import send_notification
-from profiles import load_profiles, add_profile
+"""
+Start the Welcome Home Bot on the fastest path to a live camera.
 
-def main():
-    # Load profiles
-    profiles = load_profiles()
+Only the camera, motion detection and their helpers are imported up front.
+Firebase and the face recognition models load on background threads while
+the camera opens, so frames are captured and motion-checked (and clips
+buffered) before recognition is ready. A report of when each startup phase
+finished, measured from process start, is printed once everything is up.
+Takes the same arguments as camera.py.
+
+Examples:
+    python main.py
+    python main.py --headless --camera front=0 --metrics-port 9100
+"""
+from startup import StartupTimer, process_start
 
-    # Capture image from camera
-    image = capture_image()
 
-    # Identify person
-    person, height = recognize_person(image, profiles)
+def main():
+    startup = StartupTimer(origin=process_start())
+    with startup.phase("imports"):
+        import camera
+    camera.main(startup)
 
-    if person:
-        print(f"Recognized: {person['name']}")
-        # send_notification(person['name'], person['phone'])
-    else:
-        print("Unrecognized person detected!")
-        new_profile = add_profile(height)
-        profiles.append(new_profile)
-        # You can also send a notification for unrecognized person
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,251 @@
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a fast gallery match up to a slow CNN detection or FCM round trip
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _label_key(labels) -> tuple:
+    return labels if isinstance(labels, tuple) else (labels,)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\"", r"\"").replace("\n", r"\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str,
+                 labelnames: Sequence[str] = (), fn: Optional[Callable] = None):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def values(self) -> Dict[tuple, float]:
+        """Current value per label tuple, read from fn when the metric has one."""
+        if self.fn is None:
+            with self._lock:
+                return dict(self._values)
+        values = self.fn()
+        if not isinstance(values, dict):
+            return {(): values}
+        return {_label_key(labels): value for labels, value in values.items()}
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for labels, value in sorted(self.values().items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, labels=()) -> None:
+        if not self.registry.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, labels=()) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str,
+                 labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[tuple, List[int]] = {}  # per-bucket counts, the last one for +Inf
+        self._sums: Dict[tuple, float] = {}
+
+    def observe(self, value: float, labels=()) -> None:
+        if not self.registry.enabled:
+            return
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            snapshot = {key: (list(counts), self._sums[key]) for key, counts in self._counts.items()}
+        for labels, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, labels, le), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _format_labels(self.labelnames, labels), cumulative
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Named counters, gauges and histograms rendered in the Prometheus text format.
+
+        Nothing is recorded while the registry is disabled, so counters and
+        histograms on the hot path cost one attribute check until a
+        MetricsServer starts. Metrics given an fn are read from it at scrape
+        time instead, which suits values the code already keeps, like queue
+        drop counts. Asking for an existing name returns the same metric,
+        and registering it again with an fn replaces the callback.
+        """
+        self.enabled = False
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labelnames: Sequence[str], fn: Optional[Callable] = None,
+             **options) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, help, labelnames, **options)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            if fn is not None:
+                metric.fn = fn
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = (),
+                fn: Optional[Callable] = None) -> Counter:
+        return self._get(Counter, name, help, labelnames, fn)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (),
+              fn: Optional[Callable] = None) -> Gauge:
+        return self._get(Gauge, name, help, labelnames, fn)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                logger.error(f"Failed to collect metric {metric.name}: {str(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+# Registry the bot's modules record into
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1",
+                 port: int = 9100, profiler=None):
+        """
+        HTTP endpoint for Prometheus scrapes (/metrics) and on-demand profiles (/profile).
+
+        Starting the server enables recording in the registry; stopping it
+        disables it again. GET /profile?seconds=10 samples the bot's threads
+        for that long and returns the hottest functions, or folded stacks
+        for a flame graph with &format=collapsed.
+
+        Args:
+            registry: Registry to serve
+            host: Interface to listen on, local only by default
+            port: TCP port
+            profiler: Optional SamplingProfiler behind /profile
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.profiler = profiler
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/metrics":
+                    self._reply(200, server.registry.render(), CONTENT_TYPE)
+                elif url.path == "/profile" and server.profiler is not None:
+                    query = parse_qs(url.query)
+                    try:
+                        seconds = min(60.0, float(query.get("seconds", ["5"])[0]))
+                    except ValueError:
+                        self._reply(400, "seconds must be a number\n")
+                        return
+                    result = server.profiler.profile(seconds)
+                    if query.get("format", [""])[0] == "collapsed":
+                        self._reply(200, result.collapsed())
+                    else:
+                        self._reply(200, result.report())
+                else:
+                    self._reply(404, "not found\n")
+
+            def _reply(self, status: int, body: str, content_type: str = "text/plain; charset=utf-8"):
+                data = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # Prometheus scrapes every few seconds; keep them out of the log
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self.registry.enabled = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self.registry.enabled = False
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
@@ -0,0 +1,112 @@
+from typing import Dict, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from frame_ring import ScratchBuffers
+
+
+class MotionResult(NamedTuple):
+    active: bool  # recognition should run on this frame
+    onset: bool  # first active frame after an idle period
+    roi: Optional[tuple]  # changed region (top, right, bottom, left) in full-resolution pixels
+
+
+class MotionGate:
+    def __init__(self, thumbnail_width: int = 160, threshold: int = 25,
+                 min_area: float = 0.002, learning_rate: float = 0.05,
+                 hold_frames: int = 30, crop_to_roi: bool = False,
+                 roi_padding: float = 0.25):
+        """
+        Cheap motion detector that decides whether a frame needs face recognition.
+
+        Each frame is shrunk to a small blurred grayscale thumbnail and
+        compared against a running-average background. Recognition stays
+        enabled for hold_frames after the last motion so that someone
+        standing still at the door is still recognized.
+
+        Args:
+            thumbnail_width: Width of the thumbnail motion is measured on
+            threshold: Per-pixel intensity change (0-255) that counts as motion
+            min_area: Fraction of thumbnail pixels that must change
+            learning_rate: How quickly the background absorbs scene changes
+            hold_frames: Frames to keep recognition active after motion stops
+            crop_to_roi: Report the changed region so recognition can crop to it
+            roi_padding: Fraction of the region size added on each side
+        """
+        self.thumbnail_width = thumbnail_width
+        self.threshold = threshold
+        self.min_area = min_area
+        self.learning_rate = learning_rate
+        self.hold_frames = hold_frames
+        self.crop_to_roi = crop_to_roi
+        self.roi_padding = roi_padding
+
+        self.background: Optional[np.ndarray] = None
+        self.frames_since_motion = hold_frames + 1
+        self.frames_gated = 0
+        self.frames_processed = 0
+        self._buffers = ScratchBuffers()
+
+    def _thumbnail(self, frame) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (self.thumbnail_width, max(1, round(height * self.thumbnail_width / width)))
+        shape = (size[1], size[0])
+        small = cv2.resize(frame, size, dst=self._buffers.get("small", shape + frame.shape[2:]),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._buffers.get("gray", shape))
+        return cv2.GaussianBlur(gray, (5, 5), 0, dst=self._buffers.get("blurred", shape))
+
+    def _roi(self, mask: np.ndarray, frame_shape) -> tuple:
+        """Map the bounding box of changed thumbnail pixels to padded full-resolution pixels."""
+        x, y, w, h = cv2.boundingRect(mask)
+        pad_x, pad_y = w * self.roi_padding, h * self.roi_padding
+        frame_height, frame_width = frame_shape[:2]
+        scale = frame_width / mask.shape[1]
+        top = max(0, int((y - pad_y) * scale))
+        left = max(0, int((x - pad_x) * scale))
+        bottom = min(frame_height, int((y + h + pad_y) * scale))
+        right = min(frame_width, int((x + w + pad_x) * scale))
+        return (top, right, bottom, left)
+
+    def check(self, frame) -> MotionResult:
+        """
+        Measure motion in a BGR frame and update the background model.
+
+        Args:
+            frame: Full-resolution BGR frame
+
+        Returns:
+            MotionResult saying whether to run recognition and where
+        """
+        gray = self._thumbnail(frame)
+        was_idle = self.frames_since_motion > self.hold_frames
+
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            moved, roi = True, None
+        else:
+            background = cv2.convertScaleAbs(self.background, dst=self._buffers.get("background", gray.shape))
+            diff = cv2.absdiff(gray, background, dst=self._buffers.get("diff", gray.shape))
+            _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY,
+                                    dst=self._buffers.get("mask", gray.shape))
+            moved = cv2.countNonZero(mask) >= self.min_area * mask.size
+            roi = self._roi(mask, frame.shape) if moved and self.crop_to_roi else None
+            cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        self.frames_since_motion = 0 if moved else self.frames_since_motion + 1
+        active = self.frames_since_motion <= self.hold_frames
+        if active:
+            self.frames_processed += 1
+        else:
+            self.frames_gated += 1
+        return MotionResult(active, active and was_idle, roi)
+
+    def report(self) -> Dict[str, float]:
+        """Counters for frames skipped and passed to recognition."""
+        total = self.frames_gated + self.frames_processed
+        return {
+            "frames_gated": self.frames_gated,
+            "frames_processed": self.frames_processed,
+            "gated_ratio": self.frames_gated / total if total else 0.0,
+        }
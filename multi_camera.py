@@ -0,0 +1,206 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pipeline import RecognitionResult, StageStats, TimedFrame
+
+logger = logging.getLogger(__name__)
+
+
+class CameraFeed:
+    def __init__(self, name: str, cap, stream, motion_gate=None):
+        """
+        One camera in a multi-camera pipeline.
+
+        Args:
+            name: Camera name, attached to its detection events
+            cap: Opened cv2.VideoCapture for the camera
+            stream: StreamState holding the camera's face tracks
+            motion_gate: Optional MotionGate for the camera
+        """
+        self.name = name
+        self.cap = cap
+        self.stream = stream
+        self.motion_gate = motion_gate
+        self.pending: Optional[TimedFrame] = None  # newest frame waiting for a worker
+        self.busy = False  # a worker is processing one of this camera's frames
+        self.dropped = 0
+        self.running = True
+        self.error: Optional[str] = None
+        self.latest_frame: Optional[TimedFrame] = None
+        self.latest_result = RecognitionResult(-1, 0.0, [], [])
+        self.stats = {"capture": StageStats(), "recognition": StageStats()}
+
+
+class MultiCameraPipeline:
+    def __init__(self, face_system, sources: Dict[str, object],
+                 workers: Optional[int] = None,
+                 motion_gate_factory: Optional[Callable] = None,
+                 open_capture: Optional[Callable] = None):
+        """
+        Serve several cameras from one FaceRecognitionSystem and one worker pool.
+
+        Every camera has its own capture thread and tracking state, but all
+        of them share the gallery, the deduplicator and the recognition
+        workers. Each camera keeps only its newest frame; workers take
+        cameras round-robin and never run two frames of the same camera at
+        once, so a busy camera cannot starve the others.
+
+        The workers are threads, and dlib holds the GIL for most of face
+        location and encoding, so extra workers mostly overlap I/O and
+        matching. Throughput only scales across cores when the face system
+        encodes on a process pool (encoding_processes).
+
+        Args:
+            face_system: Shared FaceRecognitionSystem
+            sources: Camera name -> device index, video file or RTSP URL
+            workers: Number of recognition threads, defaults to the CPU count
+            motion_gate_factory: Creates a MotionGate per camera, or None to disable gating
+            open_capture: Opens a source, defaults to cv2.VideoCapture
+        """
+        if open_capture is None:
+            import cv2
+            open_capture = cv2.VideoCapture
+        self.face_system = face_system
+        self.workers = workers or os.cpu_count() or 1
+        self.feeds: List[CameraFeed] = []
+        for name, source in sources.items():
+            cap = open_capture(source)
+            if not cap.isOpened():
+                raise ValueError(f"Could not open camera {name}: {source}")
+            gate = motion_gate_factory() if motion_gate_factory else None
+            self.feeds.append(CameraFeed(name, cap, face_system.new_stream(name), gate))
+
+        self.running = False
+        self._cond = threading.Condition()
+        self._next_feed = 0
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self.running = True
+        for feed in self.feeds:
+            self._threads.append(threading.Thread(
+                target=self._capture_loop, args=(feed,), name=f"capture-{feed.name}", daemon=True))
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(
+                target=self._recognition_loop, name=f"recognition-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        for feed in self.feeds:
+            feed.cap.release()
+
+    def _capture_loop(self, feed: CameraFeed) -> None:
+        seq = 0
+        while self.running:
+            ret, frame = feed.cap.read()
+            if not ret:
+                feed.error = "Could not read frame."
+                break
+
+            timed = TimedFrame(seq, time.monotonic(), frame)
+            seq += 1
+            feed.stats["capture"].tick()
+            motion = feed.motion_gate.check(frame) if feed.motion_gate else None
+
+            with self._cond:
+                feed.latest_frame = timed
+                if motion is None or motion.active:
+                    if motion is not None:
+                        timed = timed._replace(motion_onset=motion.onset, roi=motion.roi)
+                    if feed.pending is not None:
+                        feed.dropped += 1
+                    feed.pending = timed
+                    self._cond.notify()
+                elif feed.motion_gate.frames_since_motion == feed.motion_gate.hold_frames + 1:
+                    # The scene just went idle; clear boxes left over from the last visitor
+                    feed.latest_result = RecognitionResult(timed.seq, timed.timestamp, [], [])
+
+        with self._cond:
+            feed.running = False
+            self._cond.notify_all()
+
+    def _take_job(self) -> Optional[Tuple[CameraFeed, TimedFrame]]:
+        """Pick the next idle camera with a waiting frame, round-robin; None once stopped."""
+        with self._cond:
+            while self.running:
+                for offset in range(len(self.feeds)):
+                    index = (self._next_feed + offset) % len(self.feeds)
+                    feed = self.feeds[index]
+                    if feed.pending is not None and not feed.busy:
+                        self._next_feed = index + 1
+                        timed, feed.pending = feed.pending, None
+                        feed.busy = True
+                        return feed, timed
+                self._cond.wait()
+            return None
+
+    def _recognition_loop(self) -> None:
+        while True:
+            job = self._take_job()
+            if job is None:
+                return
+            feed, timed = job
+            result = None
+            try:
+                face_names, face_locations = self.face_system.process_frame(
+                    timed.frame, motion_detected=timed.motion_onset, roi=timed.roi, stream=feed.stream)
+                feed.stats["recognition"].tick(time.monotonic() - timed.timestamp)
+                result = RecognitionResult(timed.seq, timed.timestamp, face_names, face_locations)
+            except Exception:
+                # Keep the worker for the next frame; the pool would otherwise shrink with every failure
+                logger.exception(f"Recognition failed on frame {timed.seq} of camera {feed.name}")
+                feed.stats["recognition"].error()
+            finally:
+                # Release the camera even if recognition failed so it is scheduled again
+                with self._cond:
+                    feed.busy = False
+                    if result is not None and result.seq > feed.latest_result.seq:
+                        feed.latest_result = result
+                    self._cond.notify()
+
+    def latest_frame(self, name: Optional[str] = None):
+        """Copy of a camera's most recent frame (the first camera by default), or None before its first one."""
+        feed = self.feed(name) if name else self.feeds[0]
+        with self._cond:
+            timed = feed.latest_frame
+        return None if timed is None else timed.frame.copy()
+
+    def latest_results(self, name: str) -> Tuple[List[str], List[tuple]]:
+        feed = self.feed(name)
+        with self._cond:
+            return feed.latest_result.face_names, feed.latest_result.face_locations
+
+    def feed(self, name: str) -> CameraFeed:
+        for feed in self.feeds:
+            if feed.name == name:
+                return feed
+        raise KeyError(name)
+
+    def alive(self) -> bool:
+        """Whether any camera is still delivering frames."""
+        return self.running and any(feed.running for feed in self.feeds)
+
+    def report(self) -> Dict[str, dict]:
+        """Per-camera frame rates, latency and drop counters."""
+        report = {}
+        for feed in self.feeds:
+            camera = {stage: {"fps": stats.fps(), "frames": stats.count, "latency_ms": stats.latency_ms()}
+                      for stage, stats in feed.stats.items()}
+            camera["recognition"]["dropped"] = feed.dropped
+            camera["recognition"]["errors"] = feed.stats["recognition"].errors
+            camera["running"] = feed.running
+            if feed.error:
+                camera["error"] = feed.error
+            if feed.motion_gate is not None:
+                camera["motion"] = feed.motion_gate.report()
+            report[feed.name] = camera
+        return report
@@ -0,0 +1,221 @@
+import heapq
+import logging
+import random
+import threading
+import time
+from itertools import count
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SEND_SECONDS = REGISTRY.histogram(
+    "welcome_home_notification_send_seconds", "Round trip of each batch sent to the notification transport")
+
+# FCM accepts at most 500 messages per send_each call
+MAX_BATCH_SIZE = 500
+
+
+class OutgoingMessage(NamedTuple):
+    token: str
+    title: str
+    body: str
+    data: Optional[Dict[str, str]] = None  # extra key/value payload for the app
+
+
+class SendResult(NamedTuple):
+    success: bool
+    error: Optional[str] = None
+    retryable: bool = False  # transient failure worth retrying
+    unregistered: bool = False  # token is no longer valid and should be dropped
+
+
+class NotificationTransport:
+    """Delivers a batch of messages; implementations must return one result per message."""
+
+    def send_each(self, messages: List[OutgoingMessage]) -> List[SendResult]:
+        raise NotImplementedError
+
+
+class FakeTransport(NotificationTransport):
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0,
+                 unregistered_tokens: Iterable[str] = (), seed: Optional[int] = None):
+        """
+        Local stand-in for FCM with simulated latency and failures.
+
+        Args:
+            latency: Seconds each send_each call takes
+            failure_rate: Probability each message fails with a retryable error
+            unregistered_tokens: Tokens that are always reported as unregistered
+            seed: Seed for the failure simulation
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.unregistered_tokens = set(unregistered_tokens)
+        self.delivered: List[OutgoingMessage] = []
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send_each(self, messages: List[OutgoingMessage]) -> List[SendResult]:
+        time.sleep(self.latency)
+        results = []
+        with self._lock:
+            self.calls += 1
+            for message in messages:
+                if message.token in self.unregistered_tokens:
+                    results.append(SendResult(False, "unregistered", unregistered=True))
+                elif self._random.random() < self.failure_rate:
+                    results.append(SendResult(False, "unavailable", retryable=True))
+                else:
+                    self.delivered.append(message)
+                    results.append(SendResult(True))
+        return results
+
+
+class _Job(NamedTuple):
+    message: OutgoingMessage
+    attempt: int
+
+
+class NotificationDispatcher:
+    def __init__(self, transport: NotificationTransport,
+                 max_retries: int = 4,
+                 base_delay: float = 0.5,
+                 max_delay: float = 30.0,
+                 on_unregistered: Optional[Callable[[str], None]] = None):
+        """
+        Deliver notifications on a background thread so callers never wait on the network.
+
+        Everything due is sent in one transport call. Transient failures are
+        retried with exponential backoff and jitter; tokens the transport
+        reports as unregistered are passed to on_unregistered and never
+        retried.
+
+        Args:
+            transport: Transport that performs the actual sends
+            max_retries: Retries per message after the first attempt
+            base_delay: Backoff before the first retry, in seconds
+            max_delay: Upper bound on the backoff
+            on_unregistered: Called with each token reported as unregistered
+        """
+        self.transport = transport
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_unregistered = on_unregistered
+        self.stats: Dict[str, int] = {"sent": 0, "failed": 0, "retried": 0, "unregistered": 0}
+        self.unregistered_tokens: Set[str] = set()
+
+        self._pending = []  # heap of (due time, seq, job)
+        self._seq = count()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, messages: Iterable[OutgoingMessage]) -> None:
+        """Queue messages for delivery and return immediately."""
+        now = time.monotonic()
+        with self._cond:
+            for message in messages:
+                heapq.heappush(self._pending, (now, next(self._seq), _Job(message, 0)))
+            self._cond.notify_all()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _next_batch(self) -> Optional[List[_Job]]:
+        """Block until messages are due and take up to one batch of them, or None once closed."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._pending and self._pending[0][0] <= now:
+                    batch = []
+                    while self._pending and self._pending[0][0] <= now and len(batch) < MAX_BATCH_SIZE:
+                        batch.append(heapq.heappop(self._pending)[2])
+                    self._in_flight = len(batch)
+                    return batch
+                if self._closed and not self._pending:
+                    return None
+                timeout = self._pending[0][0] - now if self._pending else None
+                self._cond.wait(timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            start = time.monotonic()
+            try:
+                results = self.transport.send_each([job.message for job in batch])
+            except Exception as e:
+                logger.error(f"Notification transport failed: {str(e)}")
+                results = [SendResult(False, str(e), retryable=True)] * len(batch)
+            SEND_SECONDS.observe(time.monotonic() - start)
+            if len(results) != len(batch):
+                # A message without a result may or may not have gone out; try it again
+                logger.error(f"Notification transport returned {len(results)} results for {len(batch)} messages")
+                results = list(results)[:len(batch)]
+                results += [SendResult(False, "no result from transport", retryable=True)] * (
+                    len(batch) - len(results))
+
+            retries = []
+            for job, result in zip(batch, results):
+                if result.success:
+                    self.stats["sent"] += 1
+                elif result.unregistered:
+                    self.stats["unregistered"] += 1
+                    self._prune(job.message.token)
+                elif result.retryable and job.attempt < self.max_retries:
+                    self.stats["retried"] += 1
+                    retries.append(job)
+                else:
+                    self.stats["failed"] += 1
+                    logger.error(f"Failed to send notification: {result.error}")
+
+            with self._cond:
+                now = time.monotonic()
+                for job in retries:
+                    due = now + self._backoff(job.attempt)
+                    heapq.heappush(self._pending, (due, next(self._seq), job._replace(attempt=job.attempt + 1)))
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _prune(self, token: str) -> None:
+        if token in self.unregistered_tokens:
+            return
+        self.unregistered_tokens.add(token)
+        if self.on_unregistered:
+            # A failing callback must not stop delivery, or flush() would never return
+            try:
+                self.on_unregistered(token)
+            except Exception:
+                logger.exception(f"on_unregistered failed for token {token}")
+
+    def pending(self) -> int:
+        """Messages queued or being sent."""
+        with self._cond:
+            return len(self._pending) + self._in_flight
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued message has been delivered or given up on.
+
+        Returns:
+            bool: True if the queue drained before the timeout
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Deliver what is queued, then stop the background thread."""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
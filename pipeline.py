@@ -0,0 +1,379 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Frames in a row recognition may fail on before the pipeline gives up
+MAX_CONSECUTIVE_FAILURES = 10
+
+
+class TimedFrame(NamedTuple):
+    seq: int
+    timestamp: float  # time.monotonic() when the frame was captured
+    frame: object
+    motion_onset: bool = False
+    roi: Optional[tuple] = None
+    slot: Optional[int] = None  # FrameRing slot holding the frame, if any
+
+
+class RecognitionResult(NamedTuple):
+    seq: int
+    timestamp: float  # capture time of the frame the result belongs to
+    face_names: List[str]
+    face_locations: List[tuple]
+
+
+class DropOldestQueue:
+    def __init__(self, maxsize: int = 1, on_drop: Optional[Callable] = None):
+        """
+        Bounded FIFO that discards the oldest item instead of blocking the producer.
+
+        Args:
+            maxsize: Maximum number of items held before the oldest is dropped
+            on_drop: Called with each item that is discarded
+        """
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item) -> None:
+        dropped = None
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                dropped = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+        if dropped is not None and self.on_drop:
+            self.on_drop(dropped)
+
+    def get(self, timeout: Optional[float] = None):
+        """Return the oldest item, or None on timeout or once the queue is closed."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            return self._items.popleft() if self._items else None
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def clear(self) -> list:
+        """Remove and return every waiting item."""
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+
+class StageStats:
+    def __init__(self, window: int = 30):
+        """Rolling frame rate and latency for one pipeline stage."""
+        self.count = 0
+        self.errors = 0
+        self._times = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def tick(self, latency: Optional[float] = None) -> None:
+        with self._lock:
+            self.count += 1
+            self._times.append(time.monotonic())
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def fps(self) -> float:
+        with self._lock:
+            if len(self._times) < 2:
+                return 0.0
+            elapsed = self._times[-1] - self._times[0]
+            return (len(self._times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def latency_ms(self) -> float:
+        with self._lock:
+            if not self._latencies:
+                return 0.0
+            return 1000 * sum(self._latencies) / len(self._latencies)
+
+
+class RecognitionPipeline:
+    def __init__(self, cap, face_system, recognition_workers: int = 1, max_queue: int = 1,
+                 motion_gate=None, frame_ring: bool = False):
+        """
+        Run capture and face recognition on separate threads.
+
+        The capture thread reads as fast as the camera allows and always
+        keeps only the latest frame for display. Frames for recognition go
+        through a drop-oldest queue so a slow recognizer never builds up a
+        backlog of stale frames; workers publish results tagged with the
+        frame they came from and only newer results replace older ones.
+
+        Args:
+            cap: Opened cv2.VideoCapture (or anything with read())
+            face_system: FaceRecognitionSystem used by the workers, or None
+                to start capturing before it has loaded; see set_face_system
+            recognition_workers: Number of recognition threads
+            max_queue: Frames waiting for recognition before the oldest is dropped
+            motion_gate: Optional MotionGate; frames without motion are
+                displayed but never reach recognition
+            frame_ring: Capture into a FrameRing of preallocated shared-memory
+                buffers instead of allocating every frame; cap.read must
+                accept an output array like cv2.VideoCapture.read does
+        """
+        self.cap = cap
+        self.face_system = face_system
+        self.recognition_workers = recognition_workers
+        self.recognition_queue = DropOldestQueue(max_queue, on_drop=self._release)
+        self.motion_gate = motion_gate
+        # Latest frame, one being written, the queue, the workers and two readers copying
+        self.frame_ring_slots = max_queue + recognition_workers + 4 if frame_ring else 0
+        self.frame_ring = None
+        self.stats = {
+            "capture": StageStats(),
+            "recognition": StageStats(),
+            "render": StageStats(),
+        }
+        self.running = False
+        self.error: Optional[str] = None
+        self.first_frame = threading.Event()  # set once a frame has been captured and motion-checked
+        self.first_frame_time: Optional[float] = None
+
+        self.recognition_ready = threading.Event()  # set once there is a face system to recognize with
+        if face_system is not None:
+            self.recognition_ready.set()
+        self._latest_frame: Optional[TimedFrame] = None
+        self._latest_result = RecognitionResult(-1, 0.0, [], [])
+        self._frame_cond = threading.Condition()
+        self._result_lock = threading.Lock()
+        self._rendered_seq = -1
+        self._consecutive_failures = 0  # shared by the workers; only ever reset or incremented
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self.running = True
+        self._threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True)]
+        for i in range(self.recognition_workers):
+            self._threads.append(threading.Thread(
+                target=self._recognition_loop, name=f"recognition-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def set_face_system(self, face_system) -> None:
+        """Start recognizing frames with a face system that finished loading after start()."""
+        self.face_system = face_system
+        self.recognition_ready.set()
+
+    def abort(self, error: str) -> None:
+        """Stop capturing because of an error outside the pipeline, e.g. a failed model load."""
+        self.error = error
+        self.running = False
+
+    def stop(self) -> None:
+        self.running = False
+        self.recognition_queue.close()
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+        # A thread that did not exit may still be reading a slot, so leave the ring mapped then
+        if self.frame_ring is not None and not any(thread.is_alive() for thread in self._threads):
+            for timed in self.recognition_queue.clear():
+                self._release(timed)
+            with self._frame_cond:
+                latest, self._latest_frame = self._latest_frame, None
+            self._release(latest)
+            self.frame_ring.close()
+            self.frame_ring = None
+
+    def _retain(self, timed: Optional[TimedFrame]) -> None:
+        if timed is not None and timed.slot is not None:
+            self.frame_ring.retain(timed.slot)
+
+    def _release(self, timed: Optional[TimedFrame]) -> None:
+        if timed is not None and timed.slot is not None:
+            self.frame_ring.release(timed.slot)
+
+    def _read(self) -> Tuple[bool, object, Optional[int]]:
+        """Read the next frame, straight into a free ring slot once the ring exists."""
+        if not self.frame_ring_slots:
+            ret, frame = self.cap.read()
+            return ret, frame, None
+
+        if self.frame_ring is None:
+            # The first frame tells us the size of the buffers
+            ret, frame = self.cap.read()
+            if not ret:
+                return False, None, None
+            from frame_ring import FrameRing
+            self.frame_ring = FrameRing(self.frame_ring_slots, frame.shape, frame.dtype)
+            slot = self.frame_ring.acquire()
+            buffer = self.frame_ring.frame(slot)
+            buffer[...] = frame
+            return True, buffer, slot
+
+        slot = None
+        while slot is None:
+            if not self.running:
+                return False, None, None
+            slot = self.frame_ring.acquire(timeout=0.5)
+        buffer = self.frame_ring.frame(slot)
+        ret, frame = self.cap.read(buffer)
+        if ret and frame is not buffer:
+            # The capture allocated its own array; keep the frame if it still fits the ring
+            if frame.shape != buffer.shape:
+                self.error = f"Frame size changed from {buffer.shape} to {frame.shape}"
+                ret = False
+            else:
+                buffer[...] = frame
+        if not ret:
+            self.frame_ring.release(slot)
+            return False, None, None
+        return True, buffer, slot
+
+    def _capture_loop(self) -> None:
+        seq = 0
+        while self.running:
+            ret, frame, slot = self._read()
+            if not ret:
+                self.error = self.error or "Could not read frame."
+                self.running = False
+                break
+
+            # The new frame's first reference belongs to _latest_frame
+            timed = TimedFrame(seq, time.monotonic(), frame, slot=slot)
+            seq += 1
+            self.stats["capture"].tick()
+
+            if self.motion_gate is None:
+                self._retain(timed)
+                self.recognition_queue.put(timed)
+            else:
+                motion = self.motion_gate.check(frame)
+                if motion.active:
+                    self._retain(timed)
+                    self.recognition_queue.put(timed._replace(motion_onset=motion.onset, roi=motion.roi))
+                elif self.motion_gate.frames_since_motion == self.motion_gate.hold_frames + 1:
+                    # The scene just went idle; clear boxes left over from the last visitor
+                    self._publish(RecognitionResult(timed.seq, timed.timestamp, [], []))
+
+            with self._frame_cond:
+                previous, self._latest_frame = self._latest_frame, timed
+                self._frame_cond.notify_all()
+            self._release(previous)
+            if timed.seq == 0:
+                self.first_frame_time = time.monotonic()
+                self.first_frame.set()
+
+        self.recognition_queue.close()
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+
+    def _recognition_loop(self) -> None:
+        while self.running:
+            # Until the face system is loaded the queue just keeps the newest frame waiting
+            if not self.recognition_ready.wait(timeout=0.5):
+                continue
+            timed = self.recognition_queue.get(timeout=0.5)
+            if timed is None:
+                continue
+
+            try:
+                face_names, face_locations = self.face_system.process_frame(
+                    timed.frame, motion_detected=timed.motion_onset, roi=timed.roi)
+            except Exception as e:
+                # One bad frame must not take the recognition thread down with it
+                logger.exception(f"Recognition failed on frame {timed.seq}")
+                self.stats["recognition"].error()
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                    self.abort(f"Recognition failed on {self._consecutive_failures} frames in a row: {e}")
+                continue
+            finally:
+                self._release(timed)
+            self._consecutive_failures = 0
+            self.stats["recognition"].tick(time.monotonic() - timed.timestamp)
+            self._publish(RecognitionResult(timed.seq, timed.timestamp, face_names, face_locations))
+
+    def _publish(self, result: RecognitionResult) -> None:
+        """Replace the latest result unless a newer frame has already been published."""
+        with self._result_lock:
+            if result.seq > self._latest_result.seq:
+                self._latest_result = result
+
+    def next_frame(self, timeout: Optional[float] = None, out=None):
+        """
+        Wait for a frame newer than the last one returned and return a copy of it.
+
+        The copy can be drawn on freely while workers read the original.
+
+        Args:
+            timeout: Seconds to wait for a new frame
+            out: Array of the frame's shape to copy into instead of allocating one
+
+        Returns:
+            The frame, or None on timeout or once the pipeline has stopped
+        """
+        with self._frame_cond:
+            ready = self._frame_cond.wait_for(
+                lambda: not self.running or
+                (self._latest_frame is not None and self._latest_frame.seq > self._rendered_seq),
+                timeout)
+            if not ready or not self.running:
+                return None
+            timed = self._latest_frame
+            self._rendered_seq = timed.seq
+            self._retain(timed)
+
+        self.stats["render"].tick(time.monotonic() - timed.timestamp)
+        return self._copy(timed, out)
+
+    def latest_frame(self):
+        """Copy of the most recently captured frame, or None before the first one."""
+        with self._frame_cond:
+            timed = self._latest_frame
+            self._retain(timed)
+        return None if timed is None else self._copy(timed)
+
+    def _copy(self, timed: TimedFrame, out=None):
+        """Copy a frame out of its ring slot and give up the reference taken to read it."""
+        try:
+            if out is not None and out.shape == timed.frame.shape:
+                out[...] = timed.frame
+                return out
+            return timed.frame.copy()
+        finally:
+            self._release(timed)
+
+    def latest_results(self) -> Tuple[List[str], List[tuple]]:
+        """Most recent recognition output as (face_names, face_locations)."""
+        with self._result_lock:
+            return self._latest_result.face_names, self._latest_result.face_locations
+
+    def report(self) -> Dict[str, dict]:
+        """Per-stage frame rate, latency from capture and drop/queue counters."""
+        report = {name: {"fps": stats.fps(), "frames": stats.count, "latency_ms": stats.latency_ms()}
+                  for name, stats in self.stats.items()}
+        report["recognition"]["errors"] = self.stats["recognition"].errors
+        report["recognition"]["queue_depth"] = len(self.recognition_queue)
+        report["recognition"]["dropped"] = self.recognition_queue.dropped
+        if self.motion_gate is not None:
+            report["motion"] = self.motion_gate.report()
+        if self.frame_ring is not None:
+            report["frame_ring"] = self.frame_ring.report()
+        return report
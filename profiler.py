@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def _describe(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profile:
+    def __init__(self, stacks: Counter, samples: int, duration: float):
+        """Stacks sampled by a SamplingProfiler, each a tuple of thread name and functions, outermost first."""
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+
+    def top(self, count: int = 25) -> List[Tuple[str, int, int]]:
+        """
+        The functions seen most often.
+
+        Returns:
+            (function, samples it was running in, samples it was on the stack in), hottest first
+        """
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, hits in self.stacks.items():
+            functions = stack[1:]
+            if functions:
+                own[functions[-1]] += hits
+            for function in set(functions):
+                total[function] += hits
+        ranked = sorted(total, key=lambda function: (own[function], total[function]), reverse=True)
+        return [(function, own[function], total[function]) for function in ranked[:count]]
+
+    def report(self, count: int = 25) -> str:
+        """
+        Table of the hottest functions.
+
+        self% is the share of samples a function was running in, total% the
+        share it was anywhere on the stack in. Each thread is sampled every
+        time, so with several busy threads the self% column adds up to more
+        than 100.
+        """
+        lines = [f"{self.samples} samples over {self.duration:.1f}s",
+                 f"{'self%':>6} {'total%':>6}  function"]
+        for function, own, total in self.top(count):
+            share, total_share = (100 * n / max(1, self.samples) for n in (own, total))
+            lines.append(f"{share:6.1f} {total_share:6.1f}  {function}")
+        return "\n".join(lines) + "\n"
+
+    def collapsed(self) -> str:
+        """Folded stacks ("thread;outer;inner count"), the input format of flamegraph.pl and speedscope."""
+        return "".join(f"{';'.join(stack)} {hits}\n" for stack, hits in self.stacks.most_common())
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, threads: Optional[Sequence[str]] = None):
+        """
+        Statistical profiler that periodically records the stack of every thread.
+
+        Nothing runs until profile() is called, so keeping one around costs
+        nothing. While sampling, the calling thread reads every other
+        thread's Python stack each interval seconds. The profiled code is
+        never instrumented, so the timings it sees are the real ones, less
+        the few percent of one core the sampler uses.
+
+        Args:
+            interval: Seconds between samples
+            threads: Only sample threads whose name starts with one of these,
+                e.g. ("capture", "recognition"); all threads by default
+        """
+        self.interval = interval
+        self.threads = tuple(threads) if threads else None
+        self._lock = threading.Lock()  # one profile at a time
+
+    def profile(self, seconds: float) -> Profile:
+        """Sample for the given number of seconds and return what was seen."""
+        with self._lock:
+            stacks: Counter = Counter()
+            samples = 0
+            me = threading.get_ident()
+            start = time.monotonic()
+            deadline = start + seconds
+            while time.monotonic() < deadline:
+                names: Dict[int, str] = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    name = names.get(ident, str(ident))
+                    if ident == me or (self.threads and not name.startswith(self.threads)):
+                        continue
+                    functions = []
+                    while frame is not None:
+                        functions.append(_describe(frame))
+                        frame = frame.f_back
+                    stacks[(name, *reversed(functions))] += 1
+                samples += 1
+                time.sleep(self.interval)
+            return Profile(stacks, samples, time.monotonic() - start)
@@ -0,0 +1,209 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+THERMAL_ZONE = "/sys/class/thermal/thermal_zone0/temp"
+
+
+class QualityLevel(NamedTuple):
+    detection_scale: float
+    detect_every_n_frames: int
+    upsample: int
+    num_jitters: int
+
+
+# Best first; every step down gives up a little accuracy for speed
+QUALITY_LEVELS = (
+    QualityLevel(1.0, 1, 1, 2),
+    QualityLevel(0.75, 1, 1, 1),
+    QualityLevel(0.5, 2, 1, 1),
+    QualityLevel(0.5, 3, 1, 1),  # the settings the bot used before it adapted
+    QualityLevel(0.5, 4, 0, 1),
+    QualityLevel(0.35, 6, 0, 1),
+)
+DEFAULT_LEVEL = 3
+
+LEVEL = REGISTRY.gauge("welcome_home_quality_level", "Current quality level, 0 being full quality")
+CHANGES = REGISTRY.counter("welcome_home_quality_changes_total", "Quality level changes by reason", ("reason",))
+
+
+class QualityDecision(NamedTuple):
+    timestamp: float  # wall-clock time.time() of the change
+    previous: int
+    level: int
+    reason: str  # "latency", "temperature", "load", "headroom" or "motion"
+    latency_ms: float  # mean frame time that led to the change
+    temperature: Optional[float]
+    load: Optional[float]
+
+
+def cpu_temperature(path: str = THERMAL_ZONE) -> Optional[float]:
+    """SoC temperature in degrees Celsius, or None where the kernel does not report one."""
+    try:
+        with open(path) as f:
+            return int(f.read().strip()) / 1000
+    except (OSError, ValueError):
+        return None
+
+
+def cpu_load() -> Optional[float]:
+    """One-minute load average per core, or None where it is unavailable."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (OSError, AttributeError):
+        return None
+
+
+class QualityController:
+    def __init__(self, target_ms: float = 95.0, levels: Sequence[QualityLevel] = QUALITY_LEVELS,
+                 level: int = DEFAULT_LEVEL, window: int = 15, headroom: float = 0.6,
+                 step_interval: float = 1.0, hold: float = 5.0,
+                 max_temperature: float = 75.0, max_load: float = 1.5,
+                 sensor_interval: float = 2.0,
+                 read_temperature: Callable[[], Optional[float]] = cpu_temperature,
+                 read_load: Callable[[], Optional[float]] = cpu_load,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Trade recognition quality for speed to hold a per-frame latency target.
+
+        Each processed frame's time is fed to update(). When the mean of the
+        recent frames exceeds target_ms, or the CPU is hot or overloaded, the
+        controller steps one level down the ladder: smaller detection
+        frames, detection on fewer frames, no upsampling, fewer jitters. It
+        steps back up one level at a time once frames take less than
+        headroom * target_ms and the CPU is cool, and goes straight to full
+        quality when motion starts (someone approaching the door) if the CPU
+        is cool and frames are under headroom * target_ms as well. Every
+        change is logged and kept in decisions.
+
+        The mean is used rather than single frames because frames that reuse
+        the previous boxes are cheap, and it is the average cost that decides
+        whether recognition keeps up with the camera.
+
+        Args:
+            target_ms: Per-frame processing budget in milliseconds
+            levels: Settings to move between, best first
+            level: Index of the level to start at
+            window: Frames averaged before stepping up
+            headroom: Fraction of the target frames must stay under to step up
+            step_interval: Minimum seconds between two steps down
+            hold: Seconds at a level before stepping up, or escalating on motion after a step down
+            max_temperature: Degrees Celsius at which quality is lowered regardless of latency
+            max_load: Load average per core at which quality is lowered
+            sensor_interval: Seconds between temperature and load readings
+            read_temperature, read_load: Sensor functions, replaceable to simulate a hot or busy CPU
+            clock: Monotonic time source
+        """
+        if not 0 <= level < len(levels):
+            raise ValueError(f"level must be between 0 and {len(levels) - 1}")
+        self.target_ms = target_ms
+        self.levels = tuple(levels)
+        self.level = level
+        self.headroom = headroom
+        self.step_interval = step_interval
+        self.hold = hold
+        self.max_temperature = max_temperature
+        self.max_load = max_load
+        self.sensor_interval = sensor_interval
+        self.read_temperature = read_temperature
+        self.read_load = read_load
+        self.clock = clock
+        self.decisions: Deque[QualityDecision] = deque(maxlen=100)
+
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._last_change = clock()
+        self._last_step_down = float("-inf")
+        self._sensors: Tuple[Optional[float], Optional[float]] = (None, None)
+        self._sensors_read = float("-inf")
+        self._lock = threading.Lock()
+        LEVEL.set(level)
+
+    @property
+    def settings(self) -> QualityLevel:
+        return self.levels[self.level]
+
+    def apply(self, target) -> None:
+        """Set the current level's settings as attributes of target, e.g. a FaceRecognitionSystem."""
+        for name, value in self.settings._asdict().items():
+            setattr(target, name, value)
+
+    def _read_sensors(self, now: float) -> Tuple[Optional[float], Optional[float]]:
+        if now - self._sensors_read >= self.sensor_interval:
+            self._sensors = (self.read_temperature(), self.read_load())
+            self._sensors_read = now
+        return self._sensors
+
+    def update(self, frame_ms: float, motion: bool = False) -> Optional[QualityDecision]:
+        """
+        Record one frame's processing time and change level if needed.
+
+        Args:
+            frame_ms: Time process_frame took
+            motion: Whether motion just started in the frame
+
+        Returns:
+            The decision if the level changed, else None
+        """
+        with self._lock:
+            now = self.clock()
+            self._latencies.append(frame_ms)
+            mean_ms = sum(self._latencies) / len(self._latencies)
+            temperature, load = self._read_sensors(now)
+            hot = temperature is not None and temperature >= self.max_temperature
+            busy = load is not None and load >= self.max_load
+            # A few degrees and some load of margin keep the level from flapping at the limits
+            cool = temperature is None or temperature < self.max_temperature - 5
+            idle = load is None or load < 0.75 * self.max_load
+
+            if hot or busy or (len(self._latencies) >= 5 and mean_ms > self.target_ms):
+                if self.level < len(self.levels) - 1 and now - self._last_step_down >= self.step_interval:
+                    reason = "temperature" if hot else "load" if busy else "latency"
+                    return self._change(self.level + 1, reason, mean_ms, temperature, load, now)
+            elif not (cool and idle) or self.level == 0:
+                pass
+            elif (motion and mean_ms < self.headroom * self.target_ms
+                  and now - self._last_step_down >= self.hold):
+                return self._change(0, "motion", mean_ms, temperature, load, now)
+            elif (len(self._latencies) == self._latencies.maxlen
+                  and mean_ms < self.headroom * self.target_ms and now - self._last_change >= self.hold):
+                return self._change(self.level - 1, "headroom", mean_ms, temperature, load, now)
+            return None
+
+    def _change(self, level: int, reason: str, mean_ms: float, temperature: Optional[float],
+                load: Optional[float], now: float) -> QualityDecision:
+        decision = QualityDecision(time.time(), self.level, level, reason, mean_ms, temperature, load)
+        if level > self.level:
+            self._last_step_down = now
+        self.level = level
+        self._last_change = now
+        # Judge the new level only on frames processed at it
+        self._latencies.clear()
+        self.decisions.append(decision)
+        LEVEL.set(level)
+        CHANGES.inc(labels=reason)
+        sensors = "".join([f", {temperature:.0f}C" if temperature is not None else "",
+                           f", load {load:.2f}" if load is not None else ""])
+        logger.info(f"Quality {decision.previous} -> {level} ({reason}: {mean_ms:.0f}ms mean{sensors}): "
+                    f"{self.settings}")
+        return decision
+
+    def report(self) -> Dict[str, object]:
+        """Current level and settings, the latest sensor readings and the recent decisions."""
+        with self._lock:
+            temperature, load = self._sensors
+            return {
+                "level": self.level,
+                "settings": self.settings._asdict(),
+                "target_ms": self.target_ms,
+                "temperature": temperature,
+                "load": load,
+                "changes": len(self.decisions),
+                "decisions": [decision._asdict() for decision in list(self.decisions)[-10:]],
+            }
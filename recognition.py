@@ -7,46 +7,236 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 import threading
 import time
+from collections import deque
+from face_store import FaceEncodingStore
+from gallery import GALLERY_BACKENDS, IVF_INDEX_FILENAME, IVFGalleryIndex
+from tracking import FaceTracker
+from encoding_pool import EncodingPool
+from frame_ring import ScratchBuffers
+from face_watcher import DirectoryWatcher
+from events import EVENT_ARRIVAL, EVENT_UNKNOWN, EventDeduplicator, detection_event
+from metrics import REGISTRY
+from quality import QualityController
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "welcome_home_frame_stage_seconds", "Time spent on each stage of process_frame", ("camera", "stage"))
+FACES_PER_FRAME = REGISTRY.histogram(
+    "welcome_home_faces_per_frame", "Faces located in each processed frame", ("camera",),
+    buckets=(0, 1, 2, 3, 5, 8))
+ENCODINGS = REGISTRY.counter("welcome_home_face_encodings_total", "Face encodings computed", ("camera",))
+GALLERY_ENTRIES = REGISTRY.gauge("welcome_home_gallery_entries", "Encodings in the known-face gallery")
+
+class StreamState:
+    def __init__(self, camera: str = ""):
+        """
+        Recognition state that belongs to one video source.
+        
+        Args:
+            camera: Name reported on events from this source
+        """
+        self.camera = camera
+        self.tracker = FaceTracker()
+        self.frames_since_detection = 0
+        self.last_face_locations: List[tuple] = []
+        self.last_matches = []
+        self.last_timings: Dict[str, float] = {}  # stage -> ms for the last frame
 
 class FaceRecognitionSystem:
     def __init__(self, known_faces_dir: str = "known_faces", 
-                 notification_callback=None):
+                 notification_callback=None,
+                 deduplicator: Optional[EventDeduplicator] = None,
+                 detection_scale: float = 1.0,
+                 detection_model: str = "hog",
+                 detect_every_n_frames: int = 1,
+                 upsample: int = 1,
+                 num_jitters: int = 1,
+                 encoding_processes: int = 0,
+                 event_log=None,
+                 gallery_backend: str = "exact",
+                 quality_controller: Optional[QualityController] = None):
         """
         Initialize the face recognition system.
         
         Args:
             known_faces_dir: Directory containing known face images
-            notification_callback: Function to handle notifications
+            notification_callback: Function called with a DetectionEvent for
+                each arrival or unknown person; it may return the path of
+                media saved for the event, which is logged with it
+            deduplicator: Cooldown shared with the notification system;
+                defaults to a 60 second window per identity
+            detection_scale: Scale of the frame copy faces are located on;
+                encodings always use the full-resolution frame
+            detection_model: Face locator model, "hog" or "cnn"
+            detect_every_n_frames: Re-run the locator every N frames and
+                reuse the previous boxes in between
+            upsample: Times the locator upsamples the image to find small faces
+            num_jitters: Times each face is re-sampled when encoding it
+            encoding_processes: Worker processes for face encoding, 0 to
+                encode in the calling thread
+            event_log: Optional EventLog every detection is recorded in,
+                including those deduplication holds back
+            gallery_backend: Gallery search, "exact" or "ivf" (approximate,
+                for galleries of thousands of faces)
+            quality_controller: Optional QualityController that adjusts
+                detection_scale, detect_every_n_frames, upsample and
+                num_jitters from each frame's latency, overriding the
+                values given here
         """
+        if detection_model not in ("hog", "cnn"):
+            raise ValueError(f"Unknown detection model: {detection_model}")
+        if gallery_backend not in GALLERY_BACKENDS:
+            raise ValueError(f"Unknown gallery backend: {gallery_backend}")
         self.known_faces_dir = known_faces_dir
-        self.known_face_encodings = []
-        self.known_face_names = []
+        self.detection_scale = detection_scale
+        self.detection_model = detection_model
+        self.detect_every_n_frames = max(1, detect_every_n_frames)
+        self.upsample = upsample
+        self.num_jitters = num_jitters
+        self.quality_controller = quality_controller
+        if quality_controller:
+            quality_controller.apply(self)
+        self.stream = StreamState()  # used when process_frame is not given a stream
+        self.frame_latencies = deque(maxlen=300)  # total ms of recent frames
+        self.encodings_computed = 0
+        self._scratch = threading.local()  # per-thread conversion buffers reused across frames
+        if gallery_backend == "ivf":
+            self.gallery = IVFGalleryIndex(index_path=os.path.join(known_faces_dir, IVF_INDEX_FILENAME))
+        else:
+            self.gallery = GALLERY_BACKENDS[gallery_backend]()
+        self.encoding_pool = EncodingPool(encoding_processes) if encoding_processes else None
         self.notification_callback = notification_callback
-        self.last_notification_time = {}  # Prevent spam notifications
-        self.notification_cooldown = 60  # seconds
+        self.event_log = event_log
+        self.watcher: Optional[DirectoryWatcher] = None
+        self.reloads = 0
+        # Serializes cache updates between add_new_face and the directory watcher
+        self._store_lock = threading.Lock()
+        self.deduplicator = deduplicator or EventDeduplicator(
+            {EVENT_ARRIVAL: 60, EVENT_UNKNOWN: 60})  # Prevent spam notifications
         
         # Create known_faces directory if it doesn't exist
         if not os.path.exists(known_faces_dir):
             os.makedirs(known_faces_dir)
             
+        self.encoding_store = FaceEncodingStore(known_faces_dir)
         self.load_known_faces()
     
-    def load_known_faces(self):
-        """Load all known faces from the known_faces directory."""
-        self.known_face_encodings = []
-        self.known_face_names = []
-        
-        for filename in os.listdir(self.known_faces_dir):
-            if filename.endswith((".jpg", ".jpeg", ".png")):
-                path = os.path.join(self.known_faces_dir, filename)
-                name = os.path.splitext(filename)[0]
-                
-                image = face_recognition.load_image_file(path)
-                face_encodings = face_recognition.face_encodings(image)
-                
-                if face_encodings:
-                    self.known_face_encodings.append(face_encodings[0])
-                    self.known_face_names.append(name)
+    def new_stream(self, camera: str) -> StreamState:
+        """Create independent tracking state for another camera sharing this gallery."""
+        return StreamState(camera)
+    
+    @property
+    def tracker(self) -> FaceTracker:
+        return self.stream.tracker
+    
+    @tracker.setter
+    def tracker(self, tracker: FaceTracker):
+        self.stream.tracker = tracker
+    
+    @property
+    def last_matches(self) -> list:
+        return self.stream.last_matches
+    
+    @property
+    def last_timings(self) -> Dict[str, float]:
+        return self.stream.last_timings
+    
+    @staticmethod
+    def _encode_image_file(path: str) -> Optional[np.ndarray]:
+        """Encode the first face found in an image file, or None if there is none."""
+        image = face_recognition.load_image_file(path)
+        face_encodings = face_recognition.face_encodings(image)
+        return face_encodings[0] if face_encodings else None
+    
+    def _encode_image_files(self, paths: List[str]) -> List[Optional[np.ndarray]]:
+        """Encode many image files, across the process pool when there is one."""
+        if self.encoding_pool:
+            return self.encoding_pool.encode_files(paths)
+        return [self._encode_image_file(path) for path in paths]
+    
+    def _encode_image_files_in_processes(self, paths: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Encode many image files in worker processes, never in this one.
+        
+        dlib holds the GIL while it encodes, so encoding on a background
+        thread would still stall recognition. Without an encoding pool a
+        short-lived one is started for the call.
+        """
+        if self.encoding_pool:
+            return self.encoding_pool.encode_files(paths)
+        pool = EncodingPool(min(len(paths), os.cpu_count() or 1), self.num_jitters)
+        try:
+            return pool.encode_files(paths)
+        finally:
+            pool.close()
+    
+    def encode_faces(self, rgb_frame, face_locations: List[tuple]) -> List[np.ndarray]:
+        """Encode the faces at the given locations, across the process pool when there is one."""
+        if self.encoding_pool:
+            return self.encoding_pool.encode(rgb_frame, face_locations, self.num_jitters)
+        return face_recognition.face_encodings(rgb_frame, face_locations, num_jitters=self.num_jitters)
+    
+    def _buffer(self, purpose: str, shape: tuple) -> np.ndarray:
+        """Scratch array of the given shape for this thread."""
+        buffers = getattr(self._scratch, "buffers", None)
+        if buffers is None:
+            buffers = self._scratch.buffers = ScratchBuffers()
+        return buffers.get(purpose, shape)
+    
+    def close(self):
+        """Stop watching known_faces and shut down the encoding worker processes."""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        if self.encoding_pool:
+            self.encoding_pool.close()
+    
+    def _swap_gallery(self):
+        """Replace the gallery with a new one built from the cache; frames in flight keep the old one."""
+        self.gallery = self.gallery.rebuilt(self.encoding_store.encodings(), self.encoding_store.names())
+        GALLERY_ENTRIES.set(len(self.gallery))
+    
+    def load_known_faces(self, encode_images=None) -> bool:
+        """
+        Load all known faces from the known_faces directory.
+        
+        Encodings are read from the on-disk cache; only images added or
+        modified since the last run are re-encoded. The gallery is swapped
+        in whole once it is built, so this can run while frames are being
+        processed.
+        
+        Args:
+            encode_images: Encodes the changed image files, defaults to the
+                encoding pool or this thread
+        
+        Returns:
+            bool: True if the known faces changed
+        """
+        with self._store_lock:
+            changed = self.encoding_store.sync(encode_images or self._encode_image_files)
+            if changed or not len(self.gallery):
+                self._swap_gallery()
+        return changed
+    
+    def watch_known_faces(self, debounce: float = 0.5, poll_interval: float = 2.0):
+        """
+        Reload known faces in the background whenever images are added, changed or removed.
+        
+        Changes made by other processes (copying images in, enroll.py) show
+        up without a restart; only the changed images are encoded, in
+        worker processes (a short-lived pool when encoding_processes is 0),
+        while recognition keeps using the previous gallery.
+        """
+        if self.watcher:
+            return
+        self.watcher = DirectoryWatcher(self.known_faces_dir, self._reload,
+                                        debounce=debounce, poll_interval=poll_interval)
+        self.watcher.start()
+    
+    def _reload(self):
+        start = time.perf_counter()
+        if self.load_known_faces(self._encode_image_files_in_processes):
+            self.reloads += 1
+            print(f"Reloaded {len(self.gallery)} known faces in {time.perf_counter() - start:.2f}s")
     
     def add_new_face(self, frame, name: str) -> bool:
         """
@@ -62,6 +252,7 @@ class FaceRecognitionSystem:
         face_locations = face_recognition.face_locations(frame)
         if not face_locations:
             return False
+        face_encoding = face_recognition.face_encodings(frame, face_locations)[0]
             
         # Save the face image
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -71,67 +262,165 @@ class FaceRecognitionSystem:
         # Crop and save just the face region
         top, right, bottom, left = face_locations[0]
         face_image = frame[top:bottom, left:right]
-        cv2.imwrite(path, cv2.cvtColor(face_image, cv2.COLOR_RGB2BGR))
-        
-        # Update known faces
-        face_encoding = face_recognition.face_encodings(frame, face_locations)[0]
-        self.known_face_encodings.append(face_encoding)
-        self.known_face_names.append(name)
+        with self._store_lock:
+            cv2.imwrite(path, cv2.cvtColor(face_image, cv2.COLOR_RGB2BGR))
+            
+            # Update known faces and persist the encoding so restarts skip it
+            self.encoding_store.put(filename, name, face_encoding)
+            self.gallery = self.gallery.with_entry(face_encoding, name)
+            GALLERY_ENTRIES.set(len(self.gallery))
         
         return True
     
-    def process_frame(self, frame) -> Tuple[List[str], List[tuple]]:
+    def locate_faces(self, rgb_frame, roi: Optional[tuple] = None) -> List[tuple]:
+        """
+        Find faces on a downscaled copy of the frame.
+        
+        Args:
+            rgb_frame: Full-resolution RGB frame
+            roi: Optional region (top, right, bottom, left) to restrict the search to
+            
+        Returns:
+            List of face locations (top, right, bottom, left) in full-resolution pixels
+        """
+        height, width = rgb_frame.shape[:2]
+        offset_y, offset_x = 0, 0
+        if roi is not None:
+            top, right, bottom, left = roi
+            rgb_frame = rgb_frame[top:bottom, left:right]
+            offset_y, offset_x = top, left
+        
+        scale = self.detection_scale
+        if scale != 1.0:
+            size = (max(1, round(rgb_frame.shape[1] * scale)), max(1, round(rgb_frame.shape[0] * scale)))
+            small = self._buffer("detect", (size[1], size[0]) + rgb_frame.shape[2:])
+            rgb_frame = cv2.resize(rgb_frame, size, dst=small, interpolation=cv2.INTER_AREA)
+        locations = face_recognition.face_locations(
+            rgb_frame, number_of_times_to_upsample=self.upsample, model=self.detection_model)
+        
+        # Map boxes back to full-resolution frame coordinates, clamped to the frame
+        return [
+            (max(0, int(top / scale) + offset_y), min(width, int(round(right / scale)) + offset_x),
+             min(height, int(round(bottom / scale)) + offset_y), max(0, int(left / scale) + offset_x))
+            for top, right, bottom, left in locations
+        ]
+    
+    def process_frame(self, frame, motion_detected: bool = False,
+                      roi: Optional[tuple] = None,
+                      stream: Optional[StreamState] = None) -> Tuple[List[str], List[tuple]]:
         """
         Process a video frame for face recognition.
         
         Args:
             frame: Video frame to process
+            motion_detected: Force the locator to run even if the previous
+                boxes would otherwise be reused this frame
+            roi: Optional region (top, right, bottom, left) to look for faces in
+            stream: Tracking state of the camera the frame came from; frames
+                of one stream must not be processed concurrently
             
         Returns:
             Tuple containing:
             - List of names of recognized people
             - List of face locations (top, right, bottom, left)
+            
+        Faces are tracked across frames and only notified once their identity
+        has been agreed over several frames. The latest distance and
+        confidence for each face are kept in the stream's last_matches, and
+        per-stage timings in last_timings.
         """
-        # Convert frame from BGR (OpenCV) to RGB (face_recognition)
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        stream = stream or self.stream
+        start = time.perf_counter()
         
-        # Find all faces in the frame
-        face_locations = face_recognition.face_locations(rgb_frame)
-        face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+        # Convert frame from BGR (OpenCV) to RGB (face_recognition), into a reused buffer
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._buffer("rgb", frame.shape))
+        converted = time.perf_counter()
         
-        face_names = []
+        # Find all faces in the frame, or reuse the last boxes between detections
+        detected = (motion_detected or
+                    stream.frames_since_detection % self.detect_every_n_frames == 0)
+        if detected:
+            face_locations = self.locate_faces(rgb_frame, roi)
+            stream.last_face_locations = face_locations
+            stream.frames_since_detection = 0
+        else:
+            face_locations = stream.last_face_locations
+        stream.frames_since_detection += 1
+        located = time.perf_counter()
         
-        for face_encoding in face_encodings:
-            matches = face_recognition.compare_faces(
-                self.known_face_encodings, 
-                face_encoding,
-                tolerance=0.6
-            )
-            name = "Unknown"
-            
-            if True in matches:
-                first_match_index = matches.index(True)
-                name = self.known_face_names[first_match_index]
-            
-            face_names.append(name)
-            
-            # Send notification if enough time has passed
-            current_time = time.time()
-            if (name not in self.last_notification_time or 
-                current_time - self.last_notification_time.get(name, 0) > self.notification_cooldown):
-                
-                if self.notification_callback:
-                    if name == "Unknown":
-                        self.notification_callback(
-                            "Unknown person detected! Please check security feed."
-                        )
-                    else:
-                        self.notification_callback(f"Welcome home {name}!")
-                        
-                self.last_notification_time[name] = current_time
+        # Only encode freshly located faces whose track is new or still undecided;
+        # a reused box may hold background by now, and would vote Unknown
+        tracks = stream.tracker.update(face_locations)
+        to_encode = [i for i, track in enumerate(tracks)
+                     if detected and stream.tracker.needs_encoding(track)]
+        face_encodings = []
+        if to_encode:
+            face_encodings = self.encode_faces(rgb_frame, [face_locations[i] for i in to_encode])
+            self.encodings_computed += len(face_encodings)
+        encoded = time.perf_counter()
+        
+        # Match every face against the whole gallery in one batch
+        settled = []
+        if face_encodings:
+            for i, match in zip(to_encode, self.gallery.match(face_encodings)):
+                if stream.tracker.record(tracks[i], match):
+                    settled.append(tracks[i])
+        stream.last_matches = [track.last_match for track in tracks]
+        matched = time.perf_counter()
+        face_names = [track.name for track in tracks]
+        
+        # Notify once per visit, when a track's identity has been voted in
+        for track in settled:
+            event = detection_event(track.identity, track.last_match.confidence,
+                                    camera=stream.camera, location=track.location)
+            snapshot = None
+            if self.notification_callback and self.deduplicator.should_emit(event):
+                snapshot = self.notification_callback(event)
+            # Logged after the callback so the event row carries what it saved
+            if self.event_log:
+                self.event_log.record(event, snapshot=snapshot)
+        
+        stream.last_timings = {
+            "convert": 1000 * (converted - start),
+            "locate": 1000 * (located - converted),
+            "encode": 1000 * (encoded - located),
+            "match": 1000 * (matched - encoded),
+            "total": 1000 * (time.perf_counter() - start),
+        }
+        self.frame_latencies.append(stream.last_timings["total"])
+        if REGISTRY.enabled:
+            for stage, ms in stream.last_timings.items():
+                STAGE_SECONDS.observe(ms / 1000, (stream.camera, stage))
+            FACES_PER_FRAME.observe(len(face_locations), stream.camera)
+            ENCODINGS.inc(len(face_encodings), stream.camera)
+        # Settings changed here take effect from the next frame
+        if self.quality_controller and self.quality_controller.update(
+                stream.last_timings["total"], motion=motion_detected):
+            self.quality_controller.apply(self)
         
         return face_names, face_locations
     
+    def latency_report(self, target_ms: float = 95.0) -> Dict[str, float]:
+        """
+        Summarize recent per-frame latency against a target.
+        
+        Args:
+            target_ms: Latency budget per frame in milliseconds
+            
+        Returns:
+            Dict with mean/p95/max latency in ms and the fraction of frames within target
+        """
+        if not self.frame_latencies:
+            return {"frames": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0, "within_target": 0.0}
+        latencies = np.asarray(self.frame_latencies)
+        return {
+            "frames": len(latencies),
+            "mean_ms": float(latencies.mean()),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "max_ms": float(latencies.max()),
+            "within_target": float((latencies <= target_ms).mean()),
+        }
+    
     def draw_results(self, frame, face_locations: List[tuple], face_names: List[str]):
         """
         Draw boxes and labels for recognized faces on the frame.
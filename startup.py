@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+
+def process_start() -> float:
+    """The time.monotonic() reading at which this process started, or now where that is unknown."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 is the start time in clock ticks since boot; the name in field 2 may hold spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        elapsed = time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic()
+    return time.monotonic() - max(0.0, elapsed)
+
+
+class StartupTimer:
+    def __init__(self, origin: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        When each phase of bringing the bot up started and finished.
+
+        Phases may overlap, e.g. loading the face models while the camera
+        opens, so each one is kept as a (start, end) pair in seconds since
+        the origin rather than as a running total.
+
+        Args:
+            origin: Clock reading the report is relative to, defaults to now
+            clock: Monotonic time source
+        """
+        self.clock = clock
+        self.origin = clock() if origin is None else origin
+        self.phases: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = self.clock() - self.origin
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = (start, self.clock() - self.origin)
+
+    def mark(self, name: str, at: Optional[float] = None) -> None:
+        """Record a moment, like the first frame, as a phase of zero length; at is a clock reading."""
+        moment = (self.clock() if at is None else at) - self.origin
+        with self._lock:
+            self.phases[name] = (moment, moment)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Phases in the order they finished, with start, end and duration in seconds."""
+        with self._lock:
+            phases = sorted(self.phases.items(), key=lambda item: item[1][1])
+        return {name: {"start_s": start, "end_s": end, "duration_s": end - start}
+                for name, (start, end) in phases}
+
+    def format(self) -> str:
+        lines = []
+        for name, phase in self.report().items():
+            if phase["duration_s"]:
+                lines.append(f"  {name:<16} {phase['start_s']:6.2f}s -> {phase['end_s']:6.2f}s "
+                             f"({phase['duration_s']:.2f}s)")
+            else:
+                lines.append(f"  {name:<16} {phase['end_s']:6.2f}s")
+        return "\n".join(lines)
+
+
+def in_background(name: str, fn: Callable, *args) -> Future:
+    """
+    Run fn on a daemon thread and return a Future for its result.
+
+    Unlike an executor's worker, the thread never holds up interpreter exit,
+    so quitting during a slow model load is immediate.
+    """
+    future: Future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+
+def completed(value) -> Future:
+    """A Future that already holds value."""
+    future: Future = Future()
+    future.set_result(value)
+    return future
@@ -0,0 +1,310 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import struct
+import threading
+import time
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MJPEG_BOUNDARY = b"frame"
+# Viewers only ever send pings and closes; anything bigger is refused
+MAX_CLIENT_PAYLOAD = 64 * 1024
+CLOSE_MESSAGE_TOO_BIG = 1009
+
+VIEWER_PAGE = b"""<!DOCTYPE html>
+<html><head><title>Welcome Home Bot</title></head>
+<body style="margin:0;background:#000">
+<img id="feed" style="width:100%">
+<script>
+  const img = document.getElementById("feed");
+  const ws = new WebSocket(`ws://${location.host}/ws`);
+  ws.binaryType = "blob";
+  ws.onmessage = (event) => {
+    const url = URL.createObjectURL(event.data);
+    img.onload = () => URL.revokeObjectURL(url);
+    img.src = url;
+  };
+</script>
+</body></html>
+"""
+
+
+def encode_jpeg(frame, quality: int) -> bytes:
+    """Encode a BGR frame as JPEG."""
+    import cv2
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode frame")
+    return buffer.tobytes()
+
+
+def websocket_header(length: int, opcode: int = 0x2) -> bytes:
+    """Header of a single unmasked server-to-client WebSocket frame."""
+    first = 0x80 | opcode
+    if length < 126:
+        return struct.pack("!BB", first, length)
+    if length < 1 << 16:
+        return struct.pack("!BBH", first, 126, length)
+    return struct.pack("!BBQ", first, 127, length)
+
+
+def unmask(payload: bytes, mask: bytes) -> bytes:
+    """XOR a client frame's payload with its 4-byte mask, as one big-integer operation."""
+    key = (mask * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(len(payload), "big")
+
+
+class _Viewer:
+    def __init__(self, writer: asyncio.StreamWriter, kind: str):
+        """One connected client with a single-frame mailbox."""
+        self.writer = writer
+        self.kind = kind  # "ws" or "mjpeg"
+        self.pending: Optional[bytes] = None
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.counted = (0, 0)  # (sent, dropped) already seen by the quality controller
+
+    def offer(self, jpeg: bytes) -> None:
+        """Hand over the newest frame, replacing one the client has not taken yet."""
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = jpeg
+        self.ready.set()
+
+
+class StreamServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080,
+                 max_fps: float = 15.0, min_fps: float = 2.0,
+                 max_quality: int = 80, min_quality: int = 30,
+                 encode: Callable = encode_jpeg):
+        """
+        Live stream of annotated frames over WebSocket (/ws) and MJPEG (/stream.mjpg).
+
+        The server runs its own asyncio loop on a background thread.
+        publish() only hands a frame reference to that loop, so the caller
+        never waits on encoding or the network. Each published frame is
+        encoded once and the same bytes are fanned out to every viewer. A
+        viewer that is still sending the previous frame has it replaced
+        rather than queued, and when viewers start dropping frames the
+        encoder lowers JPEG quality and frame rate, raising them again once
+        everyone keeps up.
+
+        Args:
+            host: Address to listen on; the stream has no authentication, so
+                only listen beyond localhost on a trusted network
+            port: TCP port to listen on
+            max_fps, min_fps: Range the stream frame rate adapts within
+            max_quality, min_quality: Range the JPEG quality adapts within
+            encode: Function turning (frame, quality) into JPEG bytes
+        """
+        self.host = host
+        self.port = port
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.max_quality = max_quality
+        self.min_quality = min_quality
+        self.encode = encode
+
+        self.fps = max_fps
+        self.quality = max_quality
+        self.frames_encoded = 0
+        self.viewers: List[_Viewer] = []
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._latest_frame = None
+        self._frame_ready: Optional[asyncio.Event] = None
+        self._last_encode = 0.0
+        self._window_start = time.monotonic()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stream-server", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._frame_ready = asyncio.Event()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle_client, self.host, self.port))
+        # Report the real port when asked to listen on port 0
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._loop.create_task(self._encoder())
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        for viewer in list(self.viewers):
+            self._loop.call_soon_threadsafe(viewer.writer.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2)
+        self._loop = None
+
+    def viewer_count(self) -> int:
+        return len(self.viewers)
+
+    def publish(self, frame) -> None:
+        """Offer a frame to viewers. Safe to call from any thread; never blocks."""
+        if self._loop is None or not self.viewers:
+            return
+        self._latest_frame = frame
+        self._loop.call_soon_threadsafe(self._frame_ready.set)
+
+    async def _encoder(self) -> None:
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            if not self.viewers:
+                continue
+
+            delay = self._last_encode + 1.0 / self.fps - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._last_encode = time.monotonic()
+
+            frame, quality = self._latest_frame, self.quality
+            try:
+                jpeg = await self._loop.run_in_executor(None, self.encode, frame, quality)
+            except Exception as e:
+                logger.error(f"Failed to encode stream frame: {str(e)}")
+                continue
+            self.frames_encoded += 1
+            for viewer in self.viewers:
+                viewer.offer(jpeg)
+            self._adapt()
+
+    def _adapt(self) -> None:
+        """Step quality and frame rate down when viewers drop frames, and back up when they keep up."""
+        now = time.monotonic()
+        if now - self._window_start < 1.0:
+            return
+        self._window_start = now
+        delta_sent = delta_dropped = 0
+        for viewer in self.viewers:
+            delta_sent += viewer.sent - viewer.counted[0]
+            delta_dropped += viewer.dropped - viewer.counted[1]
+            viewer.counted = (viewer.sent, viewer.dropped)
+
+        total = delta_sent + delta_dropped
+        if not total:
+            return
+        drop_ratio = delta_dropped / total
+        if drop_ratio > 0.3:
+            self.quality = max(self.min_quality, self.quality - 10)
+            self.fps = max(self.min_fps, self.fps * 0.75)
+        elif drop_ratio < 0.05:
+            self.quality = min(self.max_quality, self.quality + 5)
+            self.fps = min(self.max_fps, self.fps + 1)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+
+        lines = request.decode(errors="replace").split("\r\n")
+        parts = lines[0].split(" ")
+        path = parts[1] if len(parts) > 1 else "/"
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+            accept = base64.b64encode(hashlib.sha1(
+                (headers.get("sec-websocket-key", "") + WEBSOCKET_GUID).encode()).digest()).decode()
+            writer.write((
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+            await self._serve_viewer(_Viewer(writer, "ws"), reader)
+        elif path == "/stream.mjpg":
+            writer.write((
+                "HTTP/1.1 200 OK\r\nCache-Control: no-cache\r\n"
+                f"Content-Type: multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY.decode()}\r\n\r\n").encode())
+            await self._serve_viewer(_Viewer(writer, "mjpeg"), reader)
+        elif path == "/":
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n"
+                         b"Content-Length: %d\r\n\r\n" % len(VIEWER_PAGE) + VIEWER_PAGE)
+            await writer.drain()
+            writer.close()
+        else:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+            writer.close()
+
+    async def _serve_viewer(self, viewer: _Viewer, reader: asyncio.StreamReader) -> None:
+        self.viewers.append(viewer)
+        listener = asyncio.ensure_future(self._read_client(viewer, reader))
+        try:
+            while not listener.done():
+                ready = asyncio.ensure_future(viewer.ready.wait())
+                await asyncio.wait({ready, listener}, return_when=asyncio.FIRST_COMPLETED)
+                if not ready.done():
+                    ready.cancel()
+                    break
+                viewer.ready.clear()
+                jpeg, viewer.pending = viewer.pending, None
+                if viewer.kind == "ws":
+                    viewer.writer.write(websocket_header(len(jpeg)) + jpeg)
+                else:
+                    viewer.writer.write(
+                        b"--" + MJPEG_BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+                        b"Content-Length: %d\r\n\r\n" % len(jpeg) + jpeg + b"\r\n")
+                await viewer.writer.drain()
+                viewer.sent += 1
+        except ConnectionError:
+            pass
+        finally:
+            self.viewers.remove(viewer)
+            listener.cancel()
+            viewer.writer.close()
+
+    async def _read_client(self, viewer: _Viewer, reader: asyncio.StreamReader) -> None:
+        """Consume client input until it disconnects; answers WebSocket pings and closes."""
+        try:
+            if viewer.kind != "ws":
+                while await reader.read(1024):
+                    pass
+                return
+
+            while True:
+                first, second = await reader.readexactly(2)
+                opcode, length = first & 0x0F, second & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", await reader.readexactly(8))[0]
+                if length > MAX_CLIENT_PAYLOAD:
+                    reason = struct.pack("!H", CLOSE_MESSAGE_TOO_BIG)
+                    viewer.writer.write(websocket_header(len(reason), 0x8) + reason)
+                    return
+                mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+                payload = unmask(await reader.readexactly(length), mask)
+
+                if opcode == 0x8:  # close
+                    viewer.writer.write(websocket_header(len(payload), 0x8) + payload)
+                    return
+                if opcode == 0x9:  # ping
+                    viewer.writer.write(websocket_header(len(payload), 0xA) + payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
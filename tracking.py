@@ -0,0 +1,133 @@
+from collections import Counter, deque
+from itertools import count
+from typing import List, Optional
+
+
+def iou(a: tuple, b: tuple) -> float:
+    """Intersection over union of two (top, right, bottom, left) boxes."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    intersection = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return intersection / float(area_a + area_b - intersection)
+
+
+class Track:
+    def __init__(self, track_id: int, location: tuple, vote_window: int):
+        """A face followed across frames, with the recent identity votes for it."""
+        self.track_id = track_id
+        self.location = location
+        self.votes = deque(maxlen=vote_window)  # names from recent encodings
+        self.identity: Optional[str] = None  # settled name once voting agrees
+        self.last_match = None
+        self.missed = 0
+        self.frames_since_encoding = 0
+
+    @property
+    def name(self) -> str:
+        """Settled identity, or the current leading vote while still undecided."""
+        if self.identity is not None:
+            return self.identity
+        if self.votes:
+            return Counter(self.votes).most_common(1)[0][0]
+        return "Unknown"
+
+
+class FaceTracker:
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 10,
+                 votes_required: int = 3, vote_window: int = 5,
+                 reencode_every: int = 30):
+        """
+        Follow faces between frames so each visitor is encoded a handful of times, not every frame.
+
+        Detections are associated with existing tracks by greedy IoU
+        matching. A track is encoded while its identity is undecided; once
+        votes_required of the last vote_window matches agree, the identity
+        settles and the track is only re-encoded every reencode_every frames
+        to confirm it.
+
+        Args:
+            iou_threshold: Minimum overlap for a detection to continue a track
+            max_missed: Frames a track survives without a matching detection
+            votes_required: Agreeing matches needed to settle an identity
+            vote_window: Number of recent matches considered in the vote
+            reencode_every: Frames between confirmation encodings of a settled track
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.votes_required = votes_required
+        self.vote_window = vote_window
+        self.reencode_every = reencode_every
+        self.tracks: List[Track] = []
+        self._ids = count()
+
+    def update(self, face_locations: List[tuple]) -> List[Track]:
+        """
+        Associate this frame's detections with tracks.
+
+        Args:
+            face_locations: Face boxes (top, right, bottom, left) in this frame
+
+        Returns:
+            The track for each location, in the same order
+        """
+        pairs = sorted(
+            ((iou(track.location, location), t, d)
+             for t, track in enumerate(self.tracks)
+             for d, location in enumerate(face_locations)),
+            reverse=True,
+        )
+        assigned: List[Optional[Track]] = [None] * len(face_locations)
+        used_tracks = set()
+        for overlap, t, d in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in used_tracks or assigned[d] is not None:
+                continue
+            used_tracks.add(t)
+            assigned[d] = self.tracks[t]
+
+        for t, track in enumerate(self.tracks):
+            if t not in used_tracks:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        for d, location in enumerate(face_locations):
+            track = assigned[d]
+            if track is None:
+                track = Track(next(self._ids), location, self.vote_window)
+                self.tracks.append(track)
+                assigned[d] = track
+            track.location = location
+            track.missed = 0
+            track.frames_since_encoding += 1
+        return assigned
+
+    def needs_encoding(self, track: Track) -> bool:
+        """Whether a track's face should be encoded this frame."""
+        return (track.identity is None or track.last_match is None or
+                track.frames_since_encoding >= self.reencode_every)
+
+    def record(self, track: Track, match) -> bool:
+        """
+        Add a gallery match for a track and re-run the identity vote.
+
+        Args:
+            track: Track the encoded face belongs to
+            match: gallery.Match for the face
+
+        Returns:
+            bool: True if the track's identity settled or changed with this match
+        """
+        track.last_match = match
+        track.frames_since_encoding = 0
+        track.votes.append(match.name)
+
+        name, votes = Counter(track.votes).most_common(1)[0]
+        if votes >= self.votes_required and name != track.identity:
+            track.identity = name
+            return True
+        return False